@@ -9,13 +9,13 @@ def setup_letter_command(bot):
         await interaction.response.defer()
         
         # Vérifier que l'utilisateur a téléchargé un CV et sélectionné une offre
-        error_message = check_user_prerequisites(interaction.user.id, need_cv=True, need_job_offer=True)
+        error_message = await check_user_prerequisites(interaction.user.id, need_cv=True, need_job_offer=True)
         if error_message:
             await interaction.followup.send(error_message, ephemeral=True)
             return
         
         try:
-            user = get_user_data(interaction.user.id)
+            user = await get_user_data(interaction.user.id)
             
             # Ici, nous pouvons appeler la fonction de génération de lettre développée par un collègue
             # from path.to.letter_generator import generate_letter
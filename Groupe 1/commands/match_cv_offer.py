@@ -1,6 +1,20 @@
+import asyncio
 import discord
 from discord import app_commands
 from utils.helper import get_user_data, check_user_prerequisites
+from utils.matching import get_matching_engine
+
+NOMBRE_ALTERNATIVES = 5
+
+def liste_champ(elements, puce="-", limite=1024):
+    # Une ligne par élément, dans la limite de taille d'un champ d'embed Discord
+    lignes = []
+    for element in elements:
+        ligne = f"{puce} {element}"
+        if sum(len(l) + 1 for l in lignes) + len(ligne) > limite:
+            break
+        lignes.append(ligne)
+    return "\n".join(lignes)
 
 def setup_compare_command(bot):
     @bot.tree.command(name="comparer_cv_offre", description="Comparer votre CV avec la fiche de poste")
@@ -8,34 +22,42 @@ def setup_compare_command(bot):
         await interaction.response.defer()
         
         # Vérifier que l'utilisateur a téléchargé un CV et sélectionné une offre
-        error_message = check_user_prerequisites(interaction.user.id, need_cv=True, need_job_offer=True)
+        error_message = await check_user_prerequisites(interaction.user.id, need_cv=True, need_job_offer=True)
         if error_message:
             await interaction.followup.send(error_message, ephemeral=True)
             return
         
         try:
-            user = get_user_data(interaction.user.id)
+            user = await get_user_data(interaction.user.id)
             
-            # Ici, nous pouvons appeler la fonction de comparaison développée par un collègue
-            # from path.to.cv_job_matcher import compare_cv_job
-            # resultats = compare_cv_job(user.cv_text, user.job_offer)
-            
-            # Simulation de résultats en attendant la fonction réelle
-            correspondance = 78  # pourcentage de correspondance
-            points_forts = ["Excellente expérience en Python", "Bonne formation académique"]
-            points_amelioration = ["Expérience en cloud computing limitée", "Pas de certification mentionnée"]
-            conseils = ["Mettre en avant vos projets personnels", "Détailler davantage votre expérience en développement web"]
+            # Comparaison avec l'offre sélectionnée et avec toutes les offres de la base locale (voir utils/matching.py)
+            resultats = await asyncio.to_thread(
+                get_matching_engine().match, user.job_offer, user.cv_text, NOMBRE_ALTERNATIVES
+            )
+            correspondance = resultats['percentage']
             
             # Création de la réponse
             embed = discord.Embed(
                 title=f"Comparaison CV vs Offre: {user.job_offer['titre']}",
-                description=f"Taux de correspondance: **{correspondance}%**",
+                description=f"Taux de correspondance: **{correspondance}%**" if correspondance is not None
+                else "Aucune compétence reconnue dans cette offre",
                 color=discord.Color.blue()
             )
             
-            embed.add_field(name="📈 Points forts", value="\n".join([f"✅ {p}" for p in points_forts]), inline=False)
-            embed.add_field(name="🔍 Points à améliorer", value="\n".join([f"❗ {p}" for p in points_amelioration]), inline=False)
-            embed.add_field(name="💡 Conseils", value="\n".join([f"- {c}" for c in conseils]), inline=False)
+            if resultats['matched']:
+                embed.add_field(name="📈 Points forts", value=liste_champ(resultats['matched'], "✅"), inline=False)
+            if resultats['missing']:
+                embed.add_field(name="🔍 Points à améliorer", value=liste_champ(resultats['missing'], "❗"), inline=False)
+                conseils = [f"Si vous maîtrisez {c}, mentionnez-le dans votre CV ; sinon, pensez à vous y former" for c in resultats['missing'][:3]]
+                embed.add_field(name="💡 Conseils", value="\n".join([f"- {c}" for c in conseils]), inline=False)
+            if resultats['alternatives']:
+                alternatives = [
+                    f"**{o['percentage']}%** – [{o['title']} – {o['company']}]({o['url']})" if o['url']
+                    else f"**{o['percentage']}%** – {o['title']} – {o['company']}"
+                    for o in resultats['alternatives']
+                ]
+                embed.add_field(name="🔎 Offres proches de votre profil", value=liste_champ(alternatives), inline=False)
+            embed.set_footer(text=f"{resultats['offers_scored']} offres comparées en {resultats['elapsed_ms']:.0f} ms")
             
             await interaction.followup.send(embed=embed)
             
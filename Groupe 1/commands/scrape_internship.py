@@ -11,7 +11,11 @@ from jobspy import scrape_jobs
 import pandas as pd
 import re
 import asyncio
+import time
 from typing import Optional
+from utils.singleflight import search_flights
+from utils.offer_store import get_offer_store, indeed_offer
+from utils.pagination import PaginatedView
 
 # Configuration du logging
 def configure_logging():
@@ -163,34 +167,73 @@ def save_data(jobs_df, base_filename):
         logging.error(f"Error saving data: {str(e)}")
         raise
 
-class JobSelectionView(discord.ui.View):
-    def __init__(self, jobs, timeout=300):
-        super().__init__(timeout=timeout)
-        self.jobs = jobs
-        self.add_item(JobSelect(jobs))
+def jobs_page_field(jobs_list, start, end):
+    """(name, value) of the embed field listing the jobs from index start to end (excluded)"""
+    lines = "\n".join(f"{i+1}. {jobs_list[i]['title']} - {jobs_list[i]['company']}" for i in range(start, end))
+    value = lines[:1021] + "..." if len(lines) > 1024 else lines
+    return f"Offres {start+1}-{end} sur {len(jobs_list)}", value or "Aucune offre"
 
-class JobSelect(discord.ui.Select):
-    def __init__(self, jobs):
-        # Limit options to 25 (Discord's limit)
-        options = []
-        for i, job in enumerate(jobs[:25]):
-            job_title = f"{job['title']} - {job['company']}"
-            if len(job_title) > 100:
-                job_title = job_title[:97] + "..."
-            options.append(
-                discord.SelectOption(
-                    label=job_title,
-                    value=str(i),
-                    description=f"{job['location']} - {job['job_type'] if 'job_type' in job else 'N/A'}"[:100]
-                )
-            )
-        
-        super().__init__(placeholder="Sélectionner une offre pour plus de détails", options=options)
+def build_jobs_embed(search_term, job_type, location, jobs_list, analysis=None):
+    """Results embed: first offers found, plus the statistics fields once the analysis is available"""
+    embed = discord.Embed(
+        title=f"Offres trouvées pour '{search_term}' ({job_type})",
+        description=f"Résultats pour {location} - {len(jobs_list)} offres trouvées",
+        color=discord.Color.green()
+    )
     
-    async def callback(self, interaction: discord.Interaction):
-        index = int(self.values[0])
-        job = self.view.jobs[index]
-        
+    # Offres de la première page (mis à jour par JobSelectionView lors du changement de page)
+    name, value = jobs_page_field(jobs_list, 0, min(PaginatedView.PAGE_SIZE, len(jobs_list)))
+    embed.add_field(name=name, value=value, inline=False)
+    
+    if analysis is None:
+        return embed
+    
+    # Ajouter les principales statistiques
+    if 'top_companies' in analysis:
+        companies = ", ".join([f"{company} ({count})" for company, count in list(analysis['top_companies'].items())[:5]])
+        embed.add_field(name="Top entreprises", value=companies, inline=False)
+    
+    if 'top_locations' in analysis:
+        locations = ", ".join([f"{loc} ({count})" for loc, count in list(analysis['top_locations'].items())[:5]])
+        embed.add_field(name="Top localisations", value=locations, inline=False)
+    
+    if 'top_job_types' in analysis:
+        job_types = ", ".join([f"{jtype} ({count})" for jtype, count in list(analysis['top_job_types'].items())[:3]])
+        embed.add_field(name="Types d'emploi", value=job_types, inline=False)
+    
+    return embed
+
+def store_jobs(jobs_df):
+    """Upsert cleaned job data into the local offer store"""
+    inserted, updated = get_offer_store().upsert_offers([indeed_offer(job) for job in jobs_df.to_dict('records')])
+    logging.info(f"Offer store: {inserted} new jobs, {updated} already known")
+
+class JobSelectionView(PaginatedView):
+    """Jobs browsed page by page; the first field of the results embed lists the jobs of the current page"""
+    placeholder = "Sélectionner une offre pour plus de détails"
+    
+    def __init__(self, jobs, embed=None, timeout=300):
+        self.embed = embed
+        super().__init__(jobs, timeout=timeout)
+    
+    def make_option(self, index, job):
+        job_title = f"{job['title']} - {job['company']}"
+        if len(job_title) > 100:
+            job_title = job_title[:97] + "..."
+        return discord.SelectOption(
+            label=job_title,
+            value=str(index),
+            description=f"{job['location']} - {job['job_type'] if 'job_type' in job else 'N/A'}"[:100]
+        )
+    
+    def render_page(self):
+        if self.embed is None:
+            return None
+        name, value = jobs_page_field(self.items, *self.page_bounds())
+        self.embed.set_field_at(0, name=name, value=value, inline=False)
+        return self.embed
+    
+    async def on_item_selected(self, interaction, job):
         embed = discord.Embed(
             title=job['title'],
             url=job['job_url'],
@@ -225,6 +268,29 @@ class JobScraperCog(commands.Cog):
         self.bot = bot
         configure_logging()
     
+    async def run_search(self, search_params, on_cleaned=None):
+        """
+        Scrape, clean and analyze job listings; returns (cleaned_jobs, analysis), or (None, None) if nothing was found.
+        Indeed is scraped once for all the results wanted (jobspy restarts from the first page for any offset);
+        on_cleaned(cleaned_jobs) shows the offers as soon as they are cleaned, before the analysis and the CSV file.
+        """
+        loop = self.bot.loop
+        jobs_df = await loop.run_in_executor(None, scrape_job_listings, search_params)
+        if len(jobs_df) == 0:
+            return None, None
+        cleaned_jobs = await loop.run_in_executor(None, clean_job_data, jobs_df)
+        if on_cleaned is not None:
+            try:
+                await on_cleaned(cleaned_jobs)
+            except Exception as e:
+                logging.error(f"Error showing partial results: {str(e)}")
+        analysis = await loop.run_in_executor(None, analyze_job_data, cleaned_jobs)
+        try:
+            await loop.run_in_executor(None, store_jobs, cleaned_jobs)
+        except Exception as e:
+            logging.error(f"Error storing jobs in the offer store: {str(e)}")
+        return cleaned_jobs, analysis
+    
     @app_commands.command(name="scrape_internship", description="Rechercher des offres de stage ou d'alternance dans le domaine de la data")
     @app_commands.describe(
         search_term="Les termes de recherche (ex: data scientist, data analyst)",
@@ -246,6 +312,9 @@ class JobScraperCog(commands.Cog):
         if max_results > 100:
             max_results = 100
         
+        start = time.perf_counter()
+        first_output = None
+        message = None
         await interaction.response.defer(thinking=True)
         
         try:
@@ -262,61 +331,65 @@ class JobScraperCog(commands.Cog):
                 'country_indeed': 'France' if location.lower() == "france" else None
             }
             
-            # Faire le scraping de manière asynchrone
-            jobs_df = await self.bot.loop.run_in_executor(None, scrape_job_listings, search_params)
+            async def show_first_jobs(cleaned_jobs):
+                # Premier affichage dès que les offres sont nettoyées, complété par l'analyse et le fichier CSV
+                nonlocal message, first_output
+                jobs_list = cleaned_jobs.to_dict('records')
+                embed = build_jobs_embed(search_term, job_type, location, jobs_list)
+                embed.set_footer(text="⏳ Analyse des offres en cours...")
+                message = await interaction.followup.send(embed=embed, view=JobSelectionView(jobs_list, embed), wait=True)
+                first_output = time.perf_counter() - start
             
-            if len(jobs_df) == 0:
+            # Faire le scraping, le nettoyage et l'analyse de manière asynchrone.
+            # Les recherches identiques lancées en même temps partagent un seul scraping Indeed ;
+            # seule la première commande affiche les offres avant l'analyse, les autres reçoivent le résultat complet.
+            key = ('indeed',) + tuple(sorted((k, str(v).lower()) for k, v in search_params.items()))
+            (cleaned_jobs, analysis), shared = await search_flights.do(
+                key, lambda: self.run_search(search_params, on_cleaned=show_first_jobs)
+            )
+            if shared:
+                stats = search_flights.stats()
+                logging.info(f"Indeed search {combined_search!r} shared with an in-flight search "
+                             f"({stats['deduplicated']}/{stats['calls']} calls deduplicated)")
+            
+            if cleaned_jobs is None:
                 await interaction.followup.send("Aucune offre trouvée avec ces critères.")
                 return
             
-            # Nettoyer les données
-            cleaned_jobs = await self.bot.loop.run_in_executor(None, clean_job_data, jobs_df)
-            
-            # Analyser les données
-            analysis = await self.bot.loop.run_in_executor(None, analyze_job_data, cleaned_jobs)
-            
             # Convertir en dictionnaire pour la sélection
             jobs_list = cleaned_jobs.to_dict('records')
             
-            # Créer un embed avec les résultats
-            embed = discord.Embed(
-                title=f"Offres trouvées pour '{search_term}' ({job_type})",
-                description=f"Résultats pour {location} - {len(cleaned_jobs)} offres trouvées",
-                color=discord.Color.green()
-            )
-            
-            # Ajouter les principales statistiques
-            if 'top_companies' in analysis:
-                companies = ", ".join([f"{company} ({count})" for company, count in list(analysis['top_companies'].items())[:5]])
-                embed.add_field(name="Top entreprises", value=companies, inline=False)
-            
-            if 'top_locations' in analysis:
-                locations = ", ".join([f"{loc} ({count})" for loc, count in list(analysis['top_locations'].items())[:5]])
-                embed.add_field(name="Top localisations", value=locations, inline=False)
-            
-            if 'top_job_types' in analysis:
-                job_types = ", ".join([f"{jtype} ({count})" for jtype, count in list(analysis['top_job_types'].items())[:3]])
-                embed.add_field(name="Types d'emploi", value=job_types, inline=False)
+            # Créer un embed avec les résultats et les principales statistiques
+            embed = build_jobs_embed(search_term, job_type, location, jobs_list, analysis)
             
             # Créer un fichier CSV
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             base_filename = f"jobs_{timestamp}"
             csv_file = await self.bot.loop.run_in_executor(None, save_data, cleaned_jobs, base_filename)
             
-            # Vue pour sélectionner des offres
-            view = JobSelectionView(jobs_list)
+            # Vue pour parcourir et sélectionner les offres
+            view = JobSelectionView(jobs_list, embed)
             
-            # Envoyer la réponse
-            await interaction.followup.send(
-                content=f"📊 Analyse complète des offres pour '{search_term}' ({job_type}) :",
-                embed=embed, 
-                file=csv_file,
-                view=view
-            )
+            total = time.perf_counter() - start
+            first = first_output if first_output is not None else total
+            embed.set_footer(text=f"⏱️ Premières offres en {first:.1f} s · recherche complète en {total:.1f} s")
+            
+            # Envoyer la réponse, ou compléter le premier affichage avec les statistiques et le fichier CSV
+            content = f"📊 Analyse complète des offres pour '{search_term}' ({job_type}) :"
+            if message is None:
+                await interaction.followup.send(content=content, embed=embed, file=csv_file, view=view)
+                first_output = time.perf_counter() - start
+            else:
+                await message.edit(content=content, embed=embed, attachments=[csv_file], view=view)
             
         except Exception as e:
             logging.error(f"Error in scrape_internship command: {str(e)}")
             await interaction.followup.send(f"❌ Une erreur s'est produite lors de la recherche : {str(e)[:1900]}")
+        finally:
+            logging.info(
+                f"/scrape_internship {search_term!r}: first output after "
+                f"{'-' if first_output is None else f'{first_output:.2f}s'}, total {time.perf_counter() - start:.2f}s"
+            )
 
 # Cette fonction est appelée par bot.py - conservez exactement ce nom
 async def setup_internship_command(bot):
@@ -24,7 +24,7 @@ class OffreSelect(discord.ui.Select):
         offre = self.view.offres[index]
         
         # Stockage de l'offre d'emploi sélectionnée
-        user = get_user_data(interaction.user.id)
+        user = await get_user_data(interaction.user.id)
         user.job_offer = offre
         
         embed = discord.Embed(
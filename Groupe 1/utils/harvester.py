@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import math
+import os
+import time
+
+from utils.offer_store import get_offer_store, france_travail_offer, indeed_offer, normalize_text
+from utils.shared_state import get_backend, multi_process, process_id
+
+# Collecte des offres en arrière-plan.
+# Pour chaque cible (mots-clés + lieu) et chaque source, le bot demande périodiquement les offres publiées
+# depuis la dernière collecte réussie, et les enregistre dans la base locale (offer_store.py) :
+#  - France Travail : paramètres minCreationDate / maxCreationDate de la recherche ;
+#  - Indeed : paramètre hours_old de jobspy (nombre d'heures écoulées depuis la dernière collecte).
+# Un point de reprise est enregistré par cible après chaque collecte réussie : après un arrêt ou un plantage,
+# la collecte reprend là où elle s'était arrêtée au lieu de tout retélécharger.
+# Une collecte par date ne montre pas les offres retirées : une collecte complète (sans filtre de date) est donc
+# faite de temps en temps ; les offres de la cible qui n'y figurent plus sont marquées comme fermées.
+# Bot en plusieurs processus : à chaque intervalle, un seul processus planifie les collectes dans une file de tâches
+# partagée (shared_state.py) ; chaque collecte n'est faite que par un processus, et reprise par un autre si
+# celui-ci s'arrête en cours de route.
+#
+# Configuration (variables d'environnement) :
+#   HARVEST_TARGETS="data analyst@Rennes;alternance data@Paris"   cibles "mots-clés@lieu", séparées par ';'
+#   HARVEST_SOURCES="france_travail,indeed"                       sources à collecter pour chaque cible
+#   HARVEST_INTERVAL_MINUTES=60, HARVEST_FULL_SWEEP_HOURS=24
+
+SOURCES = ('france_travail', 'indeed')
+
+
+def parse_targets(value):
+    """'data analyst@Rennes;alternance data@Paris' -> [('data analyst', 'Rennes'), ('alternance data', 'Paris')]"""
+    targets = []
+    for item in (value or '').split(';'):
+        keywords, _, location = item.partition('@')
+        if keywords.strip():
+            targets.append((keywords.strip(), location.strip() or 'France'))
+    return targets
+
+
+def target_key(source, keywords, location):
+    return f"{source}|{' '.join(keywords.lower().split())}|{normalize_text(location)}"
+
+
+class Harvester:
+    """Collecte incrémentale des cibles configurées, à intervalle régulier"""
+
+    # Offres relues avant la dernière collecte, pour ne pas manquer celles indexées avec retard par la source
+    OVERLAP_SECONDS = 3600
+    # Nombre maximal d'offres demandées par collecte (France Travail : 3150 au plus)
+    MAX_OFFERS_FRANCE_TRAVAIL = 1000
+    MAX_OFFERS_INDEED = 100
+    # File de tâches partagée : durée du bail d'une collecte et nombre de tentatives avant abandon
+    QUEUE = 'harvest'
+    JOB_LEASE_SECONDS = 900
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, targets, sources=SOURCES, interval=3600, full_sweep_interval=86400, store=None, backend=None):
+        self.targets = targets
+        self.sources = sources
+        self.interval = interval
+        self.full_sweep_interval = full_sweep_interval
+        self.store = store or get_offer_store()
+        # Backend d'état partagé (plusieurs processus), ou None pour collecter toutes les cibles localement
+        self.backend = backend
+        self._task = None
+
+    @classmethod
+    def from_env(cls):
+        """Harvester configuré par les variables d'environnement HARVEST_*, ou None si aucune cible n'est définie"""
+        targets = parse_targets(os.getenv('HARVEST_TARGETS'))
+        if not targets:
+            return None
+        sources = tuple(s.strip() for s in os.getenv('HARVEST_SOURCES', ','.join(SOURCES)).split(',') if s.strip() in SOURCES)
+        return cls(
+            targets,
+            sources=sources,
+            interval=float(os.getenv('HARVEST_INTERVAL_MINUTES', 60)) * 60,
+            full_sweep_interval=float(os.getenv('HARVEST_FULL_SWEEP_HOURS', 24)) * 3600,
+            backend=get_backend() if multi_process() else None
+        )
+
+    def start(self):
+        """Lance la boucle de collecte dans une tâche de fond (une seule à la fois)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever())
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logging.error(f"Harvest run failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self):
+        """Collecte chaque cible pour chaque source ; une cible en échec n'empêche pas les suivantes"""
+        if self.backend is not None:
+            await self.run_queue()
+            return
+        for keywords, location in self.targets:
+            for source in self.sources:
+                try:
+                    await self.harvest(source, keywords, location)
+                except Exception as e:
+                    logging.error(f"Harvest of {source} '{keywords}' @ {location} failed: {str(e)}")
+
+    async def run_queue(self):
+        """Planifie les collectes de l'intervalle (si aucun autre processus ne l'a fait) et traite celles disponibles"""
+        owner = process_id()
+        if await asyncio.to_thread(self.backend.acquire_lease, f'{self.QUEUE}:schedule', owner, self.interval * 0.9):
+            for keywords, location in self.targets:
+                for source in self.sources:
+                    await asyncio.to_thread(
+                        self.backend.enqueue, self.QUEUE,
+                        {'source': source, 'keywords': keywords, 'location': location},
+                        target_key(source, keywords, location)
+                    )
+        while True:
+            job = await asyncio.to_thread(self.backend.claim, self.QUEUE, owner, self.JOB_LEASE_SECONDS)
+            if job is None:
+                return
+            job_id, payload, attempts = job
+            try:
+                await self.harvest(payload['source'], payload['keywords'], payload['location'])
+            except Exception as e:
+                logging.error(
+                    f"Harvest of {payload['source']} '{payload['keywords']}' @ {payload['location']} failed "
+                    f"(attempt {attempts}/{self.MAX_ATTEMPTS}): {str(e)}"
+                )
+                if attempts < self.MAX_ATTEMPTS:
+                    await asyncio.to_thread(self.backend.retry, job_id, 60 * attempts)
+                    continue
+            await asyncio.to_thread(self.backend.complete, job_id)
+
+    async def harvest(self, source, keywords, location):
+        """Collecte une cible et met à jour son point de reprise. Retourne (nouvelles, connues, fermées)"""
+        key = target_key(source, keywords, location)
+        checkpoint = await asyncio.to_thread(self.store.get_checkpoint, key)
+        started = time.time()
+        full_sweep = checkpoint is None or started - checkpoint['last_full_sweep'] >= self.full_sweep_interval
+        since = None if full_sweep else checkpoint['last_success'] - self.OVERLAP_SECONDS
+
+        if source == 'france_travail':
+            offers, complete = await self.fetch_france_travail(keywords, location, since, started)
+        else:
+            offers, complete = await self.fetch_indeed(keywords, location, since, started)
+
+        inserted, updated = await asyncio.to_thread(self.store.upsert_offers, offers, key)
+        closed = 0
+        # Une collecte tronquée (plus d'offres que le maximum demandé) ne permet pas de savoir ce qui a disparu
+        if full_sweep and complete:
+            closed = await asyncio.to_thread(self.store.close_missing, key, started)
+        await asyncio.to_thread(
+            self.store.save_checkpoint, key, started, started if full_sweep else checkpoint['last_full_sweep']
+        )
+        logging.info(
+            f"Harvested {source} '{keywords}' @ {location} ({'full sweep' if full_sweep else 'delta'}): "
+            f"{inserted} new, {updated} known, {closed} closed"
+        )
+        return inserted, updated, closed
+
+    async def fetch_france_travail(self, keywords, location, since, until):
+        """Offres France Travail créées depuis since (toutes si since vaut None). Retourne (offres, complète)"""
+        from france_travail_async import get_api_async_partagee
+        api = await get_api_async_partagee()
+        zone = api.determine_zone_recherche(location)
+        if not zone:
+            raise ValueError(f"Commune introuvable : {location}")
+        filters = None
+        if since is not None:
+            # L'API exige les deux bornes, au format UTC 'AAAA-MM-JJTHH:MM:SSZ'
+            filters = {
+                'minCreationDate': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(since)),
+                'maxCreationDate': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(until))
+            }
+        result = await api.rechercher_dans_zone(zone, keywords, self.MAX_OFFERS_FRANCE_TRAVAIL, filters)
+        if 'erreur' in result:
+            raise Exception(result['erreur'])
+        offres = result.get('offres', [])
+        return [france_travail_offer(o) for o in offres], len(offres) < self.MAX_OFFERS_FRANCE_TRAVAIL
+
+    async def fetch_indeed(self, keywords, location, since, until):
+        """Offres Indeed publiées depuis since (toutes si since vaut None). Retourne (offres, complète)"""
+        from commands.scrape_internship import scrape_job_listings, clean_job_data
+        search_params = {
+            'site_names': ["indeed"],
+            'search_term': keywords,
+            'location': location,
+            'results_wanted': self.MAX_OFFERS_INDEED,
+            'hours_old': None if since is None else max(1, math.ceil((until - since) / 3600)),
+            'country_indeed': 'France'
+        }
+        loop = asyncio.get_running_loop()
+        jobs_df = await loop.run_in_executor(None, scrape_job_listings, search_params)
+        if len(jobs_df) == 0:
+            return [], True
+        cleaned_jobs = await loop.run_in_executor(None, clean_job_data, jobs_df)
+        return [indeed_offer(job) for job in cleaned_jobs.to_dict('records')], len(jobs_df) < self.MAX_OFFERS_INDEED
+
+
+_harvester = None
+
+
+def start_harvester():
+    """Démarre la collecte en arrière-plan si des cibles sont configurées (sans effet si elle tourne déjà)"""
+    global _harvester
+    if _harvester is None:
+        _harvester = Harvester.from_env()
+    if _harvester is not None:
+        _harvester.start()
+    return _harvester
@@ -1,36 +1,270 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from utils.session_persistence import SessionPersistence
+from utils.shared_state import multi_process
+
 # Classe pour stocker temporairement les données de l'utilisateur
 class UserData:
-    def __init__(self):
+    # __slots__ : pas de __dict__ par session, l'enregistrement reste compact même avec des milliers d'utilisateurs
+    __slots__ = ('user_id', 'cv_text', 'job_offer', 'cv_file_name', 'cv_analysis', 'last_access', 'text_size', 'version', '_store')
+    FIELDS = ('cv_text', 'job_offer', 'cv_file_name', 'cv_analysis')
+
+    def __init__(self, user_id=None, store=None):
+        object.__setattr__(self, '_store', None)
+        self.user_id = user_id
         self.cv_text = None
         self.job_offer = None
         self.cv_file_name = None
         self.cv_analysis = None
+        self.last_access = time.monotonic()
+        self.text_size = 0
+        self.version = 0
+        self._store = store
 
-# Dictionnaire global pour stocker les données des utilisateurs (user_id -> UserData)
-user_data = {}
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        # Prévient le store des modifications (taille du texte stocké) faites directement par les commandes
+        if name in UserData.FIELDS and self._store is not None:
+            self._store.on_change(self, name)
+
+def text_size(value):
+    """
+    Taille approximative (en caractères) du texte contenu dans une valeur de session
+    """
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(k)) + text_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(text_size(v) for v in value)
+    return len(str(value))
 
-def get_user_data(user_id):
+class SessionStore:
+    """
+    Sessions des utilisateurs (user_id -> UserData), bornées en nombre et en taille :
+    - au-delà de max_entries sessions, la moins récemment utilisée est supprimée (LRU) ;
+    - une session inutilisée depuis idle_ttl secondes expire ;
+    - si max_text_size est défini, les sessions les moins récemment utilisées sont supprimées tant que
+      le texte stocké (CV, offre, analyse) dépasse cette taille.
+    Avec une persistence (SessionPersistence), les sessions modifiées sont sauvegardées en différé et une
+    session absente de la mémoire (redémarrage, éviction) est relue sur disque au premier accès.
+    Avec shared=True (bot en plusieurs processus), chaque accès vérifie en plus la version enregistrée : une session
+    modifiée par un autre processus (offre sélectionnée avec /scrape sur un autre shard...) est relue.
+    """
+
+    def __init__(self, max_entries=1000, idle_ttl=24 * 3600, max_text_size=None, persistence=None, shared=False):
+        self.persistence = persistence
+        self.shared = shared and persistence is not None
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self.max_text_size = max_text_size
+        self.sessions = OrderedDict()
+        self.total_text_size = 0
+        self._lock = threading.RLock()
+        self.counters = {
+            'created': 0,
+            'loaded': 0,
+            'reloaded': 0,
+            'hits': 0,
+            'evicted_lru': 0,
+            'evicted_idle': 0,
+            'evicted_memory': 0
+        }
+
+    def __contains__(self, user_id):
+        return self.peek(user_id) is not None
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def peek(self, user_id):
+        """
+        Retourne la session de l'utilisateur sans la créer (None si elle n'existe pas ou a expiré)
+        """
+        with self._lock:
+            self.expire()
+            user = self.sessions.get(user_id)
+            if user is not None:
+                if self.shared:
+                    self.sync(user)
+                self.touch(user)
+                return user
+            return self.load(user_id)
+
+    def load(self, user_id):
+        """
+        Relit la session enregistrée de l'utilisateur et la remet en mémoire (None si elle n'existe pas)
+        """
+        if self.persistence is None:
+            return None
+        entry = self.persistence.load(user_id)
+        if entry is None:
+            return None
+        user = UserData(user_id)
+        self.apply(user, *entry)
+        user._store = self
+        self.sessions[user_id] = user
+        self.total_text_size += user.text_size
+        self.counters['loaded'] += 1
+        self.enforce_limits()
+        return user
+
+    def sync(self, user):
+        """
+        Relit la session si un autre processus l'a modifiée depuis sa dernière lecture
+        (sauf si elle a des modifications locales pas encore écrites, qui seraient perdues)
+        """
+        if self.persistence.version(user.user_id) <= user.version or self.persistence.is_dirty(user.user_id):
+            return
+        entry = self.persistence.load(user.user_id)
+        if entry is None:
+            return
+        previous_size = user.text_size
+        self.apply(user, *entry)
+        self.total_text_size += user.text_size - previous_size
+        self.counters['reloaded'] += 1
+
+    @staticmethod
+    def apply(user, data, version):
+        """
+        Copie les champs enregistrés dans la session, sans la marquer comme modifiée
+        """
+        for name in UserData.FIELDS:
+            object.__setattr__(user, name, data.get(name))
+        user.text_size = sum(text_size(data.get(name)) for name in UserData.FIELDS)
+        user.version = version
+
+    def get(self, user_id):
+        """
+        Retourne la session de l'utilisateur, en la créant si nécessaire
+        """
+        with self._lock:
+            user = self.peek(user_id)
+            if user is not None:
+                self.counters['hits'] += 1
+                return user
+            user = UserData(user_id, self)
+            self.sessions[user_id] = user
+            self.counters['created'] += 1
+            self.enforce_limits()
+            return user
+
+    def touch(self, user):
+        user.last_access = time.monotonic()
+        self.sessions.move_to_end(user.user_id)
+
+    def on_change(self, user, field):
+        """
+        Appelée par UserData quand une commande modifie un champ : met à jour la taille du texte stocké
+        """
+        with self._lock:
+            if self.persistence is not None:
+                self.persistence.mark_dirty(user, field)
+            if self.sessions.get(user.user_id) is not user:
+                return  # Session déjà supprimée de la mémoire : seule la sauvegarde est concernée
+            size = sum(text_size(getattr(user, name)) for name in UserData.FIELDS)
+            self.total_text_size += size - user.text_size
+            user.text_size = size
+            self.touch(user)
+            self.enforce_limits()
+
+    def remove(self, user_id, reason=None):
+        with self._lock:
+            user = self.sessions.pop(user_id, None)
+            if user is None:
+                return None
+            self.total_text_size -= user.text_size
+            if reason:
+                self.counters[reason] += 1
+            return user
+
+    def expire(self):
+        """
+        Supprime les sessions inactives depuis plus de idle_ttl secondes (les plus anciennes sont en tête)
+        """
+        if self.idle_ttl is None:
+            return
+        limit = time.monotonic() - self.idle_ttl
+        while self.sessions:
+            user_id, user = next(iter(self.sessions.items()))
+            if user.last_access >= limit:
+                break
+            self.remove(user_id, 'evicted_idle')
+
+    def enforce_limits(self):
+        while len(self.sessions) > self.max_entries:
+            self.remove(next(iter(self.sessions)), 'evicted_lru')
+        # La session la plus récente est conservée même si elle dépasse à elle seule la taille maximale
+        while self.max_text_size is not None and self.total_text_size > self.max_text_size and len(self.sessions) > 1:
+            self.remove(next(iter(self.sessions)), 'evicted_memory')
+
+    def close(self):
+        """
+        Sauvegarde les dernières modifications (à appeler à l'arrêt du bot)
+        """
+        if self.persistence is not None:
+            self.persistence.close()
+
+    def stats(self):
+        """
+        Sessions actives, taille du texte stocké et compteurs (créations, accès, suppressions par motif)
+        """
+        with self._lock:
+            return {
+                'live_sessions': len(self.sessions),
+                'text_size': self.total_text_size,
+                **self.counters,
+                **({'persistence': dict(self.persistence.counters)} if self.persistence is not None else {})
+            }
+
+def _optional_int(name):
+    value = os.getenv(name)
+    return int(float(value)) if value else None
+
+# Sessions de tous les utilisateurs (user_id -> UserData), configurables par variables d'environnement
+user_data = SessionStore(
+    max_entries=int(os.getenv('USER_SESSIONS_MAX', 1000)),
+    idle_ttl=float(os.getenv('USER_SESSIONS_IDLE_HOURS', 24)) * 3600,
+    max_text_size=_optional_int('USER_SESSIONS_MAX_TEXT_CHARS'),
+    # Sauvegarde des sessions dans le backend d'état partagé (voir shared_state.py) ; désactivée avec USER_SESSIONS_PERSIST=0.
+    # En plusieurs processus, les écritures partent presque immédiatement pour être vues par les autres shards.
+    persistence=SessionPersistence(
+        flush_delay=float(os.getenv('USER_SESSIONS_FLUSH_SECONDS', 0.1 if multi_process() else 2))
+    ) if os.getenv('USER_SESSIONS_PERSIST', '1') != '0' else None,
+    shared=multi_process()
+)
+
+async def _run_store(method, user_id):
+    # Avec une persistence, un accès peut lire le backend partagé (SQLite, verrou entre processus) :
+    # il est fait dans un thread pour ne pas bloquer la boucle d'événements du bot (SessionStore est thread-safe)
+    if user_data.persistence is None:
+        return method(user_id)
+    return await asyncio.to_thread(method, user_id)
+
+async def get_user_data(user_id):
     """
     Récupère les données de l'utilisateur, crée une nouvelle entrée si nécessaire
     """
-    if user_id not in user_data:
-        user_data[user_id] = UserData()
-    return user_data[user_id]
+    return await _run_store(user_data.get, user_id)
 
-def check_user_prerequisites(user_id, need_cv=True, need_job_offer=True):
+async def check_user_prerequisites(user_id, need_cv=True, need_job_offer=True):
     """
     Vérifie si l'utilisateur a téléchargé un CV et/ou sélectionné une offre d'emploi
     Retourne un message d'erreur si les conditions ne sont pas remplies, None sinon
     """
-    if user_id not in user_data:
+    user = await _run_store(user_data.peek, user_id)
+    if user is None:
         return "Veuillez d'abord télécharger votre CV et/ou sélectionner une offre d'emploi"
-    
-    user = user_data[user_id]
-    
+
     if need_cv and not user.cv_text:
         return "Veuillez d'abord télécharger votre CV avec `/analyser_cv`"
-    
+
     if need_job_offer and not user.job_offer:
         return "Veuillez d'abord sélectionner une offre d'emploi avec `/scrape`"
-    
+
     return None
@@ -0,0 +1,189 @@
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+
+from detecteur_competences import DetecteurCompetences, termes_vocabulaire
+from utils.offer_store import get_offer_store, france_travail_offer
+
+# Moteur de correspondance CV / offres pour /comparer_cv_offre.
+# Les compétences d'un vocabulaire (SKILLS) sont repérées (Groupe 4/detecteur_competences.py) dans le titre et
+# la description de chaque offre de la base locale (offer_store.py) ; les offres forment une matrice creuse offres x compétences, pondérée par la rareté
+# de chaque compétence (idf). Le texte extrait du CV de l'utilisateur devient un vecteur
+# sur les mêmes colonnes : un seul produit matrice-vecteur donne, pour toutes les offres, la part des compétences
+# demandées que le CV couvre.
+# La matrice est reconstruite quand la base change ; la détection n'est refaite que pour les nouvelles offres.
+
+# Vocabulaire des parsers de CV (outils et langages), complété par les domaines, langues et savoir-être
+# que les offres demandent souvent. Orange, Express, SAS (forme juridique) et Shell désignent plus souvent une entreprise
+# qu'un outil dans une offre ou un CV.
+COMPANY_NAMES = ('Orange', 'Express', 'SAS', 'Shell')
+SKILLS = tuple(terme for terme in termes_vocabulaire() if terme not in COMPANY_NAMES) + (
+    'Machine Learning', 'Deep Learning', 'Data Science', 'Data Analysis', 'Big Data', 'ETL', 'Statistiques',
+    'Data Visualisation', 'NLP', 'Computer Vision', 'Intelligence Artificielle', 'LLM', 'Econométrie',
+    'Spark', 'Hadoop', 'Airflow', 'dbt', 'Looker', 'Qlik', 'Terraform', 'Ansible', 'DevOps', 'Cybersécurité',
+    'Django', 'Flask', 'FastAPI', 'Spring', '.NET', 'Figma', 'Photoshop', 'AutoCAD', 'Google Sheets', 'Pack Office',
+    'Agile', 'Scrum', 'Gestion de projet', 'UML', 'Merise',
+    'Anglais', 'Espagnol', 'Allemand', 'Italien', 'Chinois', 'Japonais',
+    'Autonomie', 'Rigueur', 'Communication', 'Travail en équipe', 'Leadership', 'Organisation', 'Adaptabilité',
+    "Esprit d'analyse", 'Curiosité', 'Créativité'
+)
+
+# Une offre dont moins de MIN_OFFER_SKILLS compétences sont reconnues n'est pas proposée comme alternative
+MIN_OFFER_SKILLS = 2
+
+
+def offer_text(offer):
+    """Texte analysé d'une offre, au schéma de la base (title...) ou au format France Travail (titre...)"""
+    return '\n'.join(str(offer.get(field) or '') for field in ('title', 'titre', 'contract', 'contrat', 'description'))
+
+
+def cv_skills(vocabulary, cv_text):
+    """
+    Colonnes des compétences citées dans le texte extrait du CV.
+    L'analyse stockée par /analyser_cv (cv_analysis) n'est pas utilisée : elle est encore simulée, identique pour tous
+    """
+    return vocabulary.indices(cv_text) if cv_text else set()
+
+
+class MatchingEngine:
+    """
+    Index des offres de la base locale pour le matching CV / offres, partageable entre threads.
+    refresh_interval : délai minimal (en secondes) entre deux vérifications de la base
+    """
+
+    def __init__(self, store=None, vocabulary=None, refresh_interval=60):
+        self.store = store
+        self.vocabulary = vocabulary or DetecteurCompetences(SKILLS)
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0
+        self._revision = None
+        # offer_key -> colonnes des compétences reconnues (la détection n'est pas refaite pour une offre déjà vue)
+        self._offer_skills = {}
+        self.offers = []
+        self.weights = sparse.csr_matrix((0, len(self.vocabulary)))
+        self.idf = np.ones(len(self.vocabulary))
+        self.totals = np.zeros(0)
+        self.counters = {'rebuilds': 0, 'offers_analyzed': 0, 'matches': 0}
+
+    def refresh(self, force=False):
+        """Reconstruit la matrice si la base d'offres a changé ; retourne le nombre d'offres indexées"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked_at < self.refresh_interval:
+                return len(self.offers)
+            self._checked_at = now
+            store = self.store or get_offer_store()
+            revision = store.revision()
+            if not force and revision == self._revision:
+                return len(self.offers)
+
+            offers, seen = [], set()
+            for offer in store.all_offers():
+                # Une même offre publiée sur plusieurs sources n'est indexée qu'une fois
+                if offer['content_key'] in seen:
+                    continue
+                seen.add(offer['content_key'])
+                offers.append(offer)
+
+            previous, self._offer_skills = self._offer_skills, {}
+            rows, columns = [], []
+            for i, offer in enumerate(offers):
+                skills = previous.get(offer['offer_key'])
+                if skills is None:
+                    skills = self.vocabulary.indices(offer_text(offer))
+                    self.counters['offers_analyzed'] += 1
+                self._offer_skills[offer['offer_key']] = skills
+                rows.extend([i] * len(skills))
+                columns.extend(skills)
+
+            presence = sparse.csr_matrix(
+                (np.ones(len(rows)), (rows, columns)), shape=(len(offers), len(self.vocabulary))
+            )
+            # Une compétence demandée partout (Anglais, Pack Office...) compte moins qu'une compétence rare
+            document_frequency = np.bincount(columns, minlength=len(self.vocabulary))
+            self.idf = np.log((len(offers) + 1) / (document_frequency + 1)) + 1
+            self.weights = presence.multiply(self.idf).tocsr()
+            self.totals = np.asarray(self.weights.sum(axis=1)).ravel()
+            self.offers = offers
+            self._revision = revision
+            self.counters['rebuilds'] += 1
+            return len(offers)
+
+    def score_all(self, skills):
+        """
+        Pour chaque offre indexée : (part pondérée des compétences de l'offre présentes dans le CV, poids couvert)
+        """
+        vector = np.zeros(len(self.vocabulary))
+        vector[list(skills)] = 1
+        covered = self.weights @ vector
+        coverage = np.divide(covered, self.totals, out=np.zeros_like(covered), where=self.totals > 0)
+        return coverage, covered
+
+    def match(self, offer, cv_text=None, top_n=5):
+        """
+        Compare le CV à l'offre sélectionnée et à toutes les offres de la base.
+
+        Retourne un dictionnaire :
+            percentage : taux de correspondance avec l'offre (None si aucune compétence n'y est reconnue)
+            matched / missing : compétences de l'offre présentes / absentes du CV (les plus rares d'abord)
+            alternatives : top_n offres de la base les mieux couvertes par le CV (hors offre sélectionnée)
+            offers_scored, elapsed_ms : nombre d'offres comparées et durée du calcul
+        """
+        self.refresh()
+        start = time.perf_counter()
+        with self._lock:
+            offers, weights, idf, totals = self.offers, self.weights, self.idf, self.totals
+            skills = cv_skills(self.vocabulary, cv_text)
+            offer_skills = self.vocabulary.indices(offer_text(offer))
+
+            # Une compétence qu'aucune offre de la base ne demande a le poids maximal
+            weight = {column: idf[column] for column in offer_skills}
+            ordered = sorted(offer_skills, key=lambda column: (-weight[column], self.vocabulary.noms[column]))
+            matched = [self.vocabulary.noms[column] for column in ordered if column in skills]
+            missing = [self.vocabulary.noms[column] for column in ordered if column not in skills]
+            total = sum(weight.values())
+            percentage = round(100 * sum(weight[column] for column in offer_skills & skills) / total) if total else None
+
+            alternatives = []
+            if len(offers) and skills:
+                coverage, covered = self.score_all(skills)
+                # Offres avec trop peu de compétences reconnues : un taux de 100 % n'y aurait pas de sens
+                coverage[np.diff(weights.indptr) < MIN_OFFER_SKILLS] = 0
+                excluded = france_travail_offer(offer)['content_key']
+                candidates = min(top_n + 1, len(offers))
+                best = np.argpartition(-coverage, candidates - 1)[:candidates]
+                for i in sorted(best, key=lambda i: (-coverage[i], -covered[i])):
+                    if coverage[i] <= 0 or offers[i]['content_key'] == excluded or len(alternatives) >= top_n:
+                        continue
+                    row = weights.indices[weights.indptr[i]:weights.indptr[i + 1]]
+                    alternatives.append({
+                        **offers[i],
+                        'percentage': round(100 * coverage[i]),
+                        'matched': [self.vocabulary.noms[column] for column in row if column in skills]
+                    })
+            self.counters['matches'] += 1
+        return {
+            'percentage': percentage,
+            'matched': matched,
+            'missing': missing,
+            'alternatives': alternatives,
+            'offers_scored': len(offers),
+            'elapsed_ms': (time.perf_counter() - start) * 1000
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_matching_engine():
+    """Moteur de matching partagé par tout le bot, créé au premier appel"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = MatchingEngine()
+    return _engine
@@ -0,0 +1,327 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+# Base locale des offres récupérées par le bot (France Travail et Indeed).
+# Les offres étaient jetées une fois l'embed envoyé ; elles sont maintenant conservées dans une base SQLite
+# avec un schéma commun aux deux sources et un index plein texte (FTS5) sur le titre, l'entreprise et la description.
+# La base permet de répondre localement à une recherche "/scrape" (mots-clés + lieu) et sert de corpus d'analyse.
+
+DEFAULT_PATH = os.getenv('OFFER_STORE_PATH', 'offers.db')
+
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS offers (
+    offer_key   TEXT PRIMARY KEY,   -- clé de déduplication : "source:identifiant" (ou "source:url" sans identifiant)
+    source      TEXT NOT NULL,      -- 'france_travail', 'indeed', ...
+    source_id   TEXT,
+    title       TEXT NOT NULL DEFAULT '',
+    company     TEXT NOT NULL DEFAULT '',
+    location    TEXT NOT NULL DEFAULT '',
+    location_norm TEXT NOT NULL DEFAULT '',
+    contract    TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    url         TEXT,
+    salary      TEXT,
+    date_posted TEXT,               -- date ISO (AAAA-MM-JJ...) fournie par la source, si connue
+    content_key TEXT NOT NULL,      -- même offre publiée sur plusieurs sources (titre + entreprise + ville)
+    first_seen  REAL NOT NULL,
+    last_seen   REAL NOT NULL,
+    closed_at   REAL                -- date à laquelle l'offre a disparu des résultats de la source (voir harvester.py)
+);
+CREATE INDEX IF NOT EXISTS offers_content_key ON offers(content_key);
+CREATE INDEX IF NOT EXISTS offers_last_seen ON offers(last_seen);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS offers_fts USING fts5(
+    title, company, description,
+    content='offers', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS offers_ai AFTER INSERT ON offers BEGIN
+    INSERT INTO offers_fts(rowid, title, company, description)
+    VALUES (new.rowid, new.title, new.company, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS offers_ad AFTER DELETE ON offers BEGIN
+    INSERT INTO offers_fts(offers_fts, rowid, title, company, description)
+    VALUES ('delete', old.rowid, old.title, old.company, old.description);
+END;
+CREATE TABLE IF NOT EXISTS target_offers (
+    target_key  TEXT NOT NULL,      -- cible de collecte (source + mots-clés + lieu) ayant renvoyé l'offre
+    offer_key   TEXT NOT NULL,
+    last_seen   REAL NOT NULL,
+    PRIMARY KEY (target_key, offer_key)
+);
+CREATE TABLE IF NOT EXISTS harvest_checkpoints (
+    target_key      TEXT PRIMARY KEY,
+    last_success    REAL NOT NULL,  -- début de la dernière collecte réussie
+    last_full_sweep REAL NOT NULL   -- début de la dernière collecte complète (sans filtre de date)
+);
+
+CREATE TRIGGER IF NOT EXISTS offers_au AFTER UPDATE OF title, company, description ON offers BEGIN
+    INSERT INTO offers_fts(offers_fts, rowid, title, company, description)
+    VALUES ('delete', old.rowid, old.title, old.company, old.description);
+    INSERT INTO offers_fts(rowid, title, company, description)
+    VALUES (new.rowid, new.title, new.company, new.description);
+END;
+"""
+
+FIELDS = ('offer_key', 'source', 'source_id', 'title', 'company', 'location', 'location_norm', 'contract',
+          'description', 'url', 'salary', 'date_posted', 'content_key')
+
+
+def normalize_text(text):
+    """Majuscules, sans accents ni ponctuation, espaces simples (ex: "Saint-Étienne" -> "SAINT ETIENNE")"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^\w]+', ' ', text.upper()).split())
+
+
+def city_of(location):
+    """Ville d'un lieu, quel que soit le format de la source ("35 - RENNES", "Rennes, Bretagne, France")"""
+    location = re.sub(r'^\s*\d+[AB]?\s*-\s*', '', location or '')
+    return normalize_text(location.split(',')[0])
+
+
+def make_offer(source, source_id, title, company, location, contract='', description='', url=None,
+               salary=None, date_posted=None):
+    """Construit une offre au schéma commun, avec ses clés de déduplication"""
+    source_id = str(source_id) if source_id not in (None, '') else None
+    offer_key = f"{source}:{source_id or url or hashlib.sha1(f'{title}|{company}|{location}'.encode()).hexdigest()}"
+    content = f"{normalize_text(title)}|{normalize_text(company)}|{city_of(location)}"
+    return {
+        'offer_key': offer_key,
+        'source': source,
+        'source_id': source_id,
+        'title': title or '',
+        'company': company or '',
+        'location': location or '',
+        'location_norm': normalize_text(location),
+        'contract': contract or '',
+        'description': description or '',
+        'url': url,
+        'salary': salary or None,
+        'date_posted': str(date_posted)[:19] if date_posted else None,
+        'content_key': hashlib.sha1(content.encode()).hexdigest()[:16]
+    }
+
+
+def france_travail_offer(offre):
+    """Offre formatée par FranceTravailAPI.formater_offre -> schéma commun"""
+    offer_id = offre.get('id')
+    return make_offer(
+        'france_travail', offer_id,
+        offre.get('titre'), offre.get('entreprise'), offre.get('lieu'),
+        contract=offre.get('contrat'),
+        description=offre.get('description'),
+        url=f"https://candidat.francetravail.fr/offres/recherche/detail/{offer_id}" if offer_id else None,
+        date_posted=offre.get('date_creation')
+    )
+
+
+def indeed_offer(job):
+    """Ligne de clean_job_data (jobspy) -> schéma commun"""
+    def value(name):
+        v = job.get(name)
+        # Les valeurs manquantes de pandas (NaN, NaT) ne sont pas égales à elles-mêmes
+        return None if v is None or v != v else v
+    return make_offer(
+        value('job_site') or 'indeed', value('job_id'),
+        value('title'), value('company'), value('location'),
+        contract=value('job_type'),
+        description=value('description'),
+        url=value('job_url'),
+        salary=value('salary'),
+        date_posted=value('date_posted')
+    )
+
+
+def fts_query(keywords):
+    """Mots-clés saisis -> requête FTS5 (tous les mots, en préfixe : "data analys" trouve "analyste")"""
+    words = re.findall(r'\w+', keywords or '')
+    return ' AND '.join(f'"{word}"*' for word in words)
+
+
+class OfferStore:
+    """Base SQLite des offres, partageable entre threads (une connexion protégée par un verrou)"""
+
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+            if version == 1:
+                # Version 2 : suivi des offres disparues (closed_at) par la collecte en arrière-plan
+                self._conn.execute('ALTER TABLE offers ADD COLUMN closed_at REAL')
+            self._conn.executescript(SCHEMA)
+            self._conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def upsert_offers(self, offers, target_key=None):
+        """
+        Ajoute ou met à jour des offres au schéma commun (voir make_offer). Une offre revue est rouverte.
+        target_key : cible de collecte ayant renvoyé ces offres (voir close_missing)
+        Retourne (nombre d'offres nouvelles, nombre d'offres déjà connues)
+        """
+        now = time.time()
+        columns = ', '.join(FIELDS + ('first_seen', 'last_seen'))
+        placeholders = ', '.join('?' * (len(FIELDS) + 2))
+        updates = ', '.join(f'{field} = excluded.{field}' for field in FIELDS[1:] if field != 'date_posted')
+        sql = (
+            f'INSERT INTO offers ({columns}) VALUES ({placeholders}) '
+            f'ON CONFLICT(offer_key) DO UPDATE SET {updates}, '
+            f'date_posted = COALESCE(excluded.date_posted, offers.date_posted), last_seen = excluded.last_seen, closed_at = NULL'
+        )
+        keys = {offer['offer_key'] for offer in offers}
+        with self._lock, self._conn:
+            known = self._known_keys(list(keys))
+            self._conn.executemany(sql, [tuple(offer[f] for f in FIELDS) + (now, now) for offer in offers])
+            if target_key is not None:
+                self._conn.executemany(
+                    'INSERT INTO target_offers (target_key, offer_key, last_seen) VALUES (?, ?, ?) '
+                    'ON CONFLICT(target_key, offer_key) DO UPDATE SET last_seen = excluded.last_seen',
+                    [(target_key, key, now) for key in keys]
+                )
+        return len(keys - known), len(known)
+
+    def _known_keys(self, keys):
+        known = set()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = self._conn.execute(
+                f"SELECT offer_key FROM offers WHERE offer_key IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            known.update(row[0] for row in rows)
+        return known
+
+    def close_missing(self, target_key, since):
+        """
+        Marque comme fermées les offres de la cible qui n'ont pas été revues depuis since
+        (à appeler après une collecte complète de la cible). Retourne le nombre d'offres fermées.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'UPDATE offers SET closed_at = ? WHERE closed_at IS NULL AND offer_key IN '
+                '(SELECT offer_key FROM target_offers WHERE target_key = ? AND last_seen < ?)',
+                (time.time(), target_key, since)
+            )
+            return cursor.rowcount
+
+    def get_checkpoint(self, target_key):
+        """Dernier point de reprise d'une cible de collecte ({'last_success', 'last_full_sweep'}), ou None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT last_success, last_full_sweep FROM harvest_checkpoints WHERE target_key = ?', (target_key,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def save_checkpoint(self, target_key, last_success, last_full_sweep):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO harvest_checkpoints (target_key, last_success, last_full_sweep) VALUES (?, ?, ?) '
+                'ON CONFLICT(target_key) DO UPDATE SET last_success = excluded.last_success, '
+                'last_full_sweep = excluded.last_full_sweep',
+                (target_key, last_success, last_full_sweep)
+            )
+
+    def search(self, keywords, location=None, limit=25, max_age_days=None, include_closed=False):
+        """
+        Recherche locale type /scrape : offres contenant tous les mots-clés (titre, entreprise, description),
+        dont le lieu contient la ville demandée, classées par pertinence (bm25) puis par date de dernière vue.
+        Une même offre publiée sur plusieurs sources n'est retournée qu'une fois. Les offres fermées sont exclues.
+        """
+        query = fts_query(keywords)
+        conditions, params = [], []
+        if not include_closed:
+            conditions.append('o.closed_at IS NULL')
+        if query:
+            conditions.append('offers_fts MATCH ?')
+            params.append(query)
+        if location:
+            conditions.append('o.location_norm LIKE ?')
+            params.append(f'%{normalize_text(location)}%')
+        if max_age_days is not None:
+            conditions.append('o.last_seen >= ?')
+            params.append(time.time() - max_age_days * 86400)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        order = 'bm25(offers_fts), o.last_seen DESC' if query else 'o.last_seen DESC'
+        sql = (
+            f'SELECT o.* FROM offers_fts JOIN offers o ON o.rowid = offers_fts.rowid {where} '
+            f'ORDER BY {order} LIMIT ?'
+        ) if query else f'SELECT o.* FROM offers o {where} ORDER BY {order} LIMIT ?'
+        # On lit un peu plus que demandé pour compenser les doublons entre sources
+        params.append(limit * 2)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        results, seen = [], set()
+        for row in rows:
+            if row['content_key'] in seen:
+                continue
+            seen.add(row['content_key'])
+            results.append(dict(row))
+            if len(results) >= limit:
+                break
+        return results
+
+    def search_scrape_format(self, keywords, location, limit=25):
+        """Même résultat que recherche_offres de France Travail ({"ville", "nombre_offres", "offres"} ou {"message"})"""
+        offers = self.search(keywords, location, limit)
+        if not offers:
+            return {'message': f"Aucune offre trouvée pour '{keywords}' à {location}."}
+        return {
+            'ville': location,
+            'nombre_offres': len(offers),
+            'offres': [
+                {
+                    'id': offer['source_id'] if offer['source'] == 'france_travail' else '',
+                    'titre': offer['title'],
+                    'entreprise': offer['company'],
+                    'lieu': offer['location'],
+                    'contrat': offer['contract'],
+                    'description': offer['description'],
+                    'url': offer['url']
+                }
+                for offer in offers
+            ]
+        }
+
+    def all_offers(self, include_closed=False):
+        """Toutes les offres de la base (sans les offres fermées par défaut), pour les analyses en mémoire (matching.py)"""
+        where = '' if include_closed else 'WHERE closed_at IS NULL'
+        with self._lock:
+            rows = self._conn.execute(f'SELECT * FROM offers {where} ORDER BY last_seen DESC').fetchall()
+        return [dict(row) for row in rows]
+
+    def revision(self):
+        """Change dès qu'une offre est ajoutée, revue ou fermée : permet de savoir si un index construit sur la base est à jour"""
+        with self._lock:
+            return tuple(self._conn.execute('SELECT COUNT(*), MAX(last_seen), MAX(closed_at) FROM offers').fetchone())
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM offers').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_offer_store():
+    """Base d'offres partagée par tout le bot, ouverte au premier appel"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = OfferStore()
+    return _store
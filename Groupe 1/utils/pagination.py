@@ -0,0 +1,91 @@
+import math
+from abc import ABC, abstractmethod
+
+import discord
+
+
+class PageSelect(discord.ui.Select):
+    """Liste déroulante des éléments de la page courante d'une PaginatedView"""
+
+    def __init__(self, paginated_view):
+        start, end = paginated_view.page_bounds()
+        options = [paginated_view.make_option(i, paginated_view.items[i]) for i in range(start, end)]
+        super().__init__(
+            placeholder=f"{paginated_view.placeholder} ({start + 1}-{end} sur {len(paginated_view.items)})",
+            options=options,
+            row=0
+        )
+
+    async def callback(self, interaction: discord.Interaction):
+        index = int(self.values[0])
+        await self.view.on_item_selected(interaction, self.view.items[index])
+
+
+class PaginatedView(discord.ui.View, ABC):
+    """
+    Parcours page par page d'une liste de résultats (au-delà de la limite de 25 options de Discord).
+    La vue garde une référence vers la liste complète, sans la copier : plusieurs vues ouvertes sur le même
+    résultat de recherche (mis en cache) partagent donc la même liste. Seule la page courante est rendue
+    (options de la liste déroulante et embed), à la demande, sans relancer la recherche.
+    Les sous-classes doivent définir make_option et on_item_selected (méthodes abstraites) et, si besoin, render_page.
+    """
+
+    PAGE_SIZE = 10
+    placeholder = "Sélectionner un élément"
+
+    def __init__(self, items, timeout=300, page_size=None):
+        super().__init__(timeout=timeout)
+        self.items = items
+        self.page_size = page_size or self.PAGE_SIZE
+        self.page = 0
+        self.select = None
+        self.refresh_items()
+
+    @property
+    def page_count(self):
+        return max(1, math.ceil(len(self.items) / self.page_size))
+
+    def page_bounds(self):
+        """Index (début, fin exclue) des éléments de la page courante"""
+        start = self.page * self.page_size
+        return start, min(start + self.page_size, len(self.items))
+
+    @abstractmethod
+    def make_option(self, index, item):
+        """discord.SelectOption représentant l'élément d'index donné (sa valeur doit être str(index))"""
+
+    @abstractmethod
+    async def on_item_selected(self, interaction, item):
+        """Appelée quand l'utilisateur choisit un élément dans la liste déroulante"""
+
+    def render_page(self):
+        """Embed de la page courante, ou None pour ne modifier que la vue"""
+        return None
+
+    def refresh_items(self):
+        """Reconstruit la liste déroulante de la page courante et l'état des boutons"""
+        if self.select is not None:
+            self.remove_item(self.select)
+            self.select = None
+        if self.items:
+            self.select = PageSelect(self)
+            self.add_item(self.select)
+        self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+
+    async def show_page(self, interaction, page):
+        self.page = max(0, min(page, self.page_count - 1))
+        self.refresh_items()
+        embed = self.render_page()
+        if embed is None:
+            await interaction.response.edit_message(view=self)
+        else:
+            await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="◀️ Précédent", style=discord.ButtonStyle.secondary, row=1)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, self.page - 1)
+
+    @discord.ui.button(label="Suivant ▶️", style=discord.ButtonStyle.secondary, row=1)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, self.page + 1)
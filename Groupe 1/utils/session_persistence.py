@@ -0,0 +1,126 @@
+import atexit
+import threading
+import time
+
+from utils.shared_state import get_backend
+
+# Sauvegarde des sessions utilisateurs (CV, offre sélectionnée, analyse) dans le backend d'état partagé
+# (shared_state.py, base SQLite locale par défaut), pour qu'un redémarrage du bot n'oblige plus tout le monde
+# à renvoyer son CV, et pour qu'une session modifiée sur un processus du bot soit visible sur les autres.
+# Écriture différée (write-behind) : les commandes ne font que marquer la session comme modifiée, en mémoire ;
+# un thread regroupe toutes les sessions modifiées pendant flush_delay secondes et les écrit en une seule transaction.
+# Seuls les champs modifiés sont écrits : deux processus qui modifient des champs différents ne s'écrasent pas.
+# Au redémarrage, une session n'est relue qu'au premier accès de l'utilisateur.
+
+NAMESPACE = 'sessions'
+
+class SessionPersistence:
+    """
+    Persistance différée des sessions : mark_dirty sur le chemin critique (en mémoire uniquement),
+    flush groupé en arrière-plan, load au premier accès, close (avec flush final) à l'arrêt du bot
+    """
+
+    def __init__(self, backend=None, flush_delay=2.0, retention_days=30):
+        self.backend = backend or get_backend()
+        self.flush_delay = flush_delay
+        # Une session inutilisée pendant retention_days jours est supprimée par le backend
+        self.ttl = retention_days * 86400 if retention_days is not None else None
+        # user_id -> (UserData, champs modifiés depuis la dernière écriture)
+        self._dirty = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self.counters = {
+            'marked': 0,
+            'flushes': 0,
+            'rows_written': 0,
+            'loads': 0,
+            'errors': 0
+        }
+        atexit.register(self.close)
+
+    def mark_dirty(self, user, field):
+        """
+        Note qu'un champ de la session a changé ; il sera écrit lors du prochain flush groupé
+        """
+        with self._cond:
+            if self._closed:
+                return
+            _, fields = self._dirty.setdefault(user.user_id, (user, set()))
+            fields.add(field)
+            self.counters['marked'] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sessions-write-behind', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def is_dirty(self, user_id):
+        with self._cond:
+            return user_id in self._dirty
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            # Laisse le temps aux autres modifications de la rafale d'arriver : elles partiront dans le même commit
+            time.sleep(self.flush_delay)
+            self.flush()
+
+    def flush(self):
+        """
+        Écrit toutes les sessions modifiées en une transaction ; retourne le nombre de sessions écrites
+        """
+        with self._cond:
+            batch, self._dirty = self._dirty, {}
+        if not batch:
+            return 0
+        updates = {
+            user_id: {field: getattr(user, field) for field in fields}
+            for user_id, (user, fields) in batch.items()
+        }
+        try:
+            self.backend.update_many(NAMESPACE, updates, ttl=self.ttl)
+        except Exception as e:
+            print(f"Erreur lors de la sauvegarde des sessions: {e}")
+            self.counters['errors'] += 1
+            # Les champs seront réécrits au prochain flush, avec ceux modifiés entre-temps
+            with self._cond:
+                for user_id, (user, fields) in batch.items():
+                    self._dirty.setdefault(user_id, (user, set()))[1].update(fields)
+            return 0
+        self.counters['flushes'] += 1
+        self.counters['rows_written'] += len(updates)
+        return len(updates)
+
+    def load(self, user_id):
+        """
+        (champs, version) de la session enregistrée de l'utilisateur, ou None
+        """
+        entry = self.backend.get_entry(NAMESPACE, user_id)
+        if entry is None:
+            return None
+        self.counters['loads'] += 1
+        return entry
+
+    def version(self, user_id):
+        """
+        Version de la session enregistrée (incrémentée à chaque écriture, par n'importe quel processus)
+        """
+        return self.backend.version(NAMESPACE, user_id)
+
+    def close(self):
+        """
+        Arrête l'écriture en arrière-plan et écrit les dernières modifications
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        # Laisse le thread terminer un éventuel flush en cours avant le flush final
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(self.flush_delay + 5)
+        self.flush()
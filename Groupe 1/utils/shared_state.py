@@ -0,0 +1,325 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# État partagé entre les processus du bot (déploiement en plusieurs processus / shards, voir bot.py).
+# Un backend fournit trois services :
+#  - un stockage clé/valeur par espace de noms, versionné, avec durée de vie optionnelle
+#    (sessions utilisateurs, cache des recherches France Travail) ;
+#  - des baux (leases) : un seul processus à la fois détient un nom pendant une durée donnée ;
+#  - des files de tâches : une tâche n'est traitée que par un processus ; si celui-ci s'arrête sans la terminer,
+#    elle redevient disponible à l'expiration de son bail (collecte en arrière-plan, voir harvester.py).
+#
+# SQLiteBackend : implémentation locale, une base SQLite (WAL) partagée par les processus d'une même machine.
+# MemoryBackend : même interface, limité à un seul processus (tests, déploiement sans base).
+# D'autres implémentations (Redis...) peuvent être ajoutées à BACKENDS.
+#
+# Configuration (variables d'environnement) :
+#   SHARED_STATE_BACKEND=sqlite|memory   SHARED_STATE_DB=bot_state.db
+
+
+def process_id():
+    """Identifiant du processus courant (machine:pid), utilisé comme propriétaire des baux et des tâches"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def multi_process():
+    """Vrai si le bot tourne en plusieurs processus (SHARD_IDS ne couvre qu'une partie des shards)"""
+    return bool(os.getenv('SHARD_IDS'))
+
+
+class MemoryBackend:
+    """État partagé entre les tâches d'un seul processus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kv = {}         # (espace, clé) -> (valeur, version, expire_à)
+        self._leases = {}     # nom -> (propriétaire, expire_à)
+        self._jobs = {}       # id -> tâche
+        self._next_job_id = 1
+
+    def _entry(self, namespace, key):
+        entry = self._kv.get((namespace, str(key)))
+        if entry is not None and entry[2] is not None and entry[2] <= time.time():
+            del self._kv[(namespace, str(key))]
+            return None
+        return entry
+
+    def get_entry(self, namespace, key):
+        with self._lock:
+            entry = self._entry(namespace, key)
+            return None if entry is None else (entry[0], entry[1])
+
+    def get(self, namespace, key):
+        entry = self.get_entry(namespace, key)
+        return None if entry is None else entry[0]
+
+    def version(self, namespace, key):
+        entry = self.get_entry(namespace, key)
+        return 0 if entry is None else entry[1]
+
+    def set(self, namespace, key, value, ttl=None):
+        with self._lock:
+            entry = self._entry(namespace, key)
+            version = (entry[1] if entry else 0) + 1
+            self._kv[(namespace, str(key))] = (value, version, time.time() + ttl if ttl else None)
+            return version
+
+    def update_many(self, namespace, updates, ttl=None):
+        with self._lock:
+            for key, fields in updates.items():
+                entry = self._entry(namespace, key)
+                value = {**(entry[0] if entry else {}), **fields}
+                self._kv[(namespace, str(key))] = (value, (entry[1] if entry else 0) + 1, time.time() + ttl if ttl else None)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._kv.pop((namespace, str(key)), None)
+
+    def acquire_lease(self, name, owner, ttl):
+        with self._lock:
+            lease = self._leases.get(name)
+            if lease is not None and lease[0] != owner and lease[1] > time.time():
+                return False
+            self._leases[name] = (owner, time.time() + ttl)
+            return True
+
+    def release_lease(self, name, owner):
+        with self._lock:
+            if self._leases.get(name, (None,))[0] == owner:
+                del self._leases[name]
+
+    def enqueue(self, queue, payload, dedupe_key=None):
+        with self._lock:
+            if dedupe_key is not None and any(
+                job['queue'] == queue and job['dedupe_key'] == dedupe_key for job in self._jobs.values()
+            ):
+                return False
+            self._jobs[self._next_job_id] = {
+                'queue': queue, 'payload': payload, 'dedupe_key': dedupe_key,
+                'owner': None, 'available_at': time.time(), 'attempts': 0
+            }
+            self._next_job_id += 1
+            return True
+
+    def claim(self, queue, owner, lease_seconds):
+        with self._lock:
+            now = time.time()
+            for job_id, job in sorted(self._jobs.items()):
+                if job['queue'] == queue and job['available_at'] <= now:
+                    job.update(owner=owner, available_at=now + lease_seconds, attempts=job['attempts'] + 1)
+                    return job_id, job['payload'], job['attempts']
+            return None
+
+    def complete(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def retry(self, job_id, delay=0):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(owner=None, available_at=time.time() + delay)
+
+    def close(self):
+        pass
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    namespace  TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    value      TEXT NOT NULL,   -- JSON
+    version    INTEGER NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name       TEXT PRIMARY KEY,
+    owner      TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue        TEXT NOT NULL,
+    dedupe_key   TEXT,
+    payload      TEXT NOT NULL,   -- JSON
+    owner        TEXT,
+    available_at REAL NOT NULL,   -- tâche en attente : date de disponibilité ; en cours : fin du bail
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    created_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_available ON jobs(queue, available_at);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_dedupe ON jobs(queue, dedupe_key) WHERE dedupe_key IS NOT NULL;
+"""
+
+
+class SQLiteBackend:
+    """
+    État partagé par les processus d'une même machine, dans une base SQLite en mode WAL.
+    Les lectures-modifications-écritures se font dans des transactions BEGIN IMMEDIATE : deux processus
+    ne peuvent pas réclamer la même tâche ni prendre le même bail.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('SHARED_STATE_DB', 'bot_state.db')
+        # isolation_level=None : les transactions sont ouvertes explicitement (voir _transaction)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(SCHEMA)
+            self._conn.execute('DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?', (time.time(),))
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def _read(self, sql, params):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def get_entry(self, namespace, key):
+        """(valeur, version) de la clé, ou None si elle n'existe pas ou a expiré"""
+        row = self._read(
+            'SELECT value, version FROM kv WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)',
+            (namespace, str(key), time.time())
+        )
+        return None if row is None else (json.loads(row[0]), row[1])
+
+    def get(self, namespace, key):
+        entry = self.get_entry(namespace, key)
+        return None if entry is None else entry[0]
+
+    def version(self, namespace, key):
+        """Version de la clé (incrémentée à chaque écriture), 0 si elle n'existe pas"""
+        row = self._read(
+            'SELECT version FROM kv WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)',
+            (namespace, str(key), time.time())
+        )
+        return 0 if row is None else row[0]
+
+    def set(self, namespace, key, value, ttl=None):
+        """Remplace la valeur de la clé ; retourne sa nouvelle version"""
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT INTO kv (namespace, key, value, version, expires_at) VALUES (?, ?, ?, 1, ?) '
+                'ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, version = version + 1, '
+                'expires_at = excluded.expires_at',
+                (namespace, str(key), json.dumps(value, ensure_ascii=False, default=str), time.time() + ttl if ttl else None)
+            )
+            row = conn.execute('SELECT version FROM kv WHERE namespace = ? AND key = ?', (namespace, str(key))).fetchone()
+        return row[0]
+
+    def update_many(self, namespace, updates, ttl=None):
+        """
+        Fusionne des champs dans les valeurs (dictionnaires) de plusieurs clés, en une transaction :
+        {clé: {champ: valeur}}. Les champs absents de la mise à jour gardent la valeur écrite par les autres processus.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            for key, fields in updates.items():
+                row = conn.execute(
+                    'SELECT value, version, expires_at FROM kv WHERE namespace = ? AND key = ?', (namespace, str(key))
+                ).fetchone()
+                current = json.loads(row[0]) if row is not None and (row[2] is None or row[2] > now) else {}
+                conn.execute(
+                    'INSERT OR REPLACE INTO kv (namespace, key, value, version, expires_at) VALUES (?, ?, ?, ?, ?)',
+                    (
+                        namespace, str(key), json.dumps({**current, **fields}, ensure_ascii=False, default=str),
+                        (row[1] if row is not None else 0) + 1, now + ttl if ttl else None
+                    )
+                )
+
+    def delete(self, namespace, key):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM kv WHERE namespace = ? AND key = ?', (namespace, str(key)))
+
+    def acquire_lease(self, name, owner, ttl):
+        """Prend (ou prolonge) le bail name pour ttl secondes ; False s'il est détenu par un autre processus"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute('SELECT owner, expires_at FROM leases WHERE name = ?', (name,)).fetchone()
+            if row is not None and row[0] != owner and row[1] > now:
+                return False
+            conn.execute('INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)', (name, owner, now + ttl))
+        return True
+
+    def release_lease(self, name, owner):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM leases WHERE name = ? AND owner = ?', (name, owner))
+
+    def enqueue(self, queue, payload, dedupe_key=None):
+        """Ajoute une tâche ; False si une tâche de même dedupe_key est déjà en attente ou en cours"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO jobs (queue, dedupe_key, payload, available_at, created_at) VALUES (?, ?, ?, ?, ?)',
+                (queue, dedupe_key, json.dumps(payload, ensure_ascii=False), now, now)
+            )
+        return cursor.rowcount == 1
+
+    def claim(self, queue, owner, lease_seconds):
+        """
+        Réclame la plus ancienne tâche disponible (en attente, ou dont le bail a expiré) pour lease_seconds secondes.
+        Retourne (id, contenu, tentatives) ou None si la file est vide.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT id, payload, attempts FROM jobs WHERE queue = ? AND available_at <= ? ORDER BY id LIMIT 1',
+                (queue, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                'UPDATE jobs SET owner = ?, available_at = ?, attempts = attempts + 1 WHERE id = ?',
+                (owner, now + lease_seconds, row[0])
+            )
+        return row[0], json.loads(row[1]), row[2] + 1
+
+    def complete(self, job_id):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+    def retry(self, job_id, delay=0):
+        """Remet une tâche en attente (après un échec), disponible dans delay secondes"""
+        with self._transaction() as conn:
+            conn.execute('UPDATE jobs SET owner = NULL, available_at = ? WHERE id = ?', (time.time() + delay, job_id))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'memory': MemoryBackend
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Backend d'état partagé du processus (SHARED_STATE_BACKEND, sqlite par défaut), créé au premier appel"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = os.getenv('SHARED_STATE_BACKEND', 'sqlite')
+            if name not in BACKENDS:
+                raise ValueError(f"Backend d'état partagé inconnu : {name} (disponibles : {', '.join(BACKENDS)})")
+            _backend = BACKENDS[name]()
+        return _backend
@@ -0,0 +1,52 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Regroupe les appels identiques simultanés : tant qu'un appel pour une clé est en cours,
+    les demandes suivantes pour la même clé attendent son résultat au lieu de relancer la recherche.
+    Quand un serveur lance la même commande /scrape au même moment, une seule requête part vers l'API.
+    """
+
+    def __init__(self):
+        # clé -> tâche en cours
+        self._in_flight = {}
+        self.calls = 0
+        self.deduplicated = 0
+
+    async def do(self, key, fn):
+        """
+        Exécute fn() (fonction sans argument retournant une coroutine), sauf si un appel pour la même clé
+        est déjà en cours : dans ce cas, retourne son résultat (ou lève la même exception).
+        Retourne (résultat, partagé) où partagé indique si le résultat vient d'un appel déjà en cours.
+        """
+        self.calls += 1
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if shared:
+            self.deduplicated += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # shield : l'annulation d'un des demandeurs (interaction expirée...) n'annule pas l'appel des autres
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Marque l'exception comme lue si tous les demandeurs ont été annulés entre-temps
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        """Nombre d'appels reçus, d'appels dédupliqués et d'appels actuellement en cours"""
+        return {
+            'calls': self.calls,
+            'deduplicated': self.deduplicated,
+            'in_flight': len(self._in_flight)
+        }
+
+
+# Instance partagée par les commandes de recherche (/scrape, /scrape_internship)
+search_flights = SingleFlight()
@@ -0,0 +1,75 @@
+import difflib                       # Ancienne méthode de recherche, servant de référence
+import sys
+import time
+
+from cache_communes import CacheCommunes
+from index_communes import IndexCommunes
+
+# Compare l'index de recherche des communes (index_communes.py) avec l'ancienne recherche par difflib
+# sur une liste de villes réelles mal orthographiées : résultats obtenus et temps moyen par recherche.
+# Utilise le cache disque des communes ; s'il n'existe pas encore, le référentiel est téléchargé via l'API.
+#
+# Utilisation : python benchmark_communes.py [nombre_de_repetitions]
+
+SAISIES = [
+   "Renne", "Marseile", "Bordeau", "Toulouze", "Strasbour", "Montpelier", "Lile", "Nante",
+   "Grenobles", "Clermont Ferand", "Saint Etiene", "Aix en provance", "Perpigan", "Mulhouze",
+   "Colmarr", "Nancyy", "Metse", "Reim", "Le Havr", "Dijonn", "Amien", "Limoge", "Poitier",
+   "Orleans", "Tour", "Besancon", "Caen", "Rouan", "Brest", "Anger", "Nimes", "Avignont",
+   "Villeurbane", "Boulogne Bilancourt", "Saint Denis", "Argenteuil", "Montreuill", "Versaille",
+   "Cergy", "Vanne", "Quimpere", "La Rochele", "Biarits", "Annecy le vieu", "Chambery",
+   "Valence", "Saint Nazair", "Lorien", "Tourcoin", "Roubais", "Dunkerke", "Calai"
+]
+
+
+def recherche_difflib(communes, saisie):
+   # Reproduction de l'ancien FranceTravailAPI.find_commune_code (liste reconstruite et parcourue à chaque appel)
+   saisie = saisie.upper().replace("-", " ").strip()
+   noms_communes = [commune["libelle"] for commune in communes]
+   best_match = difflib.get_close_matches(saisie, noms_communes, n=1, cutoff=0.6)
+   if best_match:
+       for commune in communes:
+           if commune["libelle"] == best_match[0]:
+               return {"nom_corrige": best_match[0], "code_insee": commune["code"]}
+   return None
+
+
+def chronometrer(fonction, repetitions):
+   debut = time.perf_counter()
+   for _ in range(repetitions):
+       for saisie in SAISIES:
+           fonction(saisie)
+   return (time.perf_counter() - debut) / (repetitions * len(SAISIES))
+
+
+def main():
+   repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+   communes = CacheCommunes().charger()
+   if communes is None:
+       from scraping_group2 import FranceTravailAPI
+       communes = FranceTravailAPI().communes
+
+   debut = time.perf_counter()
+   index = IndexCommunes(communes)
+   construction = time.perf_counter() - debut
+   print(f"{len(communes)} communes, index de {len(index)} noms construit en {construction * 1000:.0f} ms\n")
+
+   identiques = 0
+   print(f"{'Saisie':<22} {'difflib':<28} {'index':<28}")
+   for saisie in SAISIES:
+       attendu = recherche_difflib(communes, saisie)
+       obtenu = index.rechercher(saisie)
+       identiques += attendu == obtenu
+       marque = "" if attendu == obtenu else "  ≠"
+       print(f"{saisie:<22} {str(attendu and attendu['nom_corrige']):<28} {str(obtenu and obtenu['nom_corrige']):<28}{marque}")
+
+   temps_difflib = chronometrer(lambda saisie: recherche_difflib(communes, saisie), 1)
+   temps_index = chronometrer(index.rechercher, repetitions * 100)
+   print(f"\nRésultats identiques : {identiques}/{len(SAISIES)}")
+   print(f"difflib : {temps_difflib * 1000:.2f} ms par recherche")
+   print(f"index   : {temps_index * 1000:.3f} ms par recherche (x{temps_difflib / temps_index:.0f})")
+
+
+if __name__ == "__main__":
+   main()
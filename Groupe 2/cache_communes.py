@@ -0,0 +1,79 @@
+import json                          # Format de stockage du référentiel sur disque
+import os                            # Chemins, variables d'environnement et remplacement atomique du fichier
+import time                          # Horodatage de la dernière récupération
+
+# Cache local du référentiel des communes de France Travail.
+# Le référentiel (~35 000 communes) change très rarement : plutôt que de le retélécharger à chaque
+# création de FranceTravailAPI, on le garde sur disque et on ne le rafraîchit qu'en arrière-plan.
+#
+# Format du fichier : un JSON "en colonnes", beaucoup plus compact et rapide à charger que la liste
+# de dictionnaires renvoyée par l'API (les clés ne sont pas répétées 35 000 fois) :
+#   {"version": 1, "recupere_le": 1718000000.0, "codes": ["01001", ...], "libelles": ["L ABERGEMENT CLEMENCIAT", ...]}
+
+FORMAT_VERSION = 1
+
+# Emplacement et intervalle de rafraîchissement par défaut, surchargeables par variables d'environnement
+CHEMIN_PAR_DEFAUT = os.getenv(
+   "FRANCE_TRAVAIL_CACHE_COMMUNES",
+   os.path.join(os.path.dirname(os.path.abspath(__file__)), "communes_cache.json")
+)
+INTERVALLE_PAR_DEFAUT = int(os.getenv("FRANCE_TRAVAIL_RAFRAICHISSEMENT_COMMUNES", 7 * 24 * 3600))  # 7 jours
+
+
+class CacheCommunes:
+   def __init__(self, chemin=None, intervalle_rafraichissement=None):
+       self.chemin = chemin or CHEMIN_PAR_DEFAUT
+       self.intervalle_rafraichissement = (
+           INTERVALLE_PAR_DEFAUT if intervalle_rafraichissement is None else intervalle_rafraichissement
+       )
+       # Horodatage (time.time()) de la récupération du référentiel chargé, None si rien n'a été chargé
+       self.recupere_le = None
+
+
+   def charger(self):
+       # Charge le référentiel depuis le disque.
+       # Retourne la liste des communes au format de l'API ([{"code": ..., "libelle": ...}, ...]) ou None si le
+       # fichier est absent, illisible ou d'une version différente.
+       try:
+           with open(self.chemin, "r", encoding="utf-8") as f:
+               data = json.load(f)
+       except (OSError, ValueError):
+           return None
+
+       if data.get("version") != FORMAT_VERSION:
+           return None
+
+       codes = data.get("codes") or []
+       libelles = data.get("libelles") or []
+       if not codes or len(codes) != len(libelles):
+           return None
+
+       self.recupere_le = data.get("recupere_le")
+       return [{"code": code, "libelle": libelle} for code, libelle in zip(codes, libelles)]
+
+
+   def sauvegarder(self, communes):
+       # Enregistre le référentiel sur disque au format en colonnes.
+       # L'écriture passe par un fichier temporaire puis os.replace pour ne jamais laisser un cache à moitié écrit.
+       maintenant = time.time()
+       data = {
+           "version": FORMAT_VERSION,
+           "recupere_le": maintenant,
+           "codes": [commune["code"] for commune in communes],
+           "libelles": [commune["libelle"] for commune in communes]
+       }
+       dossier = os.path.dirname(self.chemin)
+       if dossier:
+           os.makedirs(dossier, exist_ok=True)
+       chemin_temporaire = f"{self.chemin}.tmp"
+       with open(chemin_temporaire, "w", encoding="utf-8") as f:
+           json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+       os.replace(chemin_temporaire, self.chemin)
+       self.recupere_le = maintenant
+
+
+   def est_perime(self):
+       # Indique si le référentiel chargé doit être rafraîchi (jamais chargé ou plus vieux que l'intervalle configuré).
+       if self.recupere_le is None:
+           return True
+       return time.time() - self.recupere_le > self.intervalle_rafraichissement
@@ -0,0 +1,209 @@
+import asyncio                       # Rafraîchissement des entrées périmées en tâche de fond
+import time                          # Dates d'expiration des entrées
+from collections import OrderedDict  # Ordre d'utilisation des entrées, pour l'éviction LRU
+
+# Cache en mémoire des résultats de AsyncFranceTravailAPI.recherche_offres.
+# Les recherches populaires ("data analyst" à Paris...) sont répétées en permanence par les utilisateurs du bot :
+# on garde leurs résultats quelques minutes au lieu d'interroger l'API à chaque fois.
+#
+#  - taille bornée : au-delà de taille_max entrées, la moins récemment utilisée est supprimée (LRU) ;
+#  - durée de vie par entrée : ttl pour une liste d'offres, ttl_negatif (plus court) pour "Aucune offre trouvée"
+#    et "Commune introuvable" ; les autres erreurs (API indisponible...) ne sont jamais mises en cache ;
+#  - stale-while-revalidate : pendant delai_perime secondes après son expiration, une entrée est encore renvoyée
+#    immédiatement, pendant qu'une tâche de fond la rafraîchit auprès de l'API ;
+#  - compteurs (hits, misses, évictions...) consultables avec statistiques() pour dimensionner le cache ;
+#  - partage optionnel entre processus (bot en plusieurs shards, voir partager) : les résultats sont aussi écrits
+#    dans un stockage partagé, et une clé absente en mémoire y est cherchée avant d'interroger l'API.
+#    Le stockage partagé (SQLite par défaut) est bloquant : il n'est lu et écrit que dans un thread
+#    (asyncio.to_thread), jamais sur la boucle d'événements du bot ; les écritures partent en tâche de fond.
+#
+# Les valeurs renvoyées sont partagées entre les appelants : elles ne doivent pas être modifiées.
+
+MESSAGE_COMMUNE_INTROUVABLE = "Commune introuvable. Vérifiez l'orthographe."
+
+
+class CacheResultats:
+   def __init__(self, taille_max=256, ttl=600, ttl_negatif=120, delai_perime=1800):
+       self.taille_max = taille_max
+       self.ttl = ttl
+       self.ttl_negatif = ttl_negatif
+       self.delai_perime = delai_perime
+       # clé -> (résultat, frais jusqu'à, utilisable jusqu'à), de la moins récemment utilisée à la plus récente
+       self.entrees = OrderedDict()
+       # clé -> tâche de rafraîchissement en cours
+       self._rafraichissements = {}
+       # Écritures dans le stockage partagé en cours (références gardées jusqu'à la fin des tâches)
+       self._ecritures = set()
+       # Stockage partagé entre processus (get_entry / set, voir Groupe 1/utils/shared_state.py), None par défaut
+       self.partage = None
+       self.espace = None
+       self.compteurs = {
+           "hits": 0,
+           "hits_perimes": 0,
+           "misses": 0,
+           "evictions": 0,
+           "hits_partages": 0,
+           "erreurs_partage": 0,
+           "expirations": 0,
+           "rafraichissements": 0,
+           "echecs_rafraichissement": 0
+       }
+
+
+   def __len__(self):
+       return len(self.entrees)
+
+
+   def duree_de_vie(self, resultat):
+       # Durée de vie d'un résultat de recherche_offres, ou None s'il ne doit pas être mis en cache.
+       if "offres" in resultat:
+           return self.ttl
+       if "message" in resultat or resultat.get("erreur") == MESSAGE_COMMUNE_INTROUVABLE:
+           return self.ttl_negatif
+       return None
+
+
+   def partager(self, stockage, espace="recherches_france_travail"):
+       # Partage le cache avec les autres processus du bot à travers stockage (backend d'état partagé).
+       self.partage = stockage
+       self.espace = espace
+
+
+   def mettre(self, cle, resultat):
+       # Enregistre un résultat (s'il peut être mis en cache) et supprime les entrées les moins récemment utilisées.
+       duree = self.duree_de_vie(resultat)
+       if duree is None:
+           return
+       self._inserer(cle, resultat, duree)
+       if self.partage is None:
+           return
+       # Dates absolues (time.time) : les horloges monotones des processus ne sont pas comparables
+       valeur = {"resultat": resultat, "frais_jusqua": time.time() + duree}
+       try:
+           asyncio.get_running_loop()
+       except RuntimeError:
+           # Utilisation hors de la boucle d'événements : écriture directe
+           self._ecrire_partage(cle, valeur, duree)
+           return
+       # Écriture différée dans un thread : la boucle d'événements n'attend pas le verrou du stockage partagé
+       tache = asyncio.create_task(asyncio.to_thread(self._ecrire_partage, cle, valeur, duree))
+       self._ecritures.add(tache)
+       tache.add_done_callback(self._ecritures.discard)
+
+
+   def _ecrire_partage(self, cle, valeur, duree):
+       try:
+           self.partage.set(self.espace, repr(cle), valeur, ttl=duree + self.delai_perime)
+       except Exception as e:
+           self.compteurs["erreurs_partage"] += 1
+           print(f"Écriture du cache partagé impossible pour {cle}: {str(e)}")
+
+
+   def _inserer(self, cle, resultat, duree):
+       maintenant = time.monotonic()
+       self.entrees[cle] = (resultat, maintenant + duree, maintenant + duree + self.delai_perime)
+       self.entrees.move_to_end(cle)
+       while len(self.entrees) > self.taille_max:
+           self.entrees.popitem(last=False)
+           self.compteurs["evictions"] += 1
+
+
+   async def precharger(self, cle):
+       # Clé absente de la mémoire : recopie l'entrée écrite par un autre processus dans le stockage partagé
+       # (avec la durée de vie qui lui reste). La lecture se fait dans un thread, hors de la boucle d'événements.
+       # À attendre avant lire / est_utilisable, qui ne consultent que la mémoire ; obtenir le fait lui-même.
+       if self.partage is None or cle in self.entrees:
+           return
+       try:
+           partagee = await asyncio.to_thread(self.partage.get, self.espace, repr(cle))
+       except Exception as e:
+           self.compteurs["erreurs_partage"] += 1
+           print(f"Lecture du cache partagé impossible pour {cle}: {str(e)}")
+           return
+       if partagee is None or cle in self.entrees:
+           return
+       self._inserer(cle, partagee["resultat"], partagee["frais_jusqua"] - time.time())
+       self.compteurs["hits_partages"] += 1
+
+
+   def lire(self, cle):
+       # Retourne le résultat associé à la clé s'il est encore utilisable (frais ou périmé), sans rafraîchissement.
+       # Seuls les succès sont comptés : lire sert à consulter le cache négatif avant un calcul local peu coûteux.
+       entree = self.entrees.get(cle)
+       if entree is None or time.monotonic() >= entree[2]:
+           return None
+       self.entrees.move_to_end(cle)
+       self.compteurs["hits"] += 1
+       return entree[0]
+
+
+   def est_utilisable(self, cle):
+       # Indique si obtenir(cle, ...) répondrait immédiatement depuis le cache (entrée fraîche ou périmée).
+       entree = self.entrees.get(cle)
+       return entree is not None and time.monotonic() < entree[2]
+
+
+   async def obtenir(self, cle, charger):
+       # Retourne le résultat associé à la clé ; charger est une fonction sans argument renvoyant une coroutine
+       # qui calcule le résultat (appelée en cas d'absence, ou en tâche de fond si l'entrée est périmée).
+       await self.precharger(cle)
+       entree = self.entrees.get(cle)
+       maintenant = time.monotonic()
+       if entree is not None:
+           resultat, frais_jusqua, utilisable_jusqua = entree
+           if maintenant < frais_jusqua:
+               self.entrees.move_to_end(cle)
+               self.compteurs["hits"] += 1
+               return resultat
+           if maintenant < utilisable_jusqua:
+               self.entrees.move_to_end(cle)
+               self.compteurs["hits_perimes"] += 1
+               self.rafraichir_en_arriere_plan(cle, charger)
+               return resultat
+           del self.entrees[cle]
+           self.compteurs["expirations"] += 1
+
+       self.compteurs["misses"] += 1
+       resultat = await charger()
+       self.mettre(cle, resultat)
+       return resultat
+
+
+   def rafraichir_en_arriere_plan(self, cle, charger):
+       # Lance le rafraîchissement d'une entrée périmée, sauf si un rafraîchissement de cette clé est déjà en cours.
+       if cle in self._rafraichissements:
+           return
+       tache = asyncio.create_task(self._rafraichir(cle, charger))
+       self._rafraichissements[cle] = tache
+       tache.add_done_callback(lambda _: self._rafraichissements.pop(cle, None))
+
+
+   async def _rafraichir(self, cle, charger):
+       # En cas d'échec, l'ancienne entrée reste utilisable jusqu'à la fin de son délai de péremption.
+       try:
+           resultat = await charger()
+       except Exception as e:
+           self.compteurs["echecs_rafraichissement"] += 1
+           print(f"Rafraîchissement du cache impossible pour {cle}: {str(e)}")
+           return
+       if self.duree_de_vie(resultat) is None:
+           self.compteurs["echecs_rafraichissement"] += 1
+           return
+       self.mettre(cle, resultat)
+       self.compteurs["rafraichissements"] += 1
+
+
+   def vider(self):
+       self.entrees.clear()
+
+
+   def statistiques(self):
+       # Compteurs d'utilisation, nombre d'entrées et taux de succès (hits frais et périmés / total des demandes).
+       demandes = self.compteurs["hits"] + self.compteurs["hits_perimes"] + self.compteurs["misses"]
+       succes = self.compteurs["hits"] + self.compteurs["hits_perimes"]
+       return {
+           **self.compteurs,
+           "entrees": len(self.entrees),
+           "taille_max": self.taille_max,
+           "taux_succes": succes / demandes if demandes else 0.0
+       }
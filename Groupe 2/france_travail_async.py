@@ -0,0 +1,455 @@
+import asyncio                       # Verrous et tâches de fond de la boucle d'événements
+import re                            # Lecture de l'en-tête Content-Range
+import aiohttp                       # Client HTTP asynchrone (déjà installé avec discord.py)
+from cache_resultats import CacheResultats, MESSAGE_COMMUNE_INTROUVABLE
+from index_communes import normaliser_nom
+from scraping_group2 import FranceTravailBase
+
+# Variante asynchrone de FranceTravailAPI, destinée au bot Discord.
+# Le client synchrone utilise requests : appelé depuis une commande, il bloque toute la boucle d'événements
+# (heartbeats compris) pendant chaque recherche. Ce client utilise une seule session aiohttp, avec un pool de
+# connexions gardées ouvertes (keep-alive) et des délais d'attente explicites, et retourne exactement les mêmes
+# résultats que FranceTravailAPI (mêmes dictionnaires, mêmes messages d'erreur).
+#
+# Utilisation :
+#   api = await AsyncFranceTravailAPI.creer()
+#   resultats = await api.recherche_offres("Rennes", "data analyst")
+#   await api.fermer()
+
+
+class AsyncFranceTravailAPI(FranceTravailBase):
+   # Délais d'attente (en secondes) : établissement de la connexion, lecture d'une réponse, requête complète
+   DELAI_CONNEXION = 5
+   DELAI_LECTURE = 20
+   DELAI_TOTAL = 30
+   # Nombre maximal de connexions simultanées ouvertes vers l'API, et durée de conservation d'une connexion inactive
+   CONNEXIONS_MAX = 20
+   DUREE_KEEPALIVE = 60
+   # Pagination de la recherche : l'API renvoie au plus 150 offres par requête (paramètre range "premier-dernier")
+   # et refuse les index de fin au-delà de 3149.
+   TAILLE_PAGE = 150
+   INDEX_MAX = 3149
+   # Nombre maximal de pages demandées en parallèle pour une même recherche
+   PAGES_EN_PARALLELE = 4
+   # Nombre d'offres récupérées quand l'appelant ne précise pas de maximum
+   OFFRES_MAX_PAR_DEFAUT = 300
+
+   def __init__(self, client_id=None, client_secret=None, chemin_cache_communes=None, intervalle_rafraichissement_communes=None, session=None, cache_resultats=None):
+       super().__init__(client_id, client_secret, chemin_cache_communes, intervalle_rafraichissement_communes)
+       # Cache des résultats de recherche_offres (voir cache_resultats.py)
+       self.cache_resultats = CacheResultats() if cache_resultats is None else cache_resultats
+       # Session HTTP partagée par toutes les requêtes ; créée au premier appel si elle n'est pas fournie
+       self.session = session
+       self._session_externe = session is not None
+       # Verrou garantissant qu'une seule coroutine renouvelle le token à la fois
+       self._verrou_token = asyncio.Lock()
+       # Tâche de rafraîchissement du référentiel des communes en cours, le cas échéant
+       self._tache_rafraichissement = None
+
+
+   @classmethod
+   async def creer(cls, *args, **kwargs):
+       # Crée le client et charge le référentiel des communes (depuis le cache disque si possible).
+       api = cls(*args, **kwargs)
+       try:
+           await api.charger_communes()
+       except Exception as e:
+           print(f"Erreur d'initialisation : {str(e)}")
+           await api.fermer()
+           raise
+       return api
+
+
+   async def __aenter__(self):
+       return self
+
+
+   async def __aexit__(self, *exc_info):
+       await self.fermer()
+
+
+   def get_session(self):
+       # Retourne la session HTTP du client, en la créant si besoin.
+       if self.session is None or self.session.closed:
+           connecteur = aiohttp.TCPConnector(
+               limit=self.CONNEXIONS_MAX,
+               keepalive_timeout=self.DUREE_KEEPALIVE,
+               ttl_dns_cache=300
+           )
+           delais = aiohttp.ClientTimeout(
+               total=self.DELAI_TOTAL,
+               sock_connect=self.DELAI_CONNEXION,
+               sock_read=self.DELAI_LECTURE
+           )
+           self.session = aiohttp.ClientSession(connector=connecteur, timeout=delais)
+       return self.session
+
+
+   async def fermer(self):
+       # Ferme la session HTTP (sauf si elle a été fournie par l'appelant) et arrête un éventuel rafraîchissement.
+       if self._tache_rafraichissement and not self._tache_rafraichissement.done():
+           self._tache_rafraichissement.cancel()
+       if self.session is not None and not self._session_externe and not self.session.closed:
+           await self.session.close()
+
+
+   async def charger_communes(self):
+       # Charge le référentiel des communes et construit son index.
+       # La lecture du cache et la construction de l'index sont faites dans un thread pour ne pas bloquer la boucle.
+       communes = await asyncio.to_thread(self.cache_communes.charger)
+       if communes is None:
+           # Pas de cache exploitable : récupère le référentiel auprès de l'API puis le sauvegarde.
+           communes = await self.get_communes()
+           await asyncio.to_thread(self.sauvegarder_communes, communes)
+       await asyncio.to_thread(self.definir_communes, communes)
+       if self.cache_communes.est_perime():
+           # Cache trop ancien : on l'utilise tout de suite et on le met à jour en arrière-plan.
+           self.rafraichir_communes_en_arriere_plan()
+
+
+   async def envoyer(self, methode, url, **kwargs):
+       # Envoie une requête HTTP à l'API en respectant le quota d'appels (self.limiteur) et renvoie automatiquement
+       # les requêtes refusées pour dépassement de quota (429) ou indisponibilité (503), selon self.politique_relance.
+       # Retourne la dernière réponse obtenue, à utiliser avec "async with" ; les exceptions d'aiohttp sont propagées.
+       self.politique_relance.enregistrer_requete()
+       tentative = 0
+       while True:
+           await asyncio.sleep(self.limiteur.reserver())
+           response = await self.get_session().request(methode, url, **kwargs)
+           delai = self.delai_avant_relance(tentative, response.status, response.headers.get("Retry-After"))
+           if delai is None:
+               return response
+           response.release()
+           tentative += 1
+           await asyncio.sleep(delai)
+
+
+   async def get_token(self):
+       # Obtient un jeton d'accès auprès de l'API d'authentification de France Travail.
+       headers = {
+           "Content-Type": "application/x-www-form-urlencoded"
+       }
+       try:
+           async with await self.envoyer("POST", self.URL_TOKEN, data=self.payload_token(), headers=headers) as response:
+               if response.status != 200:
+                   raise Exception(self.message_erreur_token(response.status, await response.text()))
+               return self.enregistrer_token(await response.json(content_type=None))
+
+       # Gestion des exceptions liées aux délais d'attente dépassés lors de la requête.
+       except asyncio.TimeoutError:
+           raise Exception("Délai d'attente dépassé lors de l'authentification")
+       # Gestion des exceptions liées aux problèmes de connexion.
+       except aiohttp.ClientConnectionError:
+           raise Exception("Impossible de se connecter au serveur d'authentification")
+       # Gestion des autres exceptions liées aux problèmes lors de l'envoi de la requête HTTP.
+       except aiohttp.ClientError as e:
+           raise Exception(f"Erreur lors de la requête d'authentification: {str(e)}")
+       # Gestion des exceptions si la réponse du serveur n'est pas au format JSON attendu.
+       except ValueError:
+           raise Exception("Réponse non-JSON reçue")
+
+
+   async def verifier_token(self, forcer=False):
+       # Renouvelle le token par anticipation s'il est sur le point d'expirer (ou si forcer=True).
+       # Les coroutines qui attendent le verrou réutilisent ensuite le token obtenu par la première.
+       if not forcer and self.token_valide():
+           return self.token
+       async with self._verrou_token:
+           if forcer or not self.token_valide():
+               self.token = await self.get_token()
+           return self.token
+
+
+   async def get_communes(self):
+       # Récupère la liste complète des communes françaises (codes INSEE) depuis l'API de France Travail.
+       headers = {
+           "Authorization": f"Bearer {await self.verifier_token()}",
+           "Accept": "application/json"
+       }
+       try:
+           async with await self.envoyer("GET", self.URL_COMMUNES, headers=headers) as response:
+               if response.status != 200:
+                   if response.status == 401:
+                       raise Exception("Token d'authentification invalide ou expiré")
+                   raise Exception(f"Erreur HTTP {response.status}: {await response.text()}")
+               return await response.json(content_type=None)
+       except asyncio.TimeoutError:
+           raise Exception("Erreur lors de la récupération des communes: délai d'attente dépassé")
+       except aiohttp.ClientError as e:
+           raise Exception(f"Erreur lors de la récupération des communes: {str(e)}")
+
+
+   async def rafraichir_communes(self):
+       # Retélécharge le référentiel des communes, remplace celui en mémoire et met à jour le cache disque.
+       # En cas d'échec (API d'authentification lente ou indisponible), on conserve simplement l'ancien référentiel.
+       try:
+           communes = await self.get_communes()
+           if communes:
+               await asyncio.to_thread(self.definir_communes, communes)
+               await asyncio.to_thread(self.sauvegarder_communes, communes)
+       except Exception as e:
+           print(f"Rafraîchissement des communes impossible, utilisation du cache existant : {str(e)}")
+
+
+   def rafraichir_communes_en_arriere_plan(self):
+       # Lance rafraichir_communes dans une tâche de fond (une seule à la fois).
+       if self._tache_rafraichissement is None or self._tache_rafraichissement.done():
+           self._tache_rafraichissement = asyncio.create_task(self.rafraichir_communes())
+       return self._tache_rafraichissement
+
+
+   def total_offres(self, content_range, par_defaut):
+       # Lit le nombre total d'offres correspondant à la recherche dans l'en-tête Content-Range
+       # (ex : "offres 0-149/1234" -> 1234). Retourne par_defaut si l'en-tête est absent ou illisible.
+       match = re.search(r"/(\d+)\s*$", content_range or "")
+       return int(match.group(1)) if match else par_defaut
+
+
+   async def requete_page(self, params, debut, fin):
+       # Demande à l'API les offres d'index debut à fin (inclus).
+       # Retourne (offres brutes, nombre total d'offres correspondant à la recherche).
+       params = dict(params, range=f"{debut}-{fin}")
+       headers = {
+           "Authorization": f"Bearer {await self.verifier_token()}",
+           "Accept": "application/json"
+       }
+       try:
+           async with await self.envoyer("GET", self.URL_RECHERCHE, headers=headers, params=params) as response:
+               # L'API répond 206 quand seule une partie des offres est renvoyée, et 204 quand aucune offre ne correspond.
+               if response.status == 204:
+                   return [], 0
+               if response.status not in (200, 206):
+                   raise Exception(self.message_erreur_recherche(response.status, await response.text()))
+               resultats = (await response.json(content_type=None)).get("resultats") or []
+               return resultats, self.total_offres(response.headers.get("Content-Range"), debut + len(resultats))
+
+       # Gestion des exceptions liées aux délais d'attente, aux problèmes de connexion ou aux erreurs réseau.
+       except asyncio.TimeoutError:
+           raise Exception("Délai d'attente dépassé")
+       except aiohttp.ClientConnectionError:
+           raise Exception("Impossible de se connecter au serveur")
+       except aiohttp.ClientError as e:
+           raise Exception(f"Erreur réseau: {str(e)}")
+
+
+   async def pages_offres(self, zone_type, zone_code, mots_cles, max_offres=None, filtres=None):
+       # Générateur asynchrone produisant les offres brutes page par page, dans l'ordre de pertinence de l'API.
+       # La première page donne (via Content-Range) le nombre total d'offres, qui détermine les pages suivantes à
+       # demander. Celles-ci sont téléchargées en parallèle (au plus PAGES_EN_PARALLELE à la fois) mais produites
+       # dans l'ordre, dès que possible : l'appelant peut afficher la première page sans attendre les autres.
+       # Si l'appelant arrête l'itération, les pages encore en attente sont annulées.
+       # filtres : paramètres de recherche supplémentaires de l'API (ex : minCreationDate et maxCreationDate).
+       params = dict(self.parametres_recherche(zone_type, zone_code, mots_cles), **(filtres or {}))
+       limite = min(self.OFFRES_MAX_PAR_DEFAUT if max_offres is None else max_offres, self.INDEX_MAX + 1)
+       if limite <= 0:
+           return
+
+       premiere_page, total = await self.requete_page(params, 0, min(self.TAILLE_PAGE, limite) - 1)
+       yield premiere_page[:limite]
+       total = min(total, limite)
+       if len(premiere_page) >= total:
+           return
+
+       semaphore = asyncio.Semaphore(self.PAGES_EN_PARALLELE)
+
+       async def page(debut):
+           async with semaphore:
+               resultats, _ = await self.requete_page(params, debut, min(debut + self.TAILLE_PAGE, total) - 1)
+               return resultats
+
+       taches = [
+           asyncio.create_task(page(debut))
+           for debut in range(len(premiere_page), total, self.TAILLE_PAGE)
+       ]
+       try:
+           for tache in taches:
+               resultats = await tache
+               if not resultats:
+                   return # Plus aucune offre (des offres ont pu être retirées depuis la première page)
+               yield resultats
+       finally:
+           for tache in taches:
+               tache.cancel()
+           await asyncio.gather(*taches, return_exceptions=True)
+
+
+   async def search_offres(self, zone_type, zone_code, mots_cles, max_offres=None, filtres=None):
+       # Effectue une recherche d'offres d'emploi et retourne {"resultats": [offres brutes de l'API]},
+       # avec au plus max_offres offres (OFFRES_MAX_PAR_DEFAUT par défaut) réparties sur plusieurs pages.
+       # Lève une ValueError si le type de zone est invalide ou si le code de zone est manquant (voir parametres_recherche).
+       resultats = []
+       async for page in self.pages_offres(zone_type, zone_code, mots_cles, max_offres, filtres):
+           resultats.extend(page)
+       return {"resultats": resultats}
+
+
+   async def rechercher_dans_zone(self, zone, mots_cles, max_offres=None, filtres=None):
+       # Interroge l'API pour une zone déjà déterminée et formate les résultats (sans passer par le cache).
+       # Utilisée directement par la collecte en arrière-plan, avec des filtres de date de création.
+       try:
+           # Si l'API refuse le token malgré le renouvellement anticipé, on force un renouvellement et on retente une fois.
+           try:
+               offres = await self.search_offres(zone["type"], zone["valeur"], mots_cles, max_offres, filtres)
+           except Exception as e:
+               if "Token d'authentification expiré" not in str(e):
+                   raise
+               print("Token refusé par l'API. Renouvellement forcé...")
+               try:
+                   await self.verifier_token(forcer=True)
+               except Exception as token_error:
+                   return {"erreur": f"Impossible de renouveler le token: {str(token_error)}"}
+               offres = await self.search_offres(zone["type"], zone["valeur"], mots_cles, max_offres, filtres)
+
+           return self.formater_resultats(offres, zone, mots_cles)
+
+       except Exception as e:
+           return {"erreur": f"Erreur lors de la recherche: {str(e)}"}
+
+
+   async def resoudre_zone(self, ville_input):
+       # Détermine la zone de recherche (commune ou département) à partir de la ville saisie.
+       # Retourne (zone, None), ou (None, {"erreur": ...}) si la commune est introuvable.
+       # Les saisies de ville déjà reconnues comme introuvables sont gardées en cache négatif.
+       cle_ville = ("commune_inconnue", normaliser_nom(ville_input))
+       await self.cache_resultats.precharger(cle_ville)
+       resultat = self.cache_resultats.lire(cle_ville)
+       if resultat is not None:
+           return None, resultat
+
+       zone = self.determine_zone_recherche(ville_input)
+       if not zone:
+           resultat = {"erreur": MESSAGE_COMMUNE_INTROUVABLE}
+           self.cache_resultats.mettre(cle_ville, resultat)
+           return None, resultat
+       return zone, None
+
+
+   def cle_recherche(self, zone, mots_cles, max_offres):
+       # Clé de self.cache_resultats : zone (et non la saisie : "Renne" et "Rennes" partagent la même entrée),
+       # mots-clés normalisés et nombre maximal d'offres.
+       return ("offres", zone["type"], zone["valeur"], " ".join((mots_cles or "").lower().split()), max_offres)
+
+
+   async def recherche_offres(self, ville_input, mots_cles, max_offres=None):
+       # Recherche des offres d'emploi en fonction de la ville et des mots-clés fournis (au plus max_offres offres).
+       # Même contrat que FranceTravailAPI.recherche_offres : {"ville", "nombre_offres", "offres"}, {"message"} ou {"erreur"}.
+       # Les résultats passent par self.cache_resultats (voir cle_recherche).
+       try:
+           if not ville_input:
+               return {"erreur": "Ville obligatoire"}
+
+           if not mots_cles:
+               print("Avertissement: recherche sans mots-clés")
+
+           zone, erreur = await self.resoudre_zone(ville_input)
+           if erreur:
+               return erreur
+
+           max_offres = self.OFFRES_MAX_PAR_DEFAUT if max_offres is None else max_offres
+           return await self.cache_resultats.obtenir(
+               self.cle_recherche(zone, mots_cles, max_offres),
+               lambda: self.rechercher_dans_zone(zone, mots_cles, max_offres)
+           )
+
+       # Gestion des erreurs de connexion réseau.
+       except aiohttp.ClientError as e:
+           return {"erreur": f"Problème de connexion: {str(e)}"}
+
+       # Gestion des erreurs inattendues.
+       except Exception as e:
+           return {"erreur": f"Erreur inattendue: {str(e)}"}
+
+
+   async def recherche_offres_progressive(self, ville_input, mots_cles, max_offres=None, enregistrer=None):
+       # Générateur asynchrone : même recherche que recherche_offres, mais un résultat partiel est produit dès
+       # que chaque page de l'API est reçue ({"ville", "nombre_offres", "offres"} avec les offres reçues jusque-là),
+       # ce qui permet au bot d'afficher les premières offres sans attendre les suivantes.
+       # Le dernier résultat produit est le résultat complet ({"message"} ou {"erreur"} le cas échéant), mis en cache
+       # comme celui de recherche_offres. Un résultat déjà en cache est produit directement, en une fois.
+       # enregistrer (coroutine facultative) reçoit les offres complètes uniquement quand elles viennent d'être
+       # obtenues de l'API, jamais pour un résultat servi depuis le cache.
+       if not ville_input:
+           yield {"erreur": "Ville obligatoire"}
+           return
+       try:
+           zone, erreur = await self.resoudre_zone(ville_input)
+       except Exception as e:
+           yield {"erreur": f"Erreur inattendue: {str(e)}"}
+           return
+       if erreur:
+           yield erreur
+           return
+
+       max_offres = self.OFFRES_MAX_PAR_DEFAUT if max_offres is None else max_offres
+       cle = self.cle_recherche(zone, mots_cles, max_offres)
+       await self.cache_resultats.precharger(cle)
+       if self.cache_resultats.est_utilisable(cle):
+           yield await self.cache_resultats.obtenir(cle, lambda: self.rechercher_dans_zone(zone, mots_cles, max_offres))
+           return
+
+       offres = []
+       resultat = None
+       for tentative in range(2):
+           try:
+               async for page in self.pages_offres(zone["type"], zone["valeur"], mots_cles, max_offres):
+                   for offre in page:
+                       try:
+                           offres.append(self.formater_offre(offre))
+                       except Exception as e:
+                           print(f"Erreur sur une offre: {str(e)}")
+                   if offres:
+                       resultat = {"ville": zone["nom_corrige"], "nombre_offres": len(offres), "offres": list(offres)}
+                       yield resultat
+               break
+           except Exception as e:
+               # Token refusé avant la première page : un seul renouvellement forcé, comme rechercher_dans_zone
+               if tentative == 0 and resultat is None and "Token d'authentification expiré" in str(e):
+                   print("Token refusé par l'API. Renouvellement forcé...")
+                   try:
+                       await self.verifier_token(forcer=True)
+                   except Exception as token_error:
+                       yield {"erreur": f"Impossible de renouveler le token: {str(token_error)}"}
+                       return
+                   continue
+               if resultat is None:
+                   yield {"erreur": f"Erreur lors de la recherche: {str(e)}"}
+               else:
+                   # Les offres déjà produites restent affichées ; le résultat incomplet n'est pas mis en cache.
+                   print(f"Recherche interrompue après {len(offres)} offres: {str(e)}")
+               return
+
+       if resultat is None:
+           resultat = self.formater_resultats({"resultats": []}, zone, mots_cles)
+           yield resultat
+       elif enregistrer is not None:
+           try:
+               await enregistrer(resultat["offres"])
+           except Exception as e:
+               print(f"Enregistrement des offres impossible: {str(e)}")
+       self.cache_resultats.mettre(cle, resultat)
+
+
+# Client asynchrone unique partagé par tout le bot
+_api_async_partagee = None
+_verrou_api_async_partagee = None
+
+
+async def get_api_async_partagee():
+   # Retourne le client AsyncFranceTravailAPI partagé, en le créant au premier appel.
+   global _api_async_partagee, _verrou_api_async_partagee
+   if _api_async_partagee is not None:
+       return _api_async_partagee
+   if _verrou_api_async_partagee is None:
+       _verrou_api_async_partagee = asyncio.Lock()
+   async with _verrou_api_async_partagee:
+       if _api_async_partagee is None:
+           _api_async_partagee = await AsyncFranceTravailAPI.creer()
+   return _api_async_partagee
+
+
+async def fermer_api_async_partagee():
+   # Ferme le client partagé (à appeler à l'arrêt du bot).
+   global _api_async_partagee
+   if _api_async_partagee is not None:
+       await _api_async_partagee.fermer()
+       _api_async_partagee = None
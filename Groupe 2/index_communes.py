@@ -0,0 +1,126 @@
+import difflib                       # Score final des candidats, identique à celui de difflib.get_close_matches
+import unicodedata                   # Suppression des accents lors de la normalisation
+from collections import Counter, defaultdict
+
+# Index de recherche des communes, construit une seule fois quand le référentiel est chargé.
+# Remplace le parcours complet de difflib.get_close_matches sur ~35 000 communes à chaque recherche :
+#   1. une table de hachage "nom normalisé -> commune" répond directement aux saisies correctes ;
+#   2. un index de trigrammes de caractères (ex : "RENNES" -> " RE", "REN", "ENN", ...) sélectionne les
+#      quelques noms qui partagent le plus de trigrammes avec une saisie mal orthographiée ;
+#      On y ajoute les noms obtenus en retirant une lettre à la saisie (ex : "ROUAN" -> "ROAN"), qui rattrapent
+#      les noms courts dont les trigrammes sont trop peu discriminants ;
+#   3. seuls ces candidats sont départagés avec le même score que difflib (SequenceMatcher.ratio).
+
+
+def normaliser_nom(nom):
+   # Met un nom de commune sous la forme utilisée par le référentiel France Travail :
+   # majuscules, sans accents, tirets et apostrophes remplacés par des espaces, espaces multiples supprimés.
+   # Ex : "Saint-Étienne" -> "SAINT ETIENNE", "L'Isle-d'Abeau" -> "L ISLE D ABEAU"
+   nom = unicodedata.normalize("NFKD", nom)
+   nom = "".join(c for c in nom if not unicodedata.combining(c))
+   nom = nom.upper().replace("-", " ").replace("'", " ").replace("’", " ")
+   return " ".join(nom.split())
+
+
+def trigrammes(nom):
+   # Découpe un nom en trigrammes, avec des espaces en bordure pour donner plus de poids au début et à la fin du mot.
+   nom = f"  {nom} "
+   return {nom[i:i + 3] for i in range(len(nom) - 2)}
+
+
+class IndexCommunes:
+   # Nombre de candidats (ceux qui partagent le plus de trigrammes) départagés par SequenceMatcher
+   NOMBRE_CANDIDATS = 12
+   # Les trigrammes de la saisie sont parcourus du plus rare au plus fréquent. Les trigrammes très fréquents
+   # (ex : "SAI", "INT" de "SAINT") sont peu discriminants : on arrête d'en ajouter dès que les listes déjà
+   # comptées totalisent BUDGET_POSITIONS positions, à condition d'avoir utilisé au moins TRIGRAMMES_MINIMUM trigrammes.
+   BUDGET_POSITIONS = 3000
+   TRIGRAMMES_MINIMUM = 3
+
+   def __init__(self, communes, cutoff=0.6):
+       # communes : liste au format de l'API ([{"code": ..., "libelle": ...}, ...])
+       # cutoff : score minimal de similarité, comme le paramètre du même nom de difflib.get_close_matches
+       self.cutoff = cutoff
+       # Noms distincts du référentiel et code INSEE associé (le premier rencontré, comme l'ancien parcours linéaire)
+       self.libelles = []
+       self.codes = []
+       # Nom normalisé -> position dans self.libelles
+       self.exact = {}
+       # Trigramme -> positions des noms qui le contiennent
+       self.postings = defaultdict(list)
+
+       deja_vus = set()
+       for commune in communes:
+           libelle = commune["libelle"]
+           if libelle in deja_vus:
+               continue
+           deja_vus.add(libelle)
+           position = len(self.libelles)
+           self.libelles.append(libelle)
+           self.codes.append(commune["code"])
+           self.exact.setdefault(normaliser_nom(libelle), position)
+           for trigramme in trigrammes(libelle):
+               self.postings[trigramme].append(position)
+       self.postings = dict(self.postings)
+
+
+   def __len__(self):
+       return len(self.libelles)
+
+
+   def _resultat(self, position):
+       return {
+           "nom_corrige": self.libelles[position],
+           "code_insee": self.codes[position]
+       }
+
+
+   def rechercher(self, input_name):
+       # Retourne {"nom_corrige": ..., "code_insee": ...} pour la commune la plus proche de la saisie, ou None.
+       saisie = normaliser_nom(input_name)
+       if not saisie:
+           return None
+
+       # 1. Correspondance exacte : cas le plus fréquent, une simple lecture dans un dictionnaire
+       position = self.exact.get(saisie)
+       if position is not None:
+           return self._resultat(position)
+
+       # 2. Sélection des candidats : on compte les trigrammes partagés, en commençant par les plus rares
+       listes = sorted(
+           (self.postings[t] for t in trigrammes(saisie) if t in self.postings),
+           key=len
+       )
+       if not listes:
+           return None
+
+       scores = Counter()
+       total = 0
+       for nombre, liste in enumerate(listes):
+           if nombre >= self.TRIGRAMMES_MINIMUM and total + len(liste) > self.BUDGET_POSITIONS:
+               break
+           scores.update(liste)
+           total += len(liste)
+       candidats = {position for position, _ in scores.most_common(self.NOMBRE_CANDIDATS)}
+       # Saisie avec une lettre en trop : les noms obtenus en retirant chaque lettre sont lus dans la table exacte
+       for i in range(len(saisie)):
+           position = self.exact.get(saisie[:i] + saisie[i + 1:])
+           if position is not None:
+               candidats.add(position)
+
+       # 3. Départage avec le score de difflib ; à score égal, même ordre que get_close_matches (nom le plus grand)
+       matcher = difflib.SequenceMatcher()
+       matcher.set_seq2(saisie)
+       meilleur = None
+       for position in candidats:
+           libelle = self.libelles[position]
+           matcher.set_seq1(libelle)
+           if matcher.real_quick_ratio() < self.cutoff or matcher.quick_ratio() < self.cutoff:
+               continue
+           score = matcher.ratio()
+           if score >= self.cutoff and (meilleur is None or (score, libelle) > meilleur[:2]):
+               meilleur = (score, libelle, position)
+
+       if meilleur is None:
+           return None
+       return self._resultat(meilleur[2])
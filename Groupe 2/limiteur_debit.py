@@ -0,0 +1,159 @@
+import os                            # Configuration par variables d'environnement
+import random                        # Gigue (jitter) des délais entre deux tentatives
+import threading                     # Verrou : le limiteur est partagé par les threads et la boucle asyncio
+import time                          # Horloge monotone
+from email.utils import parsedate_to_datetime  # Lecture de Retry-After au format date HTTP
+
+# Limitation du débit et politique de relance des appels à l'API France Travail.
+# L'application partenaire a un quota d'appels par seconde ; au-delà, l'API répond 429 et l'erreur
+# "Trop de requêtes" remontait jusqu'à l'utilisateur Discord. Désormais :
+#  - chaque appel (token, communes, recherche) prend d'abord un jeton dans un seau partagé par tous les clients
+#    du processus (SeauJetons) : les requêtes sont étalées pour rester juste sous le quota au lieu de le dépasser ;
+#  - une réponse 429 (ou 503) est renvoyée après le délai demandé par l'en-tête Retry-After (ou, à défaut, un délai
+#    exponentiel), avec une gigue aléatoire pour que les requêtes refusées ensemble ne repartent pas ensemble ;
+#  - un 429 suspend aussi le seau pendant le délai demandé : les autres requêtes attendent au lieu d'aggraver le dépassement ;
+#  - les relances consomment un budget global (PolitiqueRelance) alimenté par les requêtes normales : lors d'un pic
+#    d'utilisateurs, au plus ~20 % de requêtes supplémentaires sont envoyées, jamais une "tempête" de relances.
+
+# Quota par défaut de l'API Offres d'emploi (appels par seconde), surchargeable selon l'application partenaire
+DEBIT_PAR_DEFAUT = float(os.getenv("FRANCE_TRAVAIL_REQUETES_PAR_SECONDE", 10))
+# Nombre de requêtes pouvant partir d'un coup quand le seau est plein
+RAFALE_PAR_DEFAUT = int(os.getenv("FRANCE_TRAVAIL_RAFALE", max(1, int(DEBIT_PAR_DEFAUT))))
+# Part des requêtes pouvant donner lieu à une relance une fois la réserve épuisée
+RATIO_BUDGET_PAR_DEFAUT = float(os.getenv("FRANCE_TRAVAIL_RATIO_RELANCES", 0.2))
+
+
+def lire_retry_after(valeur):
+   # Convertit l'en-tête Retry-After (nombre de secondes ou date HTTP) en secondes, ou None s'il est absent ou illisible.
+   if not valeur:
+       return None
+   try:
+       return max(0.0, float(valeur))
+   except ValueError:
+       pass
+   try:
+       return max(0.0, parsedate_to_datetime(valeur).timestamp() - time.time())
+   except (TypeError, ValueError):
+       return None
+
+
+class SeauJetons:
+   # Seau à jetons : le seau se remplit de debit jetons par seconde, jusqu'à capacite jetons.
+   # Chaque requête réserve un jeton ; si le seau est vide, le jeton est "emprunté" et la requête attend
+   # le temps nécessaire à son remplissage. Les requêtes en attente partent donc une par une, au rythme du quota.
+
+   def __init__(self, debit=DEBIT_PAR_DEFAUT, capacite=RAFALE_PAR_DEFAUT):
+       self.debit = debit
+       self.capacite = capacite
+       self.jetons = float(capacite)
+       # Instant auquel correspond self.jetons ; dans le futur pendant une suspension (le seau ne se remplit pas)
+       self.mis_a_jour = time.monotonic()
+       self._verrou = threading.Lock()
+       self.compteurs = {
+           "requetes": 0,
+           "requetes_retardees": 0,
+           "attente_totale": 0.0,
+           "suspensions": 0
+       }
+
+
+   def _remplir(self, maintenant):
+       if maintenant > self.mis_a_jour:
+           self.jetons = min(self.capacite, self.jetons + (maintenant - self.mis_a_jour) * self.debit)
+           self.mis_a_jour = maintenant
+
+
+   def reserver(self):
+       # Réserve un jeton et retourne le nombre de secondes à attendre avant d'envoyer la requête (0 si immédiat).
+       with self._verrou:
+           maintenant = time.monotonic()
+           self._remplir(maintenant)
+           self.jetons -= 1
+           delai = max(0.0, self.mis_a_jour - maintenant) + max(0.0, -self.jetons) / self.debit
+           self.compteurs["requetes"] += 1
+           if delai > 0:
+               self.compteurs["requetes_retardees"] += 1
+               self.compteurs["attente_totale"] += delai
+           return delai
+
+
+   def suspendre(self, duree):
+       # Empêche tout envoi pendant duree secondes (Retry-After d'une réponse 429) et vide la réserve de rafale.
+       with self._verrou:
+           maintenant = time.monotonic()
+           self._remplir(maintenant)
+           fin = maintenant + duree
+           if fin > self.mis_a_jour:
+               self.mis_a_jour = fin
+               self.jetons = min(self.jetons, 0.0)
+               self.compteurs["suspensions"] += 1
+
+
+   def statistiques(self):
+       return dict(self.compteurs, debit=self.debit, capacite=self.capacite)
+
+
+class PolitiqueRelance:
+   # Décide si une réponse doit être renvoyée, et après quel délai.
+   # Budget global : chaque requête initiale ajoute ratio_budget au solde (plafonné à reserve_budget) et chaque
+   # relance en retire 1. Tant que l'API répond normalement, la réserve est pleine ; si tout est refusé, les relances
+   # s'arrêtent d'elles-mêmes une fois la réserve consommée.
+   STATUTS_A_RELANCER = (429, 503)
+
+   def __init__(self, tentatives_max=3, delai_base=0.5, delai_max=30, ratio_budget=RATIO_BUDGET_PAR_DEFAUT, reserve_budget=10):
+       self.tentatives_max = tentatives_max
+       self.delai_base = delai_base
+       # Au-delà de ce délai d'attente, mieux vaut renvoyer l'erreur à l'utilisateur que de le faire patienter
+       self.delai_max = delai_max
+       self.ratio_budget = ratio_budget
+       self.reserve_budget = reserve_budget
+       self.solde = float(reserve_budget)
+       self._verrou = threading.Lock()
+       self.compteurs = {
+           "requetes": 0,
+           "relances": 0,
+           "refus_budget": 0,
+           "refus_delai": 0,
+           "abandons": 0
+       }
+
+
+   def enregistrer_requete(self):
+       # À appeler une fois par requête initiale (hors relances) : alimente le budget.
+       with self._verrou:
+           self.compteurs["requetes"] += 1
+           self.solde = min(self.reserve_budget, self.solde + self.ratio_budget)
+
+
+   def delai_relance(self, tentative, attente_demandee=None):
+       # Retourne le délai (en secondes) avant la relance numéro tentative + 1, ou None s'il ne faut pas relancer.
+       # attente_demandee : valeur de Retry-After en secondes, si l'API l'a fournie.
+       with self._verrou:
+           if tentative >= self.tentatives_max:
+               self.compteurs["abandons"] += 1
+               return None
+           if attente_demandee is not None:
+               # Au moins le délai demandé, plus une gigue de 0 à 20 % (minimum 100 ms) pour désynchroniser les clients
+               delai = attente_demandee + random.uniform(0, max(0.1, attente_demandee * 0.2))
+           else:
+               # Backoff exponentiel avec gigue complète
+               delai = random.uniform(0, min(self.delai_max, self.delai_base * 2 ** tentative))
+           if delai > self.delai_max:
+               self.compteurs["refus_delai"] += 1
+               return None
+           if self.solde < 1:
+               self.compteurs["refus_budget"] += 1
+               return None
+           self.solde -= 1
+           self.compteurs["relances"] += 1
+           return delai
+
+
+   def statistiques(self):
+       return dict(self.compteurs, solde=self.solde)
+
+
+# Limiteur et politique partagés par tous les clients France Travail du processus (synchrone et asynchrone) :
+# le quota est celui de l'application partenaire, quel que soit le nombre de clients créés.
+LIMITEUR_PARTAGE = SeauJetons()
+POLITIQUE_PARTAGEE = PolitiqueRelance()
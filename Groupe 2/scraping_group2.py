@@ -1,8 +1,12 @@
 import requests                      # Pour effectuer des requêtes HTTP vers des API
-import difflib                       # Utile pour comparer des séquences, comme des chaînes de caractères
 from urllib.parse import urlencode   # Pour construire des URLs en encodant des paramètres
 import re                            # Fournit des opérations d'expressions régulières
 import pprint                        # Utile pour mieux voir la structure du dictionnaire qui comprend les données
+import threading                     # Verrou pour partager un même client entre plusieurs commandes simultanées
+import time                          # Pour suivre la date d'expiration du token
+from cache_communes import CacheCommunes  # Cache disque du référentiel des communes
+from index_communes import IndexCommunes  # Index de recherche des communes tolérant les fautes de frappe
+from limiteur_debit import LIMITEUR_PARTAGE, POLITIQUE_PARTAGEE, lire_retry_after  # Quota d'appels et relances sur 429
 
 # Avant de commencer (Important)
 #  1. Création du compte sur France Travail IO
@@ -13,109 +17,129 @@ import pprint                        # Utile pour mieux voir la structure du dic
 
 #  4. Ici, j'ai laissé mes identifiants pour l'instant, mais si vous voulez que le code fonctionne à l'avenir, il faudra faire les étapes au dessus
 
-class FranceTravailAPI:
-   def __init__(self, client_id=None, client_secret=None):
+class FranceTravailBase:
+   # Partie commune aux clients synchrone (FranceTravailAPI) et asynchrone (france_travail_async.AsyncFranceTravailAPI) :
+   # identifiants, suivi de la durée de vie du token, index des communes, construction des requêtes et mise en forme
+   # des résultats. Les sous-classes n'implémentent que les appels HTTP.
+
+   # Nombre de secondes avant l'expiration du token à partir duquel on le renouvelle par anticipation
+   MARGE_RENOUVELLEMENT_TOKEN = 60
+   # Délai minimal (en secondes) entre deux vérifications de l'âge du référentiel des communes pendant les recherches
+   DELAI_VERIFICATION_COMMUNES = 3600
+
+   # Adresses de l'API d'authentification, du référentiel des communes et de la recherche d'offres
+   URL_TOKEN = "https://entreprise.pole-emploi.fr/connexion/oauth2/access_token?realm=/partenaire"
+   URL_COMMUNES = "https://api.francetravail.io/partenaire/offresdemploi/v2/referentiel/communes"
+   URL_RECHERCHE = "https://api.francetravail.io/partenaire/offresdemploi/v2/offres/search"
+
+   def __init__(self, client_id=None, client_secret=None, chemin_cache_communes=None, intervalle_rafraichissement_communes=None):
        self.client_id = client_id or "PAR_recuperateuroffressel_201263b93beec49e65d91dd35e577cc10da48c610f24e5185947ec13702f76fd" # Rentrer le client id
        self.client_secret = client_secret or "1200839c51315a11b6619dcbab857711dc67f6591696feddc6169c191590f158"  # Rentrer le code secret
-      
-       try:
-           # Récupère le jeton d'accès nécessaire pour les requêtes à l'API.
-           self.token = self.get_token()
-           # Charge la liste des communes depuis l'API ou une source locale.
-           self.communes = self.get_communes()
-       except Exception as e:
-           # En cas d'erreur lors de l'initialisation (récupération du token ou des communes), affiche un message et propage l'exception.
-           print(f"Erreur d'initialisation : {str(e)}")
-           raise
+       # Date (en secondes, horloge monotone) à laquelle le token courant expire. Mise à jour par enregistrer_token().
+       self.token_expire_a = 0.0
+       # Le token n'est demandé qu'au premier besoin (verifier_token), ce qui permet de démarrer hors-ligne
+       self.token = None
+       # Cache disque du référentiel des communes
+       self.cache_communes = CacheCommunes(chemin_cache_communes, intervalle_rafraichissement_communes)
+       self.communes = []
+       self.index_communes = None
+       # Date (horloge monotone) de la prochaine vérification de l'âge du référentiel (voir verifier_fraicheur_communes)
+       self.prochaine_verification_communes = 0.0
+       # Seau à jetons et politique de relance partagés par tous les clients (voir limiteur_debit.py)
+       self.limiteur = LIMITEUR_PARTAGE
+       self.politique_relance = POLITIQUE_PARTAGEE
+
+
+   def delai_avant_relance(self, tentative, status_code, retry_after):
+       # Retourne le délai avant de renvoyer une requête dont la réponse a le code status_code, ou None si la
+       # réponse doit être traitée telle quelle (succès, erreur définitive, tentatives ou budget de relances épuisés).
+       if status_code not in self.politique_relance.STATUTS_A_RELANCER:
+           return None
+       attente = lire_retry_after(retry_after)
+       if status_code == 429:
+           # Quota dépassé : toutes les requêtes du processus attendent, pas seulement celle-ci
+           self.limiteur.suspendre(attente if attente is not None else 1.0)
+       delai = self.politique_relance.delai_relance(tentative, attente)
+       if delai is not None:
+           print(f"Réponse HTTP {status_code} de France Travail, nouvelle tentative dans {delai:.1f} s")
+       return delai
 
 
-   def get_token(self):
-       # Fonction pour obtenir un jeton d'accès depuis l'API d'authentification de France Travail.
-       # Le token est obligatoire pour pouvoir faire des requêtes par la suite
-       url = "https://entreprise.pole-emploi.fr/connexion/oauth2/access_token?realm=/partenaire"
+   def payload_token(self):
        # Paramètres à envoyer dans le corps de la requête POST pour l'obtention du jeton.
-       payload = {
+       return {
            "grant_type": "client_credentials",
            "client_id": self.client_id,
            "client_secret": self.client_secret,
            "scope": "api_offresdemploiv2 o2dsoffre"
        }
-       # En-têtes de la requête HTTP, indiquant que les données sont formatées comme un formulaire URL-encodé.
-       headers = {
-           "Content-Type": "application/x-www-form-urlencoded"
-       }
-      
-       try:
-           # Envoi de la requête POST à l'URL d'authentification avec les données et les en-têtes.
-           response = requests.post(url, data=payload, headers=headers)
-          
-           # Vérification du statut de la réponse HTTP. Si le code n'est pas 200 (OK), une exception est levée.
-           if response.status_code != 200:
-               if response.status_code == 401:
-                   error_msg = "Erreur d'authentification: vérifiez vos identifiants"
-               elif response.status_code == 429:
-                   error_msg = "Trop de requêtes envoyées à l'API"
-               else:
-                   error_msg = f"Erreur HTTP {response.status_code}: {response.text}"
-               raise Exception(error_msg)
-              
-           # Tentative de décodage de la réponse JSON.
-           data = response.json()
-           # Vérification que la clé 'access_token' est présente dans la réponse JSON.
-           if "access_token" not in data:
-               raise Exception("Token non trouvé dans la réponse")
-              
-           # Retourne le jeton d'accès extrait de la réponse JSON.
-           return data["access_token"]
-           # Donc en somme, quand cette fonction est appelée, elle renvoie le token qui permettra de faire des requêtes à l'API france travail
 
-          
-       # Gestion des exceptions liées aux problèmes de connexion.
-       except requests.exceptions.ConnectionError:
-           raise Exception("Impossible de se connecter au serveur d'authentification")
-       # Gestion des exceptions liées aux délais d'attente dépassés lors de la requête.
-       except requests.exceptions.Timeout:
-           raise Exception("Délai d'attente dépassé lors de l'authentification")
-       # Gestion des autres exceptions liées aux problèmes lors de l'envoi de la requête HTTP.
-       except requests.exceptions.RequestException as e:
-           raise Exception(f"Erreur lors de la requête d'authentification: {str(e)}")
-       # Gestion des exceptions si la réponse du serveur n'est pas au format JSON attendu.
-       except ValueError:
-           raise Exception("Réponse non-JSON reçue")
 
+   def message_erreur_token(self, status_code, texte):
+       # Message d'erreur correspondant à une réponse en échec de l'API d'authentification.
+       if status_code == 401:
+           return "Erreur d'authentification: vérifiez vos identifiants"
+       elif status_code == 429:
+           return "Trop de requêtes envoyées à l'API"
+       return f"Erreur HTTP {status_code}: {texte}"
 
-   def get_communes(self):
-       # Récupère la liste complète des communes françaises depuis l'API de France Travail.
-       # Cette fonction est importante car l'API ne fonctionne qu'avec des codes INSEE (équivalent du code postal)
-       # C'est à dire que l'url permettant de faire une requête, ne prend pas en compte les villes mais plutôt les code INSEE
-       # Mais dans notre code, on souhaite que l'on puisse rentrer le nom d'une ville et non pas un code postal/INSEE
-       # France travail offre la possibilité de récupérer tout les codes INSEE et leurs villes associées
-       # Ce sera pratique car quand on rentrera le nom d'une ville, alors il ira chercher directement dans ce dictionnaire le code INSEE
-       url = "https://api.francetravail.io/partenaire/offresdemploi/v2/referentiel/communes"
-       # En-têtes de la requête HTTP, incluant le jeton d'autorisation et l'acceptation du format JSON.
-       headers = {
-           "Authorization": f"Bearer {self.token}",
-           "Accept": "application/json"
-       }
-      
+
+   def enregistrer_token(self, data):
+       # Extrait le jeton d'accès de la réponse JSON de l'API d'authentification et mémorise sa date d'expiration
+       # (France Travail renvoie sa durée de vie en secondes dans 'expires_in').
+       # Vérification que la clé 'access_token' est présente dans la réponse JSON.
+       if "access_token" not in data:
+           raise Exception("Token non trouvé dans la réponse")
+       self.token_expire_a = time.monotonic() + int(data.get("expires_in", 0))
+       return data["access_token"]
+
+
+   def message_erreur_recherche(self, status_code, texte):
+       # Message d'erreur correspondant à une réponse en échec de l'API de recherche d'offres.
+       if status_code == 401:
+           return "Token d'authentification expiré"
+       elif status_code == 404:
+           return "Ressource non trouvée"
+       elif status_code == 429:
+           return "Trop de requêtes. Veuillez réessayer plus tard"
+       return f"Erreur HTTP {status_code}: {texte}"
+
+
+   def token_valide(self):
+       # Indique si le token courant est encore utilisable pendant au moins MARGE_RENOUVELLEMENT_TOKEN secondes.
+       return time.monotonic() < self.token_expire_a - self.MARGE_RENOUVELLEMENT_TOKEN
+
+
+   def definir_communes(self, communes):
+       # Remplace le référentiel en mémoire et reconstruit son index de recherche.
+       # L'index est construit avant d'être publié : les recherches en cours continuent sur l'ancien sans interruption.
+       index = IndexCommunes(communes)
+       self.communes = communes
+       self.index_communes = index
+
+
+   def sauvegarder_communes(self, communes):
+       # Enregistre le référentiel dans le cache disque. Un échec d'écriture (disque en lecture seule, etc.)
+       # n'empêche pas d'utiliser le référentiel déjà chargé en mémoire.
        try:
-           # Envoi de la requête GET à l'URL spécifiée avec les en-têtes.
-           response = requests.get(url, headers=headers)
-          
-           # Vérification du statut de la réponse HTTP. Si le code n'est pas 200 (OK), une exception est levée
-           if response.status_code != 200:
-               if response.status_code == 401:
-                   raise Exception("Token d'authentification invalide ou expiré")
-               else:
-                   raise Exception(f"Erreur HTTP {response.status_code}: {response.text}")
-                  
-           # Si la requête est réussie, retourne les données JSON contenant la liste des communes.
-           # C'est un dictionnaire, il contient toutes les villes/village, et leur code INSEE associé.
-           return response.json()
-          
-       # Gestion des exceptions qui peuvent survenir lors de la requête HTTP.
-       except requests.exceptions.RequestException as e:
-           raise Exception(f"Erreur lors de la récupération des communes: {str(e)}")
+           self.cache_communes.sauvegarder(communes)
+       except OSError as e:
+           print(f"Impossible d'enregistrer le cache des communes : {str(e)}")
+
+
+   def verifier_fraicheur_communes(self):
+       # Un client de longue durée (client partagé par le bot) ne passe qu'une fois par son constructeur : l'âge du
+       # référentiel est donc aussi vérifié pendant les recherches, au plus une fois par DELAI_VERIFICATION_COMMUNES
+       # secondes (et par intervalle de rafraichissement). S'il est périmé, il est rafraîchi en arrière-plan ; en cas
+       # d'échec, la prochaine tentative attend la vérification suivante.
+       maintenant = time.monotonic()
+       if maintenant < self.prochaine_verification_communes:
+           return
+       self.prochaine_verification_communes = maintenant + min(
+           self.DELAI_VERIFICATION_COMMUNES, self.cache_communes.intervalle_rafraichissement
+       )
+       if self.cache_communes.est_perime():
+           self.rafraichir_communes_en_arriere_plan()
 
 
    def find_commune_code(self, input_name):
@@ -124,33 +148,17 @@ class FranceTravailAPI:
         # Retourne un dictionnaire contenant le nom corrigé et le code INSEE de la commune trouvée, ou None si aucune correspondance n'est trouvée.
        if not input_name or not isinstance(input_name, str):
            return None # Retourne None si l'entrée est vide ou n'est pas une chaîne de caractères.
+
+       self.verifier_fraicheur_communes()
       
-       # Nettoie la saisie de l'utilisateur en la mettant en majuscules, en remplaçant les tirets par des espaces et en supprimant les espaces superflus
-       # Car la structure du dictionnaire récupéré depuis france travail est comme ça, par exemple les villes sont en majuscules 
-       # Ex : LILLE 
-       # Et il n'y a pas de tirets
-       # Ex : SAINT DENIS
-       input_cleaned = input_name.upper().replace("-", " ").strip()
-  
+       # La saisie est normalisée comme les noms du référentiel France Travail : majuscules, sans accents ni tirets
+       # Ex : "Saint-Denis" -> "SAINT DENIS"
+       # L'index (construit une seule fois au chargement des communes) répond directement aux noms exacts,
+       # et ne compare aux saisies mal orthographiées que les quelques communes partageant le plus de trigrammes.
        try:
-           # Extraction des noms de communes depuis la liste chargée (self.communes).
-           noms_communes = [commune["libelle"] for commune in self.communes]
-           # Recherche de la meilleure correspondance pour le nom de commune saisi en utilisant l'algorithme de comparaison de séquences de difflib.
-           best_match = difflib.get_close_matches(input_cleaned, noms_communes, n=1, cutoff=0.6)
-
-
-           # Si une correspondance est trouvée.
-           if best_match:
-               # Parcours de la liste des communes pour trouver celle qui correspond à la meilleure correspondance.
-               for commune in self.communes:
-                   if commune["libelle"] == best_match[0]:
-                       # Retourne un dictionnaire contenant le nom corrigé et le code INSEE de la commune.
-                       # Ce code INSEE sera ajouté à la requête plus tard, pour l'API
-                       return {
-                           "nom_corrige": best_match[0],
-                           "code_insee": commune["code"]
-                       }
-           return None # Si aucune correspondance n'est trouvée, retourne None.
+           # Retourne un dictionnaire contenant le nom corrigé et le code INSEE de la commune, ou None si aucune correspondance n'est trouvée.
+           # Ce code INSEE sera ajouté à la requête plus tard, pour l'API
+           return self.index_communes.rechercher(input_name)
       
        # Gestion des exceptions qui pourraient survenir lors du processus de recherche.
        except Exception as e:
@@ -204,9 +212,8 @@ class FranceTravailAPI:
            return None
 
 
-   def search_offres(self, zone_type, zone_code, mots_cles):
-       # Effectue une recherche d'offres d'emploi auprès de l'API France Travail en fonction du type et du code de la zone géographique et des mots-clés.
-       # Retourne les résultats bruts de l'API au format JSON.
+   def parametres_recherche(self, zone_type, zone_code, mots_cles):
+       # Construit les paramètres de la requête de recherche d'offres (communs aux clients synchrone et asynchrone).
        # Lève une ValueError si le type de zone est invalide ou si le code de zone est manquant.
        if not zone_type or zone_type not in ["commune", "departement"]:
            raise ValueError(f"Type de zone invalide: {zone_type}")
@@ -214,8 +221,6 @@ class FranceTravailAPI:
        if not zone_code:
            raise ValueError("Code de zone obligatoire")
           
-       # URL de l'API de recherche d'offres d'emploi.
-       url = "https://api.francetravail.io/partenaire/offresdemploi/v2/offres/search"
        # Paramètres de la requête à envoyer à l'API.
        params = {
            "motsCles": mots_cles,       # Voir plus bas
@@ -232,28 +237,243 @@ class FranceTravailAPI:
        elif zone_type == "departement":
            params["departement"] = zone_code
 
+       return params
+
+
+   def nettoyer_description(self, description):
+        # Nettoie le texte de la description d'une offre d'emploi en supprimant les sauts de ligne, les espaces multiples et les espaces avant la ponctuation.
+        # Retourne la description nettoyée. Si la description est vide, retourne un message indiquant l'absence de description
+       if not description:
+           return "Aucune description disponible."
+          
+       # Remplace les sauts de ligne par un espace
+       cleaned = re.sub(r'\n', ' ', description)
+      
+       # Remplace les espaces multiples par un seul
+       cleaned = re.sub(r'\s+', ' ', cleaned)
+      
+       # Enlève les espaces avant la ponctuation
+       cleaned = re.sub(r'\s+([.,;:!?])', r'\1', cleaned)
+      
+       # Supprime les espaces en début et fin de chaîne et retourne le résultat.
+       return cleaned.strip()
+
+
+   def formater_offre(self, offre):
+       # Extrait d'une offre brute de l'API les informations affichées par le bot.
+       # L'identifiant sert à construire le lien vers l'annonce sur le site de France Travail,
+       # la date de création à dater l'offre dans la base locale des offres du bot.
+       return {
+           "id": offre.get("id", ""),
+           "date_creation": offre.get("dateCreation"),
+           "titre": offre.get("intitule", "Titre non renseigné"),
+           "entreprise": offre.get("entreprise", {}).get("nom", "Entreprise non précisée"),
+           "lieu": offre.get("lieuTravail", {}).get("libelle", "Lieu non précisé"),
+           "contrat": offre.get("typeContratLibelle", "Type de contrat non précisé"),
+           "description": self.nettoyer_description(offre.get("description"))
+       }
+
+
+   def formater_resultats(self, offres, zone, mots_cles):
+       # Transforme la réponse brute de search_offres en dictionnaire structuré pour le bot.
+       # Vérifie si des résultats ont été trouvés.
+       if not offres.get("resultats"):
+           return {"message": f"Aucune offre trouvée pour '{mots_cles}' à {zone['nom_corrige']}."}
+
+
+       # Liste pour stocker les informations formatées des offres.
+       resultats_utiles = []
+       # Parcours les résultats bruts de l'API pour extraire et formater les informations pertinentes.
+       for offre in offres["resultats"]:
+           try:
+               resultats_utiles.append(self.formater_offre(offre))
+           except Exception as e:
+               print(f"Erreur sur une offre: {str(e)}")  # Affiche une erreur si le traitement d'une offre échoue.
+               continue # Passe à l'offre suivante en cas d'erreur.
+
+
+       # Retourne un dictionnaire contenant des informations sur la recherche et la liste des offres formatées
+       return {
+           "ville": zone["nom_corrige"],
+           "nombre_offres": len(resultats_utiles),
+           "offres": resultats_utiles
+       }
+
+
+class FranceTravailAPI(FranceTravailBase):
+   # Client synchrone, basé sur requests. Pour le bot Discord, préférer AsyncFranceTravailAPI (france_travail_async.py)
+   # qui ne bloque pas la boucle d'événements.
+
+   def __init__(self, client_id=None, client_secret=None, chemin_cache_communes=None, intervalle_rafraichissement_communes=None):
+       super().__init__(client_id, client_secret, chemin_cache_communes, intervalle_rafraichissement_communes)
+       # Verrou protégeant le renouvellement du token quand le client est partagé entre plusieurs threads
+       self._verrou_token = threading.Lock()
+       # Verrou évitant deux rafraîchissements simultanés du référentiel des communes
+       self._verrou_rafraichissement = threading.Lock()
+      
+       try:
+           # Charge la liste des communes depuis le cache local : quelques millisecondes, sans appel réseau.
+           communes = self.cache_communes.charger()
+           if communes is None:
+               # Pas de cache exploitable : récupère le référentiel auprès de l'API (token compris) puis le sauvegarde.
+               communes = self.get_communes()
+               self.sauvegarder_communes(communes)
+           # Construit l'index de recherche une fois pour toutes à partir du référentiel chargé
+           self.definir_communes(communes)
+           if self.cache_communes.est_perime():
+               # Cache trop ancien : on l'utilise tout de suite et on le met à jour en arrière-plan.
+               self.rafraichir_communes_en_arriere_plan()
+       except Exception as e:
+           # En cas d'erreur lors de l'initialisation (récupération du token ou des communes), affiche un message et propage l'exception.
+           print(f"Erreur d'initialisation : {str(e)}")
+           raise
+
+
+   def envoyer(self, methode, url, **kwargs):
+       # Envoie une requête HTTP à l'API en respectant le quota d'appels (self.limiteur) et renvoie automatiquement
+       # les requêtes refusées pour dépassement de quota (429) ou indisponibilité (503), selon self.politique_relance.
+       # Retourne la dernière réponse obtenue ; les exceptions de requests sont propagées à l'appelant.
+       self.politique_relance.enregistrer_requete()
+       tentative = 0
+       while True:
+           time.sleep(self.limiteur.reserver())
+           response = requests.request(methode, url, **kwargs)
+           delai = self.delai_avant_relance(tentative, response.status_code, response.headers.get("Retry-After"))
+           if delai is None:
+               return response
+           tentative += 1
+           time.sleep(delai)
+
+
+   def get_token(self):
+       # Fonction pour obtenir un jeton d'accès depuis l'API d'authentification de France Travail.
+       # Le token est obligatoire pour pouvoir faire des requêtes par la suite
+       # Paramètres à envoyer dans le corps de la requête POST pour l'obtention du jeton.
+       payload = self.payload_token()
+       # En-têtes de la requête HTTP, indiquant que les données sont formatées comme un formulaire URL-encodé.
+       headers = {
+           "Content-Type": "application/x-www-form-urlencoded"
+       }
+      
+       try:
+           # Envoi de la requête POST à l'URL d'authentification avec les données et les en-têtes.
+           response = self.envoyer("POST", self.URL_TOKEN, data=payload, headers=headers)
+          
+           # Vérification du statut de la réponse HTTP. Si le code n'est pas 200 (OK), une exception est levée.
+           if response.status_code != 200:
+               raise Exception(self.message_erreur_token(response.status_code, response.text))
+              
+           # Tentative de décodage de la réponse JSON, puis extraction du jeton et de sa durée de vie.
+           # Retourne le jeton d'accès extrait de la réponse JSON.
+           return self.enregistrer_token(response.json())
+           # Donc en somme, quand cette fonction est appelée, elle renvoie le token qui permettra de faire des requêtes à l'API france travail
+
+          
+       # Gestion des exceptions liées aux problèmes de connexion.
+       except requests.exceptions.ConnectionError:
+           raise Exception("Impossible de se connecter au serveur d'authentification")
+       # Gestion des exceptions liées aux délais d'attente dépassés lors de la requête.
+       except requests.exceptions.Timeout:
+           raise Exception("Délai d'attente dépassé lors de l'authentification")
+       # Gestion des autres exceptions liées aux problèmes lors de l'envoi de la requête HTTP.
+       except requests.exceptions.RequestException as e:
+           raise Exception(f"Erreur lors de la requête d'authentification: {str(e)}")
+       # Gestion des exceptions si la réponse du serveur n'est pas au format JSON attendu.
+       except ValueError:
+           raise Exception("Réponse non-JSON reçue")
+
+
+   def verifier_token(self, forcer=False):
+       # Renouvelle le token par anticipation s'il est sur le point d'expirer (ou si forcer=True).
+       # Le verrou garantit qu'un seul thread renouvelle le token quand le client est partagé :
+       # les autres attendent puis réutilisent le nouveau token au lieu de relancer une authentification.
+       if not forcer and self.token_valide():
+           return self.token
+       with self._verrou_token:
+           if forcer or not self.token_valide():
+               self.token = self.get_token()
+           return self.token
 
+
+   def get_communes(self):
+       # Récupère la liste complète des communes françaises depuis l'API de France Travail.
+       # Cette fonction est importante car l'API ne fonctionne qu'avec des codes INSEE (équivalent du code postal)
+       # C'est à dire que l'url permettant de faire une requête, ne prend pas en compte les villes mais plutôt les code INSEE
+       # Mais dans notre code, on souhaite que l'on puisse rentrer le nom d'une ville et non pas un code postal/INSEE
+       # France travail offre la possibilité de récupérer tout les codes INSEE et leurs villes associées
+       # Ce sera pratique car quand on rentrera le nom d'une ville, alors il ira chercher directement dans ce dictionnaire le code INSEE
        # En-têtes de la requête HTTP, incluant le jeton d'autorisation et l'acceptation du format JSON.
        headers = {
-           "Authorization": f"Bearer {self.token}",
+           "Authorization": f"Bearer {self.verifier_token()}",
            "Accept": "application/json"
        }
       
        try:
-           # Envoi de la requête GET à l'API avec les paramètres et les en-têtes.
-           response = requests.get(url, headers=headers, params=params)
+           # Envoi de la requête GET à l'URL spécifiée avec les en-têtes.
+           response = self.envoyer("GET", self.URL_COMMUNES, headers=headers)
           
-           # Vérification du statut de la réponse HTTP. Lève une exception en cas d'erreur.
+           # Vérification du statut de la réponse HTTP. Si le code n'est pas 200 (OK), une exception est levée
            if response.status_code != 200:
                if response.status_code == 401:
-                   raise Exception("Token d'authentification expiré")
-               elif response.status_code == 404:
-                   raise Exception("Ressource non trouvée")
-               elif response.status_code == 429:
-                   raise Exception("Trop de requêtes. Veuillez réessayer plus tard")
+                   raise Exception("Token d'authentification invalide ou expiré")
                else:
                    raise Exception(f"Erreur HTTP {response.status_code}: {response.text}")
                   
+           # Si la requête est réussie, retourne les données JSON contenant la liste des communes.
+           # C'est un dictionnaire, il contient toutes les villes/village, et leur code INSEE associé.
+           return response.json()
+          
+       # Gestion des exceptions qui peuvent survenir lors de la requête HTTP.
+       except requests.exceptions.RequestException as e:
+           raise Exception(f"Erreur lors de la récupération des communes: {str(e)}")
+
+
+   def rafraichir_communes(self):
+       # Retélécharge le référentiel des communes, remplace celui en mémoire et met à jour le cache disque.
+       # En cas d'échec (API d'authentification lente ou indisponible), on conserve simplement l'ancien référentiel.
+       if not self._verrou_rafraichissement.acquire(blocking=False):
+           return # Un rafraîchissement est déjà en cours
+       try:
+           communes = self.get_communes()
+           if communes:
+               self.definir_communes(communes)
+               self.sauvegarder_communes(communes)
+       except Exception as e:
+           print(f"Rafraîchissement des communes impossible, utilisation du cache existant : {str(e)}")
+       finally:
+           self._verrou_rafraichissement.release()
+
+
+   def rafraichir_communes_en_arriere_plan(self):
+       # Lance rafraichir_communes dans un thread pour ne pas retarder la création du client.
+       thread = threading.Thread(target=self.rafraichir_communes, name="rafraichissement-communes", daemon=True)
+       thread.start()
+       return thread
+
+
+   def search_offres(self, zone_type, zone_code, mots_cles):
+       # Effectue une recherche d'offres d'emploi auprès de l'API France Travail en fonction du type et du code de la zone géographique et des mots-clés.
+       # Retourne les résultats bruts de l'API au format JSON.
+       # Lève une ValueError si le type de zone est invalide ou si le code de zone est manquant (voir parametres_recherche).
+       params = self.parametres_recherche(zone_type, zone_code, mots_cles)
+
+       # En-têtes de la requête HTTP, incluant le jeton d'autorisation (renouvelé si besoin) et l'acceptation du format JSON.
+       headers = {
+           "Authorization": f"Bearer {self.verifier_token()}",
+           "Accept": "application/json"
+       }
+      
+       try:
+           # Envoi de la requête GET à l'API avec les paramètres et les en-têtes.
+           response = self.envoyer("GET", self.URL_RECHERCHE, headers=headers, params=params)
+          
+           # Vérification du statut de la réponse HTTP. Lève une exception en cas d'erreur.
+           # L'API répond 206 quand seule une partie des offres est renvoyée, et 204 quand aucune offre ne correspond.
+           if response.status_code == 204:
+               return {"resultats": []}
+           if response.status_code not in (200, 206):
+               raise Exception(self.message_erreur_recherche(response.status_code, response.text))
+                  
            # Si la requête est réussie, retourne les données JSON de la réponse.
            return response.json()
           
@@ -266,25 +486,6 @@ class FranceTravailAPI:
            raise Exception(f"Erreur réseau: {str(e)}")
 
 
-   def nettoyer_description(self, description):
-        # Nettoie le texte de la description d'une offre d'emploi en supprimant les sauts de ligne, les espaces multiples et les espaces avant la ponctuation.
-        # Retourne la description nettoyée. Si la description est vide, retourne un message indiquant l'absence de description
-       if not description:
-           return "Aucune description disponible."
-          
-       # Remplace les sauts de ligne par un espace
-       cleaned = re.sub(r'\n', ' ', description)
-      
-       # Remplace les espaces multiples par un seul
-       cleaned = re.sub(r'\s+', ' ', cleaned)
-      
-       # Enlève les espaces avant la ponctuation
-       cleaned = re.sub(r'\s+([.,;:!?])', r'\1', cleaned)
-      
-       # Supprime les espaces en début et fin de chaîne et retourne le résultat.
-       return cleaned.strip()
-
-
    def recherche_offres(self, ville_input, mots_cles):
        # Recherche des offres d'emploi en fonction de la ville et des mots-clés fournis.
        # Utilise les méthodes determine_zone_recherche et search_offres pour effectuer la requête à l'API.
@@ -305,49 +506,26 @@ class FranceTravailAPI:
 
            try:
                # Effectue la recherche d'offres d'emploi via l'API.
-               offres = self.search_offres(zone["type"], zone["valeur"], mots_cles)
-              
-               # Vérifie si des résultats ont été trouvés.
-               if not offres.get("resultats"):
-                   return {"message": f"Aucune offre trouvée pour '{mots_cles}' à {zone['nom_corrige']}."}
-
-
-               # Liste pour stocker les informations formatées des offres.
-               resultats_utiles = []
-               # Parcours les résultats bruts de l'API pour extraire et formater les informations pertinentes.
-               for offre in offres["resultats"]:
+               # Le token est renouvelé par anticipation dans search_offres ; si l'API le refuse malgré tout
+               # (révocation côté serveur), on force un seul renouvellement puis on retente une fois.
+               try:
+                   offres = self.search_offres(zone["type"], zone["valeur"], mots_cles)
+               except Exception as e:
+                   if "Token d'authentification expiré" not in str(e):
+                       raise
+                   print("Token refusé par l'API. Renouvellement forcé...")
                    try:
-                       resultat = {
-                           "titre": offre.get("intitule", "Titre non renseigné"),
-                           "entreprise": offre.get("entreprise", {}).get("nom", "Entreprise non précisée"),
-                           "lieu": offre.get("lieuTravail", {}).get("libelle", "Lieu non précisé"),
-                           "contrat": offre.get("typeContratLibelle", "Type de contrat non précisé"),
-                           "description": self.nettoyer_description(offre.get("description"))
-                       }
-                       resultats_utiles.append(resultat)
-                   except Exception as e:
-                       print(f"Erreur sur une offre: {str(e)}")  # Affiche une erreur si le traitement d'une offre échoue.
-                       continue # Passe à l'offre suivante en cas d'erreur.
-
-
-               # Retourne un dictionnaire contenant des informations sur la recherche et la liste des offres formatées
-               return {
-                   "ville": zone["nom_corrige"],
-                   "nombre_offres": len(resultats_utiles),
-                   "offres": resultats_utiles
-               }
-              
-            # Gestion des erreurs spécifiques liées à la requête d'offres (y compris l'expiration du token).
-           except Exception as e:
-               if "Token d'authentification expiré" in str(e):
-                   print("Token expiré. Tentative de renouvellement...")
-                   try:
-                       self.token = self.get_token() # Tente de renouveler le token.
-                       return self.recherche_offres(ville_input, mots_cles)  # Réessaie la recherche avec le nouveau token.
+                       self.verifier_token(forcer=True)
                    except Exception as token_error:
                        return {"erreur": f"Impossible de renouveler le token: {str(token_error)}"}  # Retourne une erreur si le renouvellement du token échoue.
-               else:
-                   return {"erreur": f"Erreur lors de la recherche: {str(e)}"} # Retourne une erreur générique si la recherche échoue
+                   offres = self.search_offres(zone["type"], zone["valeur"], mots_cles)
+              
+               # Formate les résultats bruts de l'API (ou le message "Aucune offre trouvée").
+               return self.formater_resultats(offres, zone, mots_cles)
+              
+            # Gestion des erreurs spécifiques liées à la requête d'offres.
+           except Exception as e:
+               return {"erreur": f"Erreur lors de la recherche: {str(e)}"} # Retourne une erreur générique si la recherche échoue
 
 
        # Gestion des erreurs de connexion réseau.
@@ -359,6 +537,22 @@ class FranceTravailAPI:
            return {"erreur": f"Erreur inattendue: {str(e)}"}
 
 
+# Client unique partagé par tout le processus (le bot ne crée plus un client, un token et une liste de communes par commande)
+_api_partagee = None
+_verrou_api_partagee = threading.Lock()
+
+
+def get_api_partagee():
+   # Retourne le client FranceTravailAPI partagé, en le créant au premier appel.
+   # Le verrou évite que deux commandes simultanées initialisent chacune leur propre client.
+   global _api_partagee
+   if _api_partagee is None:
+       with _verrou_api_partagee:
+           if _api_partagee is None:
+               _api_partagee = FranceTravailAPI()
+   return _api_partagee
+
+
 # Exemple d'utilisation de la classe FranceTravailAPI en ligne de commande.
 # Cette section s'exécute uniquement lorsque le script est lancé directement
 if __name__ == "__main__":
@@ -402,6 +596,6 @@ if __name__ == "__main__":
    except Exception as e:
        print(f"Erreur d'initialisation de l'API: {str(e)}")
        print("Vérifiez que vous avez bien renseigné votre client_id et client_secret.")
-
-#pour bien voir la structure du dictionnaire
-pprint.pprint(resultats)
+   else:
+       #pour bien voir la structure du dictionnaire
+       pprint.pprint(resultats)
@@ -8,9 +8,14 @@ import logging
 from datetime import datetime
 from jobspy import scrape_jobs
 import pandas as pd
+import os
 import sys
 import re
 
+# Base locale des offres partagée avec le bot (Groupe 1/utils/offer_store.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Groupe 1'))
+from utils.offer_store import OfferStore, indeed_offer
+
 def configure_logging():
     """Set up basic logging configuration"""
     logging.basicConfig(
@@ -175,6 +180,16 @@ def save_data(jobs_df, base_filename):
         logging.error(f"Error saving data: {str(e)}")
         raise
 
+def store_data(jobs_df):
+    """Upsert job data into the local offer store (OFFER_STORE_PATH, offers.db by default)"""
+    try:
+        store = OfferStore()
+        inserted, updated = store.upsert_offers([indeed_offer(job) for job in jobs_df.to_dict('records')])
+        logging.info(f"Offer store {store.path}: {inserted} new jobs, {updated} already known, {store.count()} in total")
+        store.close()
+    except Exception as e:
+        logging.error(f"Error storing jobs in the offer store: {str(e)}")
+
 def main():
     """Main function to execute the job scraping workflow"""
     configure_logging()
@@ -208,6 +223,7 @@ def main():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         base_filename = f"jobs_{timestamp}"
         csv_file, json_file, dict_file = save_data(cleaned_jobs, base_filename)
+        store_data(cleaned_jobs)
 
         # Data and summary
         logging.info("\nSample Cleaned Job Data:")
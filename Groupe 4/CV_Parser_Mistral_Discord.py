@@ -17,9 +17,11 @@ Plusieurs versions préliminaires du programme ont été développées à l’ai
 
 L'approche retenue repose finalement sur l'intelligence artificielle (Mistral AI), qui permet une extraction beaucoup plus flexible et robuste, quels que soient le format ou la présentation du CV.
 
+Seuls les champs de contact (email, téléphone, LinkedIn, GitHub), dont le format ne dépend pas de la mise en page, et les sections qui sont de simples listes (langues, certifications) sont extraits localement (preparseur_cv.py) : ils sont retirés du texte, du schéma et des consignes envoyés à Mistral, qui ne reçoit que les sections à structurer, puis ajoutés au JSON.
+
 Packages requis:
 --------------
-- requests: pour communiquer avec l'API Mistral
+- aiohttp: pour communiquer avec l'API Mistral (client asynchrone commun, Groupe 5/client_llm.py)
 - json: pour manipuler les données JSON
 - pathlib: pour gérer les chemins de fichiers
 - PyPDF2: pour extraire le texte des fichiers PDF
@@ -28,7 +30,7 @@ Packages requis:
 
 Installation des dépendances:
 ---------------------------
-pip install requests PyPDF2 discord.py
+pip install aiohttp PyPDF2 discord.py
 
 Configuration requise:
 -------------------
@@ -63,19 +65,27 @@ Le bot et son système d’analyse ont été testés avec succès sur plusieurs
 import discord
 from discord.ext import commands
 import os
-import io
+import sys
 import tempfile
-import requests
 import json
-import PyPDF2
+import extraction_pdf
+from cache_cv import get_cache_cv, empreinte_pdf
+from detecteur_competences import detecteur_competences, texte_vocabulaire
+from preparseur_cv import pre_analyser_cv, CHAMPS_CONTACT, CHAMPS_LISTES
 import re
 from pathlib import Path
 
+# Client LLM asynchrone commun (Groupe 5/client_llm.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Groupe 5'))
+from client_llm import get_client_llm, ErreurLLM
+
 # Configuration du bot Discord
 BOT_TOKEN = "A MODIF"  # Remplacez par votre token Discord
 COMMAND_PREFIX = "!"
 MISTRAL_API_KEY = "A MODIF"  # Utilisez votre clé API Mistral
-API_URL = "https://api.mistral.ai/v1/chat/completions"
+MODELE_MISTRAL = "mistral-small-latest"
+# À augmenter à chaque modification du prompt ou du post-traitement : les JSON déjà en cache ne seront plus servis
+VERSION_PARSER = "4"
 
 # Intents pour le bot Discord
 intents = discord.Intents.default()
@@ -88,67 +98,77 @@ async def on_ready():
     print(f"{bot.user} est connecté à Discord!")
     print("------")
 
-def extraire_texte_pdf(fichier_pdf):
+async def extraire_texte_pdf(fichier_pdf, empreinte=None):
     """
-    Extrait le texte d'un fichier PDF
+    Extrait le texte d'un fichier PDF, dans le pool de processus partagé (voir extraction_pdf.py)
     
     Args:
         fichier_pdf (bytes): Contenu binaire du fichier PDF
+        empreinte (str): Empreinte SHA-256 du PDF (voir cache_cv.py), calculée si absente
         
     Returns:
         str: Texte extrait du PDF
     """
     try:
-        texte = ""
-        # Utiliser BytesIO pour lire les données binaires
-        pdf_stream = io.BytesIO(fichier_pdf)
-        lecteur_pdf = PyPDF2.PdfReader(pdf_stream)
-        for page in lecteur_pdf.pages:
-            texte += page.extract_text() + "\n"
-        return texte
-    except Exception as e:
+        return await extraction_pdf.extraire_texte_pdf(fichier_pdf, empreinte)
+    except extraction_pdf.ErreurExtractionPDF as e:
         print(f"Erreur lors de l'extraction du texte du PDF: {e}")
         return None
 
-def generer_json_avec_mistral(texte_cv):
+def post_traiter_json(json_obj, texte_cv, pre_analyse=None):
     """
-    Envoie le texte du CV à l'API Mistral pour générer directement le JSON
+    Complète le JSON produit par Mistral
     
     Args:
+        json_obj (dict): CV structuré par Mistral
         texte_cv (str): Texte du CV extrait du PDF
+        pre_analyse (PreAnalyseCV): Champs de contact et sections extraits localement (voir preparseur_cv.py)
         
     Returns:
-        str: JSON généré par Mistral
+        dict: Le même CV, avec les champs de contact, les outils oubliés par Mistral et tous les champs requis
     """
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {MISTRAL_API_KEY}"
-    }
-    
-    # Liste des compétences techniques et soft skills à rechercher pour aider le modèle
-    liste_competences = """
-    Exemples de compétences techniques à identifier (UNIQUEMENT les outils concrets et langages de programmation):
-    
-    # Langages de programmation
-    Python, R, Java, C, C++, C#, JavaScript, TypeScript, PHP, Ruby, Swift, Kotlin, Go, Rust, SQL, Scala, Perl, Shell, Bash, PowerShell, MATLAB, VBA
-    
-    # Data Science et ML (outils uniquement)
-    TensorFlow, PyTorch, Keras, Scikit-learn, Pandas, NumPy, SciPy, NLTK, spaCy, Matplotlib, Seaborn
+    if pre_analyse is not None:
+        pre_analyse.completer(json_obj)
     
-    # Web et Frontend
-    HTML, CSS, Bootstrap, React, Angular, Vue.js, jQuery, REST API, GraphQL, Node.js, Express
+    # Outils (bureautique notamment) cités dans le CV mais oubliés par Mistral (voir detecteur_competences.py) ;
+    # les termes ambigus (SAS, Shell...) ne sont cherchés que dans la section compétences
+    if pre_analyse is not None:
+        # Texte aux accents recomposés : "Cˆote" ne doit pas être lu comme le langage C
+        detecteur_competences.completer_cv(json_obj, pre_analyse.texte_repare, pre_analyse.sections.get("competences"))
+    else:
+        detecteur_competences.completer_cv(json_obj, texte_cv)
     
-    # Bases de données
-    MySQL, PostgreSQL, SQLite, Oracle, MongoDB, Redis, Elasticsearch, NoSQL, SQL Server, MariaDB
+    # Vérifier que tous les champs requis sont présents, sinon les ajouter
+    champs_requis = ["linkedin", "github", "competences_techniques", "soft_skills", "certifications"]
+    for champ in champs_requis:
+        if champ not in json_obj:
+            if champ in ["linkedin", "github"]:
+                json_obj[champ] = ""
+            elif champ in ["competences_techniques", "soft_skills", "certifications"]:
+                json_obj[champ] = []
+    return json_obj
+
+def construire_prompt(pre_analyse):
+    """
+    Construit le prompt envoyé à Mistral
     
-    # DevOps et Cloud
-    AWS, Azure, GCP, Docker, Kubernetes, Git, GitHub, GitLab, CI/CD, Jenkins, Linux, Unix, Windows, MacOS
+    Args:
+        pre_analyse (PreAnalyseCV): Pré-analyse du CV (voir preparseur_cv.py) : seuls les champs qu'elle n'a pas
+            extraits figurent dans le schéma et les consignes, seul son texte réduit est envoyé
+        
+    Returns:
+        str: Prompt complet
+    """
+    # Exemples de certifications, inutiles si la section certifications a été lue localement
+    exemples_certifications = """
+    Exemples de certifications:
+    Permis B, Permis BVA, TOEIC, TOEFL, IELTS, Cambridge Certificate, DELF, DALF, HSK, PIX, Google Analytics, Certification Microsoft, Certification AWS, Certification Azure, ITIL, PMP, PRINCE2""" if pre_analyse.a_extraire("certifications") else ""
     
-    # Bureautique et outils
-    Microsoft Office, Microsoft 365, Office 365, Suite Office, Excel, Word, PowerPoint, Access, Outlook, OneNote, SharePoint, OneDrive, Teams, Microsoft Teams, Tableau, Power BI, SAP, Salesforce, Jira, Confluence, Trello, MS Project
+    # Liste des compétences techniques et soft skills à rechercher pour aider le modèle
+    liste_competences = f"""
+    Exemples de compétences techniques à identifier (UNIQUEMENT les outils concrets et langages de programmation):
     
-    # Autres outils techniques
-    LaTeX, RStudio, Jupyter, Orange, SAS, SPSS
+    {texte_vocabulaire()}
     
     ATTENTION: N'inclus PAS les domaines de connaissances ou sujets théoriques comme compétences techniques.
     Par exemple, n'inclus PAS: Économie, Microéconomie, Macroéconomie, Comptabilité, Finance, Droit, Mathématiques, 
@@ -158,22 +178,16 @@ def generer_json_avec_mistral(texte_cv):
     
     Exemples de soft skills à identifier:
     Communication, leadership, travail d'équipe, résolution de problèmes, gestion de projet, organisation, autonomie, adaptabilité, créativité, esprit critique, négociation, intelligence émotionnelle, gestion du temps, gestion du stress, écoute active, empathie, flexibilité, prise de décision, persuasion, présentation, prise de parole en public
-    
-    Exemples de certifications:
-    Permis B, Permis BVA, TOEIC, TOEFL, IELTS, Cambridge Certificate, DELF, DALF, HSK, PIX, Google Analytics, Certification Microsoft, Certification AWS, Certification Azure, ITIL, PMP, PRINCE2
+    {exemples_certifications}
     """
     
     # Construire le prompt pour Mistral
-    prompt = f"""
-    Voici le texte complet d'un CV extrait d'un fichier PDF. Analyse-le et convertis-le directement en JSON avec la structure suivante:
+    return f"""
+    Voici le texte d'un CV extrait d'un fichier PDF. Analyse-le et convertis-le directement en JSON avec la structure suivante:
 
     ```json
     {{
-      "prenom_nom": "string",
-      "email": "string",
-      "telephone": "string",
-      "linkedin": "string (seulement le nom d'utilisateur, pas l'URL complète, ou vide si non présent)",
-      "github": "string (seulement le nom d'utilisateur, pas l'URL complète, ou vide si non présent)",
+      "prenom_nom": "string",{pre_analyse.schema(CHAMPS_CONTACT, "      ")}
       "competences_techniques": [
         "compétence technique 1",
         "compétence technique 2"
@@ -181,14 +195,7 @@ def generer_json_avec_mistral(texte_cv):
       "soft_skills": [
         "soft skill 1",
         "soft skill 2"
-      ],
-      "langues": [
-        "string (langue et niveau)"
-      ],
-      "certifications": [
-        "string (certification 1)",
-        "string (certification 2)"
-      ],
+      ],{pre_analyse.schema(CHAMPS_LISTES, "      ")}
       "formation": [
         {{
           "titre": "string (diplôme et spécialité)",
@@ -214,50 +221,48 @@ def generer_json_avec_mistral(texte_cv):
     ```
 
     Instructions spéciales:
-    - Inclus TOUJOURS les champs "linkedin" et "github" dans le JSON, même s'ils sont vides ("").
-    - Pour LinkedIn, si tu trouves une URL comme "linkedin.com/in/nom-utilisateur", n'inclus que "nom-utilisateur". Si tu trouves directement "/linkedin-innom-utilisateur", n'inclus que "nom-utilisateur".
-    - Pour GitHub, si tu trouves une URL comme "github.com/nom-utilisateur", n'inclus que "nom-utilisateur". Si tu trouves directement "/githubnom-utilisateur", n'inclus que "nom-utilisateur".
-    - Si aucun profil LinkedIn ou GitHub n'est mentionné dans le CV, laisse ces champs vides: "linkedin": "", "github": "".
-    
     - IMPORTANT: Pour les compétences techniques, inclus UNIQUEMENT les langages de programmation, logiciels, et outils concrets.
       * Ne pas inclure dans cette section les domaines de connaissances théoriques comme l'économie, la finance, les mathématiques, etc.
       * Limite-toi aux compétences techniques concrètes et opérationnelles (langages, logiciels, frameworks, etc.)
       * Assure-toi d'inclure les outils de la suite Microsoft Office (Word, Excel, PowerPoint) et Microsoft 365 s'ils sont mentionnés dans le CV
     
     - Identifie et liste toutes les soft skills (compétences personnelles, interpersonnelles et transversales).
+    {pre_analyse.instructions("    ")}
     
-    - CERTIFICATIONS:
-      * Recherche et inclus toutes les certifications mentionnées dans le CV.
-      * Permis de conduire (B, BVA, etc.), certifications de langue (TOEIC, TOEFL, etc.), certifications informatiques (PIX, etc.)
-      * Si aucune certification n'est mentionnée, laisse la liste vide: []
-    
-    - Tu dois ABSOLUMENT inclure les champs "competences_techniques", "soft_skills" et "certifications" dans le JSON final, même s'ils sont vides.
+    - Tu dois ABSOLUMENT inclure les champs "competences_techniques" et "soft_skills" dans le JSON final, même s'ils sont vides.
 
     {liste_competences}
 
     Texte du CV:
-    {texte_cv}
+    {pre_analyse.texte_reduit}
 
     Retourne UNIQUEMENT le JSON sans aucun autre commentaire. Assure-toi que le format est valide.
     """
+
+async def generer_json_avec_mistral(texte_cv):
+    """
+    Envoie le texte du CV à l'API Mistral pour générer directement le JSON
     
-    # Préparer la requête pour l'API
-    payload = {
-        "model": "mistral-small-latest",
-        "messages": [
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.2  # Température plus basse pour respecter plus strictement le format demandé
-    }
+    Args:
+        texte_cv (str): Texte du CV extrait du PDF
+        
+    Returns:
+        str: JSON généré par Mistral
+    """
+    # Champs de contact et listes simples extraits localement : seul le reste du CV est envoyé à Mistral
+    pre_analyse = pre_analyser_cv(texte_cv)
+    prompt = construire_prompt(pre_analyse)
+    rapport = pre_analyse.rapport(construire_prompt)
+    print(f"Pré-analyse du CV : prompt ~{rapport['jetons_prompt_avant']} -> ~{rapport['jetons_prompt_apres']} jetons, champs extraits : {', '.join(rapport['champs_extraits']) or 'aucun'}")
     
     try:
-        # Envoyer la requête à l'API Mistral
-        response = requests.post(API_URL, headers=headers, json=payload)
-        response.raise_for_status()
+        # Envoyer la requête à l'API Mistral, sans bloquer le bot (client partagé, délais et concurrence bornés)
+        # Température plus basse pour respecter plus strictement le format demandé
+        reponse = await get_client_llm("mistral", MISTRAL_API_KEY).generer(prompt, modele=MODELE_MISTRAL, temperature=0.2)
+        print(f"Réponse Mistral : {reponse.jetons_entree} jetons en entrée, {reponse.jetons_sortie} en sortie, {reponse.latence:.1f} s")
         
         # Extraire la réponse
-        resultat = response.json()
-        reponse_mistral = resultat["choices"][0]["message"]["content"]
+        reponse_mistral = reponse.texte
         
         # Extraire uniquement le JSON de la réponse (au cas où Mistral ajoute des commentaires)
         json_pattern = r"```json\s*([\s\S]*?)\s*```|^\s*(\{[\s\S]*\})\s*$"
@@ -269,41 +274,7 @@ def generer_json_avec_mistral(texte_cv):
             # Vérifier que le JSON est valide
             try:
                 json_obj = json.loads(json_str)
-                
-                # Post-traitement pour détecter Microsoft Office et ses composants
-                if "competences_techniques" in json_obj:
-                    # Liste des termes bureautiques à rechercher dans le texte du CV
-                    bureautique_terms = [
-                        "Microsoft Office", "MS Office", "Office", "Suite Office", 
-                        "Microsoft 365", "Office 365", "M365", "O365",
-                        "Excel", "Word", "PowerPoint", "PPT", "Access", "Outlook",
-                        "OneNote", "SharePoint", "OneDrive", "Teams", "Microsoft Teams"
-                    ]
-                    
-                    # Vérifier si ces termes sont dans le texte du CV mais pas dans les compétences
-                    found_terms = set()
-                    for term in bureautique_terms:
-                        pattern = re.compile(r'\b' + re.escape(term) + r'\b', re.IGNORECASE)
-                        if pattern.search(texte_cv):
-                            # Normaliser le nom de la compétence (première lettre de chaque mot en majuscule)
-                            normalized_term = ' '.join(word.capitalize() for word in term.split())
-                            found_terms.add(normalized_term)
-                    
-                    # Ajouter les termes trouvés qui ne sont pas déjà dans les compétences
-                    for term in found_terms:
-                        if not any(comp.lower() == term.lower() for comp in json_obj["competences_techniques"]):
-                            json_obj["competences_techniques"].append(term)
-                
-                # Vérifier que tous les champs requis sont présents, sinon les ajouter
-                champs_requis = ["linkedin", "github", "competences_techniques", "soft_skills", "certifications"]
-                for champ in champs_requis:
-                    if champ not in json_obj:
-                        if champ in ["linkedin", "github"]:
-                            json_obj[champ] = ""
-                        elif champ in ["competences_techniques", "soft_skills", "certifications"]:
-                            json_obj[champ] = []
-                
-                return json.dumps(json_obj, ensure_ascii=False, indent=2)
+                return json.dumps(post_traiter_json(json_obj, texte_cv, pre_analyse), ensure_ascii=False, indent=2)
             except json.JSONDecodeError as e:
                 print(f"Erreur lors du décodage du JSON: {e}")
                 print(f"JSON reçu: {json_str}")
@@ -312,47 +283,13 @@ def generer_json_avec_mistral(texte_cv):
             # Si Mistral n'a pas utilisé de balises de code, essayons de parser directement
             try:
                 json_obj = json.loads(reponse_mistral)
-                
-                # Post-traitement pour détecter Microsoft Office et ses composants
-                if "competences_techniques" in json_obj:
-                    # Liste des termes bureautiques à rechercher dans le texte du CV
-                    bureautique_terms = [
-                        "Microsoft Office", "MS Office", "Office", "Suite Office", 
-                        "Microsoft 365", "Office 365", "M365", "O365",
-                        "Excel", "Word", "PowerPoint", "PPT", "Access", "Outlook",
-                        "OneNote", "SharePoint", "OneDrive", "Teams", "Microsoft Teams"
-                    ]
-                    
-                    # Vérifier si ces termes sont dans le texte du CV mais pas dans les compétences
-                    found_terms = set()
-                    for term in bureautique_terms:
-                        pattern = re.compile(r'\b' + re.escape(term) + r'\b', re.IGNORECASE)
-                        if pattern.search(texte_cv):
-                            # Normaliser le nom de la compétence (première lettre de chaque mot en majuscule)
-                            normalized_term = ' '.join(word.capitalize() for word in term.split())
-                            found_terms.add(normalized_term)
-                    
-                    # Ajouter les termes trouvés qui ne sont pas déjà dans les compétences
-                    for term in found_terms:
-                        if not any(comp.lower() == term.lower() for comp in json_obj["competences_techniques"]):
-                            json_obj["competences_techniques"].append(term)
-                
-                # Vérifier que tous les champs requis sont présents, sinon les ajouter
-                champs_requis = ["linkedin", "github", "competences_techniques", "soft_skills", "certifications"]
-                for champ in champs_requis:
-                    if champ not in json_obj:
-                        if champ in ["linkedin", "github"]:
-                            json_obj[champ] = ""
-                        elif champ in ["competences_techniques", "soft_skills", "certifications"]:
-                            json_obj[champ] = []
-                
-                return json.dumps(json_obj, ensure_ascii=False, indent=2)
+                return json.dumps(post_traiter_json(json_obj, texte_cv, pre_analyse), ensure_ascii=False, indent=2)
             except json.JSONDecodeError:
                 print("Impossible d'extraire un JSON valide de la réponse Mistral")
                 print(f"Réponse reçue: {reponse_mistral}")
                 return None
     
-    except requests.exceptions.RequestException as e:
+    except ErreurLLM as e:
         print(f"Erreur lors de la communication avec l'API Mistral: {e}")
         return None
 
@@ -380,19 +317,25 @@ async def parse_cv(ctx):
     try:
         # Télécharger le fichier PDF
         pdf_content = await attachment.read()
+        empreinte = empreinte_pdf(pdf_content)
         
-        # Extraire le texte du PDF
-        texte_cv = extraire_texte_pdf(pdf_content)
-        if not texte_cv:
-            await processing_msg.edit(content="❌ Impossible d'extraire le texte du PDF. Veuillez vérifier que le fichier est valide.")
-            return
-        
-        # Générer le JSON avec Mistral
-        await processing_msg.edit(content="⏳ Analyse du CV avec Mistral AI en cours...")
-        json_str = generer_json_avec_mistral(texte_cv)
-        if not json_str:
-            await processing_msg.edit(content="❌ Erreur lors de la génération du JSON. Veuillez réessayer plus tard.")
-            return
+        # CV déjà analysé avec ce modèle et cette version du parser : réponse immédiate, sans appel à Mistral
+        cache_cv = get_cache_cv()
+        json_str = await cache_cv.lire_async(empreinte, "mistral", MODELE_MISTRAL, VERSION_PARSER)
+        if json_str is None:
+            # Extraire le texte du PDF
+            texte_cv = await extraire_texte_pdf(pdf_content, empreinte)
+            if not texte_cv:
+                await processing_msg.edit(content="❌ Impossible d'extraire le texte du PDF. Veuillez vérifier que le fichier est valide.")
+                return
+            
+            # Générer le JSON avec Mistral
+            await processing_msg.edit(content="⏳ Analyse du CV avec Mistral AI en cours...")
+            json_str = await generer_json_avec_mistral(texte_cv)
+            if not json_str:
+                await processing_msg.edit(content="❌ Erreur lors de la génération du JSON. Veuillez réessayer plus tard.")
+                return
+            await cache_cv.ecrire_async(empreinte, "mistral", json_str, MODELE_MISTRAL, VERSION_PARSER)
         
         # Créer un fichier temporaire pour stocker le JSON
         with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as temp_file:
@@ -1,9 +1,13 @@
+import json
+import os
+import re
+import sys
 import discord
 from discord.ext import commands
-import requests
-from io import BytesIO
-import google.generativeai as genai
-from PyPDF2 import PdfReader  # Pour lire le fichier PDF
+from extraction_pdf import extraire_texte_pdf  # Pour lire le fichier PDF (pool de processus partagé)
+from cache_cv import get_cache_cv, empreinte_pdf  # Pour ne pas réanalyser un CV déjà reçu
+from detecteur_competences import detecteur_competences  # Pour compléter les compétences oubliées par Gemini
+from preparseur_cv import pre_analyser_cv, CHAMPS_CONTACT, CHAMPS_LISTES  # Pour extraire localement les champs de contact et les listes simples
 
 # Définir ton token Discord
 DISCORD_TOKEN = 'METTRE INFO PERSONNELLE'
@@ -13,18 +17,101 @@ intents = discord.Intents.default()
 intents.message_content = True  # Nécessaire pour lire le contenu des messages
 bot = commands.Bot(command_prefix='!', intents=intents)
 
-# Définir l'API Gemini
+# Définir l'API Gemini, appelée avec le client LLM asynchrone commun (Groupe 5/client_llm.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Groupe 5'))
+from client_llm import get_client_llm
+
 GEMINI_API_KEY = "METTRE INFO PERSONNELLE"
-genai.configure(api_key=GEMINI_API_KEY)
-gemini_model = genai.GenerativeModel("gemini-1.5-pro-latest")
+GEMINI_MODEL_NAME = "gemini-1.5-pro-latest"
+gemini_client = get_client_llm("gemini", GEMINI_API_KEY)
+# Version du prompt : à augmenter à chaque modification pour que les réponses déjà en cache ne soient plus servies
+PARSER_VERSION = "4"
+
+# Fonction pour extraire le texte d'un PDF, hors de la boucle du bot (voir extraction_pdf.py)
+async def extract_text_from_pdf(pdf_content, fingerprint=None):
+    return await extraire_texte_pdf(pdf_content, fingerprint)
+
+# Ajoute au JSON de Gemini les champs de contact et les listes extraits localement (voir preparseur_cv.py)
+# et les outils cités dans le CV mais oubliés par Gemini (voir detecteur_competences.py)
+def post_process(result_json, pre_parse):
+    match = re.search(r"```json\s*([\s\S]*?)\s*```|^\s*(\{[\s\S]*\})\s*$", result_json)
+    try:
+        cv = json.loads(match.group(1) or match.group(2)) if match else json.loads(result_json)
+    except json.JSONDecodeError:
+        # Réponse qui n'est pas un JSON valide : envoyée telle quelle
+        return result_json
+    pre_parse.completer(cv)
+    # Termes ambigus (SAS, Shell...) cherchés seulement dans la section compétences du CV
+    cv = detecteur_competences.completer_cv(cv, pre_parse.texte_repare, pre_parse.sections.get("competences"))
+    return json.dumps(cv, ensure_ascii=False, indent=2)
+
+# Crée le prompt pour Gemini : seuls les champs que la pré-analyse n'a pas extraits (voir preparseur_cv.py)
+# figurent dans le schéma et les consignes, seul le texte réduit du CV est envoyé
+def build_prompt(pre_parse):
+    return f"""
+    Voici le texte d'un CV extrait d'un fichier PDF. Analyse-le et convertis-le directement en JSON avec la structure suivante:
+
+    ```json
+    {{
+      "prenom_nom": "string",{pre_parse.schema(CHAMPS_CONTACT, "      ")}
+      "competences_techniques": [
+        "compétence technique 1",
+        "compétence technique 2"
+      ],
+      "soft_skills": [
+        "soft skill 1",
+        "soft skill 2"
+      ],{pre_parse.schema(CHAMPS_LISTES, "      ")}
+      "formation": [
+        {{
+          "titre": "string (diplôme et spécialité)",
+          "etablissement": "string (nom de l'école/université)",
+          "periode": "string (dates de début et fin)",
+          "details": [
+            "string (enseignements, mentions, etc.)"
+          ]
+        }}
+      ],
+      "experience": [
+        {{
+          "titre": "string (intitulé du poste)",
+          "entreprise": "string (nom de l'entreprise)",
+          "lieu": "string (ville/pays ou télétravail)",
+          "periode": "string (dates de début et fin)",
+          "details": [
+            "string (responsabilités, accomplissements)"
+          ]
+        }}
+      ]
+    }}
+    ```
+
+    Instructions spéciales:
+    - IMPORTANT: Pour les compétences techniques, inclus UNIQUEMENT les langages de programmation, logiciels, et outils concrets.
+      * Ne pas inclure dans cette section les domaines de connaissances théoriques comme l'économie, la finance, les mathématiques, etc.
+      * Limite-toi aux compétences techniques concrètes et opérationnelles (langages, logiciels, frameworks, etc.)
+
+    - Identifie et liste toutes les soft skills (compétences personnelles, interpersonnelles et transversales).
+    {pre_parse.instructions("    ")}
+
+    - Tu dois ABSOLUMENT inclure les champs "competences_techniques" et "soft_skills" dans le JSON final, même s'ils sont vides.
+
+    Texte du CV:
+    {pre_parse.texte_reduit}
+
+    Retourne UNIQUEMENT le JSON sans aucun autre commentaire. Assure-toi que le format est valide.
+    """
+
+# Envoie le JSON produit par Gemini, découpé selon la limite de Discord (2000 caractères par message)
+async def send_result(ctx, result_json):
+    MAX_DISCORD_MESSAGE_LENGTH = 2000
+
+    # Découpe le texte en morceaux de 2000 caractères maximum
+    chunks = [result_json[i:i + MAX_DISCORD_MESSAGE_LENGTH] for i in range(0, len(result_json), MAX_DISCORD_MESSAGE_LENGTH)]
 
-# Fonction pour extraire le texte d'un PDF
-def extract_text_from_pdf(pdf_content):
-    pdf_reader = PdfReader(BytesIO(pdf_content))
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text
+    # Envoie chaque morceau comme un message séparé
+    for chunk in chunks:
+        await ctx.send(chunk)
 
 @bot.command(name='parse_cv')
 async def parse_cv(ctx):
@@ -44,100 +131,32 @@ async def parse_cv(ctx):
     try:
         # Télécharger le fichier PDF
         pdf_content = await attachment.read()
+        fingerprint = empreinte_pdf(pdf_content)
 
-        # Extraire le texte du fichier PDF
-        pdf_text = extract_text_from_pdf(pdf_content)
-
-        # Créer le prompt pour Gemini
-        prompt = f"""
-        Voici le texte complet d'un CV extrait d'un fichier PDF. Analyse-le et convertis-le directement en JSON avec la structure suivante:
-
-        ```json
-        {{
-          "prenom_nom": "string",
-          "email": "string",
-          "telephone": "string",
-          "linkedin": "string (seulement le nom d'utilisateur, pas l'URL complète, ou vide si non présent)",
-          "github": "string (seulement le nom d'utilisateur, pas l'URL complète, ou vide si non présent)",
-          "competences_techniques": [
-            "compétence technique 1",
-            "compétence technique 2"
-          ],
-          "soft_skills": [
-            "soft skill 1",
-            "soft skill 2"
-          ],
-          "langues": [
-            "string (langue et niveau)"
-          ],
-          "certifications": [
-            "string (certification 1)",
-            "string (certification 2)"
-          ],
-          "formation": [
-            {{
-              "titre": "string (diplôme et spécialité)",
-              "etablissement": "string (nom de l'école/université)",
-              "periode": "string (dates de début et fin)",
-              "details": [
-                "string (enseignements, mentions, etc.)"
-              ]
-            }}
-          ],
-          "experience": [
-            {{
-              "titre": "string (intitulé du poste)",
-              "entreprise": "string (nom de l'entreprise)",
-              "lieu": "string (ville/pays ou télétravail)",
-              "periode": "string (dates de début et fin)",
-              "details": [
-                "string (responsabilités, accomplissements)"
-              ]
-            }}
-          ]
-        }}
-        ```
-
-        Instructions spéciales:
-        - Inclus TOUJOURS les champs "linkedin" et "github" dans le JSON, même s'ils sont vides ("").
-        - Pour LinkedIn, si tu trouves une URL comme "linkedin.com/in/nom-utilisateur", n'inclus que "nom-utilisateur". Si tu trouves directement "/linkedin-innom-utilisateur", n'inclus que "nom-utilisateur".
-        - Pour GitHub, si tu trouves une URL comme "github.com/nom-utilisateur", n'inclus que "nom-utilisateur". Si tu trouves directement "/githubnom-utilisateur", n'inclus que "nom-utilisateur".
-        - Si aucun profil LinkedIn ou GitHub n'est mentionné dans le CV, laisse ces champs vides: "linkedin": "", "github": "".
+        # CV déjà analysé avec ce modèle et cette version du prompt : réponse immédiate, sans appel à Gemini
+        cv_cache = get_cache_cv()
+        result_json = await cv_cache.lire_async(fingerprint, "gemini", GEMINI_MODEL_NAME, PARSER_VERSION)
+        if result_json is not None:
+            await send_result(ctx, result_json)
+            return
 
-        - IMPORTANT: Pour les compétences techniques, inclus UNIQUEMENT les langages de programmation, logiciels, et outils concrets.
-          * Ne pas inclure dans cette section les domaines de connaissances théoriques comme l'économie, la finance, les mathématiques, etc.
-          * Limite-toi aux compétences techniques concrètes et opérationnelles (langages, logiciels, frameworks, etc.)
-
-        - Identifie et liste toutes les soft skills (compétences personnelles, interpersonnelles et transversales).
-
-        - CERTIFICATIONS:
-          * Recherche et inclus toutes les certifications mentionnées dans le CV.
-          * Permis de conduire (B, BVA, etc.), certifications de langue (TOEIC, TOEFL, etc.), certifications informatiques (PIX, etc.)
-          * Si aucune certification n'est mentionnée, laisse la liste vide: []
-
-        - Tu dois ABSOLUMENT inclure les champs "competences_techniques", "soft_skills" et "certifications" dans le JSON final, même s'ils sont vides.
-
-        Texte du CV:
-        {pdf_text}
+        # Extraire le texte du fichier PDF
+        pdf_text = await extract_text_from_pdf(pdf_content, fingerprint)
+        # Champs de contact et listes simples extraits localement : seul le reste du CV est envoyé à Gemini
+        pre_parse = pre_analyser_cv(pdf_text)
+        prompt = build_prompt(pre_parse)
+        report = pre_parse.rapport(build_prompt)
+        print(f"Pré-analyse du CV : prompt ~{report['jetons_prompt_avant']} -> ~{report['jetons_prompt_apres']} jetons")
 
-        Retourne UNIQUEMENT le JSON sans aucun autre commentaire. Assure-toi que le format est valide.
-        """
 
-        # Préparer la requête pour l'API Gemini
-        response = gemini_model.generate_content(prompt)
+        # Envoyer la requête à l'API Gemini, sans bloquer le bot
+        response = await gemini_client.generer(prompt, modele=GEMINI_MODEL_NAME)
 
         # Récupérer la réponse de Gemini
-        result_json = response.text
-
-        # Limite de Discord : 2000 caractères par message
-        MAX_DISCORD_MESSAGE_LENGTH = 2000
-
-        # Découpe le texte en morceaux de 2000 caractères maximum
-        chunks = [result_json[i:i + MAX_DISCORD_MESSAGE_LENGTH] for i in range(0, len(result_json), MAX_DISCORD_MESSAGE_LENGTH)]
+        result_json = post_process(response.texte, pre_parse)
+        await cv_cache.ecrire_async(fingerprint, "gemini", result_json, GEMINI_MODEL_NAME, PARSER_VERSION)
 
-        # Envoie chaque morceau comme un message séparé
-        for chunk in chunks:
-            await ctx.send(chunk)
+        await send_result(ctx, result_json)
 
     except Exception as e:
         await ctx.send(f"Une erreur est survenue lors de l'analyse du CV : {str(e)}")
@@ -0,0 +1,174 @@
+"""
+Cache des CV déjà traités, indexé par le contenu du fichier PDF (empreinte SHA-256).
+
+Les utilisateurs renvoient souvent le même CV : au lieu de refaire l'extraction du texte et, surtout, l'appel
+à Mistral ou Gemini (plusieurs secondes et un coût par appel), le résultat déjà calculé est relu sur disque.
+
+Chaque entrée est identifiée par :
+- l'empreinte SHA-256 des octets du PDF (le nom du fichier n'intervient pas) ;
+- le type de résultat ("texte" pour l'extraction, "mistral" ou "gemini" pour le JSON structuré) ;
+- le modèle et la version du parser : modifier le prompt ou changer de modèle (en augmentant la version)
+  invalide les anciens résultats au lieu de les resservir.
+
+Les entrées sont stockées dans une base SQLite (CV_CACHE_PATH, cache_cv.db par défaut). Au-delà de
+CV_CACHE_TAILLE_MAX_MO, les entrées les moins récemment utilisées sont supprimées.
+
+Les accès SQLite sont bloquants : depuis le bot, utiliser lire_async / ecrire_async, qui les font dans un thread.
+La taille totale est tenue en mémoire et les dates d'accès des hits sont écrites par lots (avec la prochaine
+écriture, ou toutes les ACCES_PAR_LOT lectures) : une lecture n'écrit pas dans la base.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cv_cache (
+    empreinte      TEXT NOT NULL,
+    type           TEXT NOT NULL,
+    modele         TEXT NOT NULL,
+    version        TEXT NOT NULL,
+    valeur         TEXT NOT NULL,
+    taille         INTEGER NOT NULL,
+    cree_le        REAL NOT NULL,
+    dernier_acces  REAL NOT NULL,
+    PRIMARY KEY (empreinte, type, modele, version)
+);
+CREATE INDEX IF NOT EXISTS cv_cache_acces ON cv_cache(dernier_acces);
+"""
+
+# Nombre de dates d'accès gardées en mémoire avant d'être écrites
+ACCES_PAR_LOT = 50
+
+
+def empreinte_pdf(contenu):
+    """
+    Empreinte SHA-256 (hexadécimale) des octets du fichier PDF
+    """
+    return hashlib.sha256(contenu).hexdigest()
+
+
+class CacheCV:
+    """
+    Cache persistant des textes extraits et des JSON générés, borné en taille (éviction LRU)
+    """
+
+    def __init__(self, chemin=None, taille_max_octets=None):
+        self.chemin = chemin or os.getenv('CV_CACHE_PATH', 'cache_cv.db')
+        self.taille_max_octets = taille_max_octets or int(float(os.getenv('CV_CACHE_TAILLE_MAX_MO', 50)) * 1024 * 1024)
+        self._conn = sqlite3.connect(self.chemin, check_same_thread=False)
+        self._verrou = threading.Lock()
+        with self._verrou, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+            self.taille_totale = self._conn.execute('SELECT COALESCE(SUM(taille), 0) FROM cv_cache').fetchone()[0]
+        # (empreinte, type, modele, version) -> date du dernier hit, pas encore écrite
+        self._acces = {}
+        self.compteurs = {"hits": 0, "misses": 0, "ecritures": 0, "evictions": 0}
+
+    def _ecrire_acces(self):
+        # À appeler avec le verrou et dans une transaction
+        if self._acces:
+            self._conn.executemany(
+                'UPDATE cv_cache SET dernier_acces = ? WHERE empreinte = ? AND type = ? AND modele = ? AND version = ?',
+                [(date, *cle) for cle, date in self._acces.items()]
+            )
+            self._acces.clear()
+
+    def lire(self, empreinte, type_resultat, modele="", version=""):
+        """
+        Résultat enregistré pour ce PDF, ce type de résultat, ce modèle et cette version, ou None
+
+        Args:
+            empreinte (str): Empreinte du PDF (voir empreinte_pdf)
+            type_resultat (str): "texte", "mistral", "gemini"...
+            modele (str): Modèle ayant produit le résultat
+            version (str): Version du parser (prompt, post-traitement)
+
+        Returns:
+            str: Valeur enregistrée, ou None
+        """
+        cle = (empreinte, type_resultat, modele, version)
+        with self._verrou:
+            ligne = self._conn.execute(
+                'SELECT valeur FROM cv_cache WHERE empreinte = ? AND type = ? AND modele = ? AND version = ?', cle
+            ).fetchone()
+            if ligne is None:
+                self.compteurs["misses"] += 1
+                return None
+            self._acces[cle] = time.time()
+            if len(self._acces) >= ACCES_PAR_LOT:
+                with self._conn:
+                    self._ecrire_acces()
+            self.compteurs["hits"] += 1
+        return ligne[0]
+
+    async def lire_async(self, empreinte, type_resultat, modele="", version=""):
+        """
+        Comme lire, dans un thread : la boucle d'événements du bot n'attend pas la base
+        """
+        return await asyncio.to_thread(self.lire, empreinte, type_resultat, modele, version)
+
+    def ecrire(self, empreinte, type_resultat, valeur, modele="", version=""):
+        """
+        Enregistre un résultat, puis supprime les entrées les moins récemment utilisées au-delà de la taille maximale
+        """
+        maintenant = time.time()
+        taille = len(valeur.encode('utf-8'))
+        cle = (empreinte, type_resultat, modele, version)
+        with self._verrou, self._conn:
+            ancienne = self._conn.execute(
+                'SELECT taille FROM cv_cache WHERE empreinte = ? AND type = ? AND modele = ? AND version = ?', cle
+            ).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cv_cache (empreinte, type, modele, version, valeur, taille, cree_le, dernier_acces) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (*cle, valeur, taille, maintenant, maintenant)
+            )
+            self.taille_totale += taille - (ancienne[0] if ancienne else 0)
+            self.compteurs["ecritures"] += 1
+            self._acces.pop(cle, None)
+            self._ecrire_acces()
+            if self.taille_totale <= self.taille_max_octets:
+                return
+            for rowid, taille_entree in self._conn.execute(
+                'SELECT rowid, taille FROM cv_cache ORDER BY dernier_acces'
+            ).fetchall():
+                if self.taille_totale <= self.taille_max_octets:
+                    break
+                self._conn.execute('DELETE FROM cv_cache WHERE rowid = ?', (rowid,))
+                self.taille_totale -= taille_entree
+                self.compteurs["evictions"] += 1
+
+    async def ecrire_async(self, empreinte, type_resultat, valeur, modele="", version=""):
+        """
+        Comme ecrire, dans un thread
+        """
+        await asyncio.to_thread(self.ecrire, empreinte, type_resultat, valeur, modele, version)
+
+    def statistiques(self):
+        with self._verrou:
+            entrees, taille = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(taille), 0) FROM cv_cache').fetchone()
+        return {**self.compteurs, "entrees": entrees, "taille_octets": taille}
+
+    def fermer(self):
+        with self._verrou:
+            with self._conn:
+                self._ecrire_acces()
+            self._conn.close()
+
+
+_cache_cv = None
+
+
+def get_cache_cv():
+    """
+    Cache partagé par les commandes du processus, créé au premier appel
+    """
+    global _cache_cv
+    if _cache_cv is None:
+        _cache_cv = CacheCV()
+    return _cache_cv
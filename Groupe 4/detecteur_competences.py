@@ -0,0 +1,193 @@
+"""
+Détection des compétences (langages, logiciels, outils bureautiques) citées dans un texte : CV ou offre d'emploi.
+
+Le vocabulaire est celui donné en exemple à Mistral et Gemini dans les prompts des parsers de CV
+(VOCABULAIRE, regroupé par catégorie). Le détecteur est construit une seule fois, à l'import :
+- le texte est découpé en mots une seule fois, puis chaque mot n'est cherché que dans un dictionnaire
+  (plus de recherche par expression régulière compilée pour chaque terme et chaque CV) ;
+- "Power-BI", "power bi" ou "POWER BI" sont reconnus, et retournés avec l'écriture du vocabulaire ("Power BI") ;
+- quelques abréviations courantes (ALIAS) sont ramenées au terme du vocabulaire ("PPT" -> "PowerPoint") ;
+- les termes qui sont aussi des mots courants ou des noms d'entreprise ("R", "Tableau", "Word", "SAS", "Shell"...)
+  ne sont reconnus qu'avec leur casse exacte ; completer_cv ne les cherche que dans la section compétences du CV
+  ("Stage chez Orange SAS" n'ajoute ni Orange ni SAS).
+
+Utilisé par les deux parsers de CV (post-traitement de competences_techniques) et par le matching CV / offres
+du bot (Groupe 1/utils/matching.py).
+"""
+
+import re
+import unicodedata
+
+VOCABULAIRE = {
+    "Langages de programmation": [
+        "Python", "R", "Java", "C", "C++", "C#", "JavaScript", "TypeScript", "PHP", "Ruby", "Swift", "Kotlin", "Go",
+        "Rust", "SQL", "Scala", "Perl", "Shell", "Bash", "PowerShell", "MATLAB", "VBA"
+    ],
+    "Data Science et ML (outils uniquement)": [
+        "TensorFlow", "PyTorch", "Keras", "Scikit-learn", "Pandas", "NumPy", "SciPy", "NLTK", "spaCy", "Matplotlib",
+        "Seaborn"
+    ],
+    "Web et Frontend": [
+        "HTML", "CSS", "Bootstrap", "React", "Angular", "Vue.js", "jQuery", "REST API", "GraphQL", "Node.js", "Express"
+    ],
+    "Bases de données": [
+        "MySQL", "PostgreSQL", "SQLite", "Oracle", "MongoDB", "Redis", "Elasticsearch", "NoSQL", "SQL Server", "MariaDB"
+    ],
+    "DevOps et Cloud": [
+        "AWS", "Azure", "GCP", "Docker", "Kubernetes", "Git", "GitHub", "GitLab", "CI/CD", "Jenkins", "Linux", "Unix",
+        "Windows", "MacOS"
+    ],
+    "Bureautique et outils": [
+        "Microsoft Office", "Microsoft 365", "Office 365", "Suite Office", "Excel", "Word", "PowerPoint", "Access",
+        "Outlook", "OneNote", "SharePoint", "OneDrive", "Teams", "Microsoft Teams", "Tableau", "Power BI", "SAP",
+        "Salesforce", "Jira", "Confluence", "Trello", "MS Project"
+    ],
+    "Autres outils techniques": [
+        "LaTeX", "RStudio", "Jupyter", "Orange", "SAS", "SPSS"
+    ]
+}
+
+# Autres écritures d'un terme du vocabulaire
+ALIAS = {
+    "MS Office": "Microsoft Office",
+    "Office": "Microsoft Office",
+    "M365": "Microsoft 365",
+    "O365": "Office 365",
+    "PPT": "PowerPoint",
+    "API REST": "REST API",
+    "sklearn": "Scikit-learn",
+    "Postgres": "PostgreSQL",
+    "PowerBI": "Power BI"
+}
+
+# Termes qui sont aussi des mots courants (ou des noms d'entreprise) : reconnus seulement avec leur casse exacte
+AMBIGUS = {"R", "C", "Go", "Shell", "Express", "Orange", "Tableau", "Word", "Access", "Teams", "Office", "SAS"}
+
+
+def termes_vocabulaire(vocabulaire=VOCABULAIRE):
+    """
+    Tous les termes du vocabulaire, dans l'ordre des catégories
+    """
+    return [terme for termes in vocabulaire.values() for terme in termes]
+
+
+def texte_vocabulaire(vocabulaire=VOCABULAIRE, indentation="    "):
+    """
+    Vocabulaire mis en forme pour un prompt : une ligne "# catégorie" suivie des termes séparés par des virgules
+    """
+    return f"\n{indentation}\n{indentation}".join(
+        f"# {categorie}\n{indentation}{', '.join(termes)}" for categorie, termes in vocabulaire.items()
+    )
+
+
+def decouper(texte):
+    """
+    Mots du texte, sans accents, casse conservée ("C++", "C#", "Node.js" et "R&D" restent entiers)
+    """
+    texte = unicodedata.normalize("NFKD", texte or "")
+    texte = "".join(c for c in texte if not unicodedata.combining(c))
+    return [mot.rstrip(".") for mot in re.findall(r"\.?[A-Za-z0-9][A-Za-z0-9+#.&]*", texte)]
+
+
+def cle_competence(competence):
+    """
+    Clé de comparaison d'une compétence : ses mots en minuscules ("Power-BI" -> "power bi")
+    """
+    return " ".join(decouper(competence)).lower()
+
+
+class DetecteurCompetences:
+    """
+    Détecteur construit une fois pour un vocabulaire ; chaque terme a un indice (sa position dans noms)
+    """
+
+    def __init__(self, termes=None, alias=ALIAS, ambigus=AMBIGUS):
+        # noms : écriture de référence de chaque terme ; indices : clé (terme ou alias) -> (indice, écriture exacte ou None)
+        self.noms = []
+        self.indices_par_cle = {}
+        for terme in termes if termes is not None else termes_vocabulaire():
+            cle = cle_competence(terme)
+            if cle and cle not in self.indices_par_cle:
+                self.indices_par_cle[cle] = (len(self.noms), " ".join(decouper(terme)) if terme in ambigus else None)
+                self.noms.append(terme)
+        for variante, terme in alias.items():
+            cle, cible = cle_competence(variante), self.indices_par_cle.get(cle_competence(terme))
+            if cible is not None and cle not in self.indices_par_cle:
+                self.indices_par_cle[cle] = (cible[0], " ".join(decouper(variante)) if variante in ambigus else None)
+        # Premier mot -> nombre maximal de mots des termes qui commencent par ce mot
+        self.longueurs = {}
+        for cle in self.indices_par_cle:
+            mots = cle.split(" ")
+            self.longueurs[mots[0]] = max(self.longueurs.get(mots[0], 1), len(mots))
+
+    def __len__(self):
+        return len(self.noms)
+
+    def _parcourir(self, texte, ambigus=True):
+        # Indices des termes trouvés, dans l'ordre du texte (un seul parcours des mots) ; le terme le plus long
+        # l'emporte : "Microsoft Teams" ne compte pas aussi "Teams". ambigus=False : termes de AMBIGUS ignorés
+        mots = decouper(texte)
+        minuscules = [mot.lower() for mot in mots]
+        i = 0
+        while i < len(mots):
+            longueur = 1
+            for n in range(self.longueurs.get(minuscules[i], 0), 0, -1):
+                trouve = self.indices_par_cle.get(minuscules[i] if n == 1 else " ".join(minuscules[i:i + n]))
+                if trouve is None:
+                    continue
+                indice, ecriture_exacte = trouve
+                if ecriture_exacte is None or ambigus and ecriture_exacte == " ".join(mots[i:i + n]):
+                    yield indice
+                    longueur = n
+                    break
+            i += longueur
+
+    def indices(self, texte):
+        """
+        Indices (dans noms) des termes présents dans le texte
+        """
+        return set(self._parcourir(texte))
+
+    def trouver(self, texte, ambigus=True):
+        """
+        Termes présents dans le texte, avec l'écriture du vocabulaire, dans l'ordre de leur première apparition
+        (sans les termes ambigus si ambigus=False)
+        """
+        return [self.noms[indice] for indice in dict.fromkeys(self._parcourir(texte, ambigus))]
+
+    def fusionner(self, competences, nouvelles):
+        """
+        Ajoute à la liste de compétences celles de nouvelles qui n'y sont pas déjà (comparaison sans casse ni accents,
+        alias compris). Retourne la liste complétée ; l'ordre des compétences existantes est conservé.
+        """
+        connues = set()
+        for competence in competences:
+            cle = cle_competence(competence)
+            trouve = self.indices_par_cle.get(cle)
+            connues.add(trouve[0] if trouve is not None else cle)
+        resultat = list(competences)
+        for competence in nouvelles:
+            trouve = self.indices_par_cle.get(cle_competence(competence))
+            identifiant = trouve[0] if trouve is not None else cle_competence(competence)
+            if identifiant not in connues:
+                connues.add(identifiant)
+                resultat.append(competence)
+        return resultat
+
+    def completer_cv(self, json_cv, texte_cv, texte_competences=None):
+        """
+        Post-traitement d'un CV structuré par un LLM : ajoute à competences_techniques les termes du vocabulaire
+        présents dans le texte du CV que le modèle a oubliés (outils bureautiques notamment).
+        Les termes ambigus ("SAS", "Shell", "Orange"...) ne sont cherchés que dans texte_competences, la section
+        compétences du CV (voir preparseur_cv.py) : ailleurs, ce sont le plus souvent des noms d'entreprise.
+        """
+        if "competences_techniques" in json_cv:
+            trouves = self.trouver(texte_cv, ambigus=False)
+            if texte_competences:
+                trouves = self.fusionner(trouves, self.trouver(texte_competences))
+            json_cv["competences_techniques"] = self.fusionner(json_cv["competences_techniques"], trouves)
+        return json_cv
+
+
+# Détecteur partagé, construit une fois à l'import sur le vocabulaire des parsers
+detecteur_competences = DetecteurCompetences()
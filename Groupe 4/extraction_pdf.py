@@ -0,0 +1,196 @@
+"""
+Extraction du texte des CV au format PDF, hors de la boucle asyncio du bot.
+
+PyPDF2 est du Python pur : l'extraction d'un CV de plusieurs pages peut occuper le processeur pendant plusieurs
+secondes. Exécutée directement dans une commande Discord, elle bloque tous les autres utilisateurs du bot.
+Ce module confie l'extraction à un pool de processus :
+- un CV court est extrait par une seule tâche ; pour un document long, les pages sont réparties en paquets
+  extraits en parallèle ;
+- un document trop lourd (TAILLE_MAX_OCTETS) est refusé, seules les PAGES_MAX premières pages sont lues ;
+- au-delà de DELAI_MAX secondes, l'extraction est abandonnée et les processus du pool sont arrêtés
+  (un PDF malformé peut faire boucler PyPDF2 indéfiniment) ;
+- le texte extrait est gardé dans le cache des CV (cache_cv.py) : un PDF déjà reçu n'est pas relu.
+
+Utilisé par /analyser_cv (Groupe 1) et par les commandes !parse_cv des deux parsers du groupe 4.
+
+Configuration (variables d'environnement) : PDF_PROCESSUS, PDF_TAILLE_MAX_MO, PDF_PAGES_MAX, PDF_DELAI_MAX
+"""
+
+import asyncio
+import io
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import PyPDF2
+
+from cache_cv import get_cache_cv, empreinte_pdf
+
+TAILLE_MAX_OCTETS = int(float(os.getenv('PDF_TAILLE_MAX_MO', 10)) * 1024 * 1024)
+PAGES_MAX = int(os.getenv('PDF_PAGES_MAX', 30))
+DELAI_MAX = float(os.getenv('PDF_DELAI_MAX', 30))
+# Nombre de pages extraites par tâche : un CV de 1 ou 2 pages ne paie pas le coût d'une répartition
+PAGES_PAR_TACHE = 4
+# À augmenter si le texte produit change (séparateur, bibliothèque...) : le cache ne resservira pas l'ancien texte
+VERSION_EXTRACTION = "1"
+
+
+class ErreurExtractionPDF(Exception):
+    """Le texte du PDF n'a pas pu être extrait (fichier trop lourd, invalide ou trop long à traiter)"""
+
+
+def _noter_processus(file_processus):
+    # Initialisation de chaque processus du pool : son pid est transmis au bot, qui pourra l'arrêter
+    file_processus.put(os.getpid())
+
+
+def _extraire_pages(contenu, debut, fin):
+    """
+    Extrait le texte des pages [debut, fin) du PDF (exécuté dans un processus du pool)
+
+    Args:
+        contenu (bytes): Contenu binaire du fichier PDF
+        debut (int): Index de la première page
+        fin (int): Index de la page suivant la dernière (borné au nombre de pages du document)
+
+    Returns:
+        tuple: (nombre total de pages du document, liste des textes des pages extraites)
+    """
+    lecteur_pdf = PyPDF2.PdfReader(io.BytesIO(contenu))
+    nombre_pages = len(lecteur_pdf.pages)
+    textes = [lecteur_pdf.pages[i].extract_text() or "" for i in range(debut, min(fin, nombre_pages))]
+    return nombre_pages, textes
+
+
+class ExtracteurPDF:
+    """
+    Service d'extraction partagé : un pool de processus, créé au premier appel, pour tout le bot
+    """
+
+    def __init__(self, processus_max=None, taille_max=TAILLE_MAX_OCTETS, pages_max=PAGES_MAX, delai_max=DELAI_MAX, cache=None):
+        # Cache des CV (voir cache_cv.py) ; le cache partagé du processus par défaut
+        self.cache = cache
+        self.processus_max = processus_max or int(os.getenv('PDF_PROCESSUS', min(4, os.cpu_count() or 1)))
+        self.taille_max = taille_max
+        self.pages_max = pages_max
+        self.delai_max = delai_max
+        self._pool = None
+        # pids des processus du pool courant, transmis par _noter_processus
+        self._file_processus = None
+
+    def _obtenir_pool(self):
+        if self._pool is None:
+            self._file_processus = multiprocessing.SimpleQueue()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processus_max, initializer=_noter_processus, initargs=(self._file_processus,)
+            )
+        return self._pool
+
+    def _arreter_pool(self):
+        # ProcessPoolExecutor ne sait pas interrompre une tâche en cours : les processus sont arrêtés,
+        # un nouveau pool sera créé au prochain appel.
+        # Les extractions des autres utilisateurs encore en attente dans ce pool ne sont pas annulées :
+        # l'arrêt des processus les fait échouer avec BrokenProcessPool, et elles sont relancées dans le nouveau pool.
+        pool, self._pool = self._pool, None
+        file_processus, self._file_processus = self._file_processus, None
+        if pool is None:
+            return
+        pool.shutdown(wait=False)
+        pids = set()
+        while not file_processus.empty():
+            pids.add(file_processus.get())
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                # Processus déjà terminé
+                pass
+
+    async def extraire(self, contenu, empreinte=None):
+        """
+        Extrait le texte d'un fichier PDF sans bloquer la boucle asyncio
+
+        Args:
+            contenu (bytes): Contenu binaire du fichier PDF
+            empreinte (str): Empreinte SHA-256 du PDF, si l'appelant l'a déjà calculée
+
+        Returns:
+            str: Texte extrait, une page par ligne de séparation
+
+        Raises:
+            ErreurExtractionPDF: fichier trop lourd, invalide ou extraction trop longue
+        """
+        if len(contenu) > self.taille_max:
+            raise ErreurExtractionPDF(
+                f"Le fichier dépasse la taille maximale autorisée ({self.taille_max // (1024 * 1024)} Mo)"
+            )
+        cache = self.cache or get_cache_cv()
+        empreinte = empreinte or empreinte_pdf(contenu)
+        version = f"{VERSION_EXTRACTION}:{self.pages_max}"
+        texte = await cache.lire_async(empreinte, "texte", "PyPDF2", version)
+        if texte is not None:
+            return texte
+        texte = await self._extraire_avec_delai(contenu)
+        await cache.ecrire_async(empreinte, "texte", texte, "PyPDF2", version)
+        return texte
+
+    async def _extraire_avec_delai(self, contenu):
+        for tentative in range(2):
+            try:
+                return await asyncio.wait_for(self._extraire(contenu), self.delai_max)
+            except asyncio.TimeoutError:
+                self._arreter_pool()
+                raise ErreurExtractionPDF(f"L'extraction du texte a dépassé {self.delai_max:.0f} secondes")
+            except BrokenProcessPool:
+                # Pool arrêté pendant cette extraction (délai dépassé par un autre document) : une nouvelle tentative
+                if tentative == 0:
+                    continue
+                raise ErreurExtractionPDF("L'extraction du texte a été interrompue")
+            except Exception as e:
+                raise ErreurExtractionPDF(f"PDF illisible: {e}")
+
+    async def _extraire(self, contenu):
+        pool = self._obtenir_pool()
+        try:
+            return await self._extraire_avec(pool, contenu)
+        except BrokenProcessPool:
+            # Un processus du pool s'est arrêté : le pool est remplacé (sauf si c'est déjà fait)
+            if self._pool is pool:
+                self._arreter_pool()
+            raise
+
+    async def _extraire_avec(self, pool, contenu):
+        loop = asyncio.get_running_loop()
+        # Le premier paquet donne aussi le nombre de pages, pour répartir les suivants entre les processus
+        nombre_pages, textes = await loop.run_in_executor(pool, _extraire_pages, contenu, 0, PAGES_PAR_TACHE)
+        fin = min(nombre_pages, self.pages_max)
+        if nombre_pages > self.pages_max:
+            print(f"PDF de {nombre_pages} pages : seules les {self.pages_max} premières sont lues")
+        if fin > PAGES_PAR_TACHE:
+            paquets = await asyncio.gather(*(
+                loop.run_in_executor(pool, _extraire_pages, contenu, debut, min(debut + PAGES_PAR_TACHE, fin))
+                for debut in range(PAGES_PAR_TACHE, fin, PAGES_PAR_TACHE)
+            ))
+            for _, textes_paquet in paquets:
+                textes.extend(textes_paquet)
+        return "\n".join(textes[:fin])
+
+    def fermer(self):
+        # Attend la fin des extractions en cours (bloquant : à appeler hors de la boucle asyncio)
+        pool, self._pool = self._pool, None
+        self._file_processus = None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+# Service unique partagé par toutes les commandes
+extracteur_pdf = ExtracteurPDF()
+
+
+async def extraire_texte_pdf(contenu, empreinte=None):
+    """
+    Extrait le texte d'un PDF avec le service partagé (voir ExtracteurPDF.extraire)
+    """
+    return await extracteur_pdf.extraire(contenu, empreinte)
@@ -0,0 +1,322 @@
+"""
+Pré-analyse locale d'un CV, avant l'appel au LLM (Mistral ou Gemini).
+
+Les champs de contact (email, téléphone, LinkedIn, GitHub) se retrouvent de façon sûre avec des expressions
+régulières : inutile de payer des jetons pour que le modèle les recopie. Ce module :
+- nettoie le texte extrait par PyPDF2 (accents décomposés des CV LaTeX : "R´ esolution" -> "Résolution",
+  noms des icônes : "/envel⌢pe", "♂phone-alt"...) ; le texte rendu par extraction_pdf.py n'est pas modifié ;
+- extrait les champs de contact, puis les retire du texte ;
+- découpe le texte en sections (formation, expériences, compétences, langues...) d'après leurs titres, et écarte
+  celles que le JSON final n'utilise pas (profil, centres d'intérêt, références) ;
+- lit localement les sections qui sont de simples listes (langues, certifications) ;
+- fournit le texte réduit à envoyer au LLM, ainsi que le schéma JSON et les consignes des seuls champs qui restent
+  à extraire, puis fusionne les champs extraits localement dans le JSON du LLM.
+
+Rapport avant / après sur des CV : python preparseur_cv.py CV_Fictif.pdf [autre_cv.pdf ...]
+(taille du texte du CV seulement ; les parsers affichent à chaque analyse la taille du prompt complet)
+"""
+
+import math
+import re
+import unicodedata
+
+CHAMPS_CONTACT = ("email", "telephone", "linkedin", "github")
+# Champs listes lus directement dans leur section, quand elle est une simple énumération
+CHAMPS_LISTES = ("langues", "certifications")
+
+# Schéma JSON de chaque champ que le LLM peut avoir à remplir (voir PreAnalyseCV.schema)
+SCHEMA = {
+    "email": '"email": "string"',
+    "telephone": '"telephone": "string"',
+    "linkedin": '"linkedin": "string (seulement le nom d\'utilisateur, pas l\'URL complète, ou vide si non présent)"',
+    "github": '"github": "string (seulement le nom d\'utilisateur, pas l\'URL complète, ou vide si non présent)"',
+    "langues": '"langues": [\n  "string (langue et niveau)"\n]',
+    "certifications": '"certifications": [\n  "string (certification 1)",\n  "string (certification 2)"\n]'
+}
+# Consignes du prompt propres à un champ, inutiles quand il est déjà extrait (voir PreAnalyseCV.instructions)
+INSTRUCTIONS = {
+    "linkedin": 'Inclus TOUJOURS le champ "linkedin" dans le JSON, même s\'il est vide (""). '
+                'Pour LinkedIn, si tu trouves une URL comme "linkedin.com/in/nom-utilisateur", n\'inclus que '
+                '"nom-utilisateur". Si tu trouves directement "/linkedin-innom-utilisateur", n\'inclus que "nom-utilisateur".',
+    "github": 'Inclus TOUJOURS le champ "github" dans le JSON, même s\'il est vide (""). '
+              'Pour GitHub, si tu trouves une URL comme "github.com/nom-utilisateur", n\'inclus que "nom-utilisateur". '
+              'Si tu trouves directement "/githubnom-utilisateur", n\'inclus que "nom-utilisateur".',
+    "certifications": "CERTIFICATIONS:\n"
+                      "  * Recherche et inclus toutes les certifications mentionnées dans le CV.\n"
+                      "  * Permis de conduire (B, BVA, etc.), certifications de langue (TOEIC, TOEFL, etc.), "
+                      "certifications informatiques (PIX, etc.)\n"
+                      '  * Inclus TOUJOURS le champ "certifications" ; si aucune certification n\'est mentionnée, '
+                      "laisse la liste vide: []"
+}
+
+# Accents que PyPDF2 sépare de leur lettre dans les PDF produits par LaTeX : "R´ esolution", "Cˆote", "Fran¸ cais"
+ACCENTS = {"´": "\u0301", "`": "\u0300", "ˆ": "\u0302", "¸": "\u0327", "¨": "\u0308"}
+ACCENT_SEPARE = re.compile(r"((?<=[A-Za-z]) )?([´`ˆ¸¨])( ?)([A-Za-z])")
+
+# Noms des icônes (Font Awesome) tels que PyPDF2 les extrait des CV LaTeX, remplacés par un libellé lisible
+ICONES = [
+    (re.compile(r"[/♂](?:envel\S?pe|envelope)"), " Email : "),
+    (re.compile(r"[/♂](?:mobile|phone)(?:-alt)?"), " Téléphone : "),
+    (re.compile(r"[/♂](?:map|¶ap)-(?:marker|¶arker)(?:-alt)?"), " "),
+    (re.compile(r"(?<!/)[/♂]linkedin(?:-in)?(?!\.com)"), " LinkedIn : "),
+    (re.compile(r"(?<!/)[/♂]github(?:-alt)?(?!\.com)"), " GitHub : "),
+    (re.compile(r"[/♂](?:external-link-alt|globe|link)"), " ")
+]
+
+EMAIL = re.compile(r"[A-Za-z0-9][A-Za-z0-9._%+-]*@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+TELEPHONE = re.compile(r"(?<![\w+])(?:\+\d{2,3}[\s.]?(?:\(0\)\s?)?|0)\d(?:[\s.-]?\d){7,10}(?!\d)")
+LINKEDIN = re.compile(
+    r"(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/in/([A-Za-z0-9_%-]+)/?|LinkedIn\s*:\s*([A-Za-z0-9_-]+)", re.IGNORECASE
+)
+GITHUB = re.compile(r"(?:https?://)?(?:www\.)?github\.com/([A-Za-z0-9-]+)/?|GitHub\s*:\s*([A-Za-z0-9-]+)", re.IGNORECASE)
+
+# Titres de sections (comparés en minuscules, sans accents, sans ":" final)
+SECTIONS = {
+    "formation": r"formations?|education|etudes|diplomes?|parcours (?:academique|scolaire|universitaire)|cursus",
+    "experience": r"experiences?(?: professionnelles?)?|parcours professionnel|emplois?|stages?|work experience",
+    "competences": r"competences?(?: (?:techniques|informatiques|professionnelles|cles))?|skills|hard skills|outils"
+                   r"|informatique|logiciels",
+    "soft_skills": r"soft skills|savoir[- ]etre|qualites",
+    "langues": r"langues?|languages?",
+    "certifications": r"certifications?|certificats?",
+    "projets": r"projets?(?: personnels| academiques)?|realisations",
+    "profil": r"profil|a propos(?: de moi)?|resume|objectif",
+    "interets": r"centres? d'interets?|loisirs|interets|hobbies|activites extra-?professionnelles|references"
+}
+LIBELLES = {
+    "formation": "Formation", "experience": "Expériences", "competences": "Compétences", "soft_skills": "Soft skills",
+    "langues": "Langues", "certifications": "Certifications", "projets": "Projets", "profil": "Profil",
+    "interets": "Centres d'intérêt"
+}
+TITRES = {nom: re.compile(rf"(?:{motif})", re.IGNORECASE) for nom, motif in SECTIONS.items()}
+# Sections absentes du JSON produit par les parsers : non envoyées au LLM
+SECTIONS_IGNOREES = {"interets", "profil"}
+# Séparateurs des éléments d'une section liste ("Français (Natif) - Anglais (C1)", "TOEIC, Permis B")
+SEPARATEURS_LISTE = re.compile(r"\s[-–•|]\s|[,;•]\s*|\n")
+# Au-delà, un élément est une phrase : la section est laissée au LLM
+LONGUEUR_MAX_ELEMENT = 60
+
+
+def _recomposer_accent(m):
+    lettre = unicodedata.normalize("NFC", m.group(4) + ACCENTS[m.group(2)])
+    # Espace des deux côtés ("des ´ economies") : l'accent commence un mot ; sinon il est au milieu d'un mot
+    return f" {lettre}" if m.group(1) and m.group(3) else lettre
+
+
+def recomposer_accents(texte):
+    """
+    Rattache à leur lettre les accents séparés par l'extraction ("R´ esolution" -> "Résolution")
+    """
+    return ACCENT_SEPARE.sub(_recomposer_accent, texte or "")
+
+
+def reparer_texte(texte):
+    """
+    Recompose les accents séparés, remplace les icônes par un libellé et les puces "◦" par des tirets
+    """
+    texte = recomposer_accents(texte).replace("◦", "- ")
+    for motif, libelle in ICONES:
+        texte = motif.sub(libelle, texte)
+    return texte
+
+
+def _cle_titre(ligne):
+    ligne = unicodedata.normalize("NFKD", ligne.strip().lower())
+    ligne = "".join(c for c in ligne if not unicodedata.combining(c)).replace("’", "'")
+    return " ".join(ligne.rstrip(" :").split())
+
+
+def section_du_titre(ligne):
+    """
+    (nom de section, contenu sur la même ligne) si la ligne est un titre de section ("Formation",
+    "Langues : Français, Anglais"), sinon None
+    """
+    titre, deux_points, contenu = ligne.partition(":")
+    for candidat, reste in ((ligne, ""), (titre, contenu) if deux_points else (None, None)):
+        if candidat is None or len(candidat) > 40:
+            continue
+        cle = _cle_titre(candidat)
+        for nom, motif in TITRES.items():
+            if motif.fullmatch(cle):
+                return nom, reste.strip()
+    return None
+
+
+def elements_liste(contenu):
+    """
+    Éléments d'une section qui est une simple énumération, ou None si elle contient des phrases
+    """
+    elements = [element.strip(" -–•*") for element in SEPARATEURS_LISTE.split(contenu)]
+    elements = [element for element in elements if element]
+    if not elements or any(len(element) > LONGUEUR_MAX_ELEMENT for element in elements):
+        return None
+    return elements
+
+
+def extraire_contact(texte):
+    """
+    Champs de contact trouvés dans le texte (déjà réparé) : {"email", "telephone", "linkedin", "github"}
+    (seulement ceux qui sont présents) et liste des extraits de texte correspondants
+    """
+    champs, extraits = {}, []
+    email = EMAIL.search(texte)
+    if email:
+        champs["email"] = email.group(0)
+        extraits.append(email.group(0))
+    for telephone in TELEPHONE.finditer(texte):
+        chiffres = re.sub(r"\D", "", telephone.group(0))
+        if 9 <= len(chiffres) <= 15:
+            champs["telephone"] = telephone.group(0).strip()
+            extraits.append(telephone.group(0))
+            break
+    for nom, motif in (("linkedin", LINKEDIN), ("github", GITHUB)):
+        trouve = motif.search(texte)
+        if trouve:
+            champs[nom] = trouve.group(1) or trouve.group(2)
+            extraits.append(trouve.group(0))
+    return champs, extraits
+
+
+class PreAnalyseCV:
+    """
+    Résultat de la pré-analyse : champs extraits localement, sections du CV et texte réduit pour le LLM.
+    active=False : aucune pré-analyse, le texte est envoyé tel quel avec le schéma complet (prompt de référence
+    pour le rapport)
+    """
+
+    def __init__(self, texte, active=True):
+        self.texte_original = texte or ""
+        # Texte aux accents recomposés, pour les recherches locales (détection des compétences) : les libellés
+        # ajoutés à la place des icônes ("GitHub : ") n'y figurent pas
+        self.texte_repare = recomposer_accents(self.texte_original)
+        if not active:
+            self.champs, self.sections = {}, {"entete": self.texte_original}
+            return
+        texte = reparer_texte(self.texte_repare)
+        self.champs, extraits = extraire_contact(texte)
+        for extrait in extraits:
+            texte = texte.replace(extrait, " ")
+        # Libellés de contact restés seuls une fois la valeur retirée
+        texte = re.sub(
+            r"\b(?:Email|E-mail|Mail|Téléphone|Tél|Tel|LinkedIn|GitHub)\.?\s*:\s*(?=\W|$)", " ", texte, flags=re.IGNORECASE
+        )
+
+        # "entete" : lignes avant le premier titre (nom, intitulé du poste recherché...)
+        self.sections = {"entete": []}
+        courante = "entete"
+        for ligne in texte.splitlines():
+            ligne = " ".join(ligne.split())
+            # Ligne vide, ou qui ne contenait que des coordonnées et leurs séparateurs
+            if not re.search(r"\w", ligne):
+                continue
+            titre = section_du_titre(ligne)
+            if titre is not None:
+                courante, contenu = titre
+                self.sections.setdefault(courante, [])
+                if contenu:
+                    self.sections[courante].append(contenu)
+            else:
+                self.sections[courante].append(ligne)
+        self.sections = {nom: "\n".join(lignes) for nom, lignes in self.sections.items() if lignes}
+
+        # Langues, certifications : une simple liste n'a pas besoin du LLM
+        for champ in CHAMPS_LISTES:
+            elements = elements_liste(self.sections.get(champ, ""))
+            if elements is not None:
+                self.champs[champ] = elements
+
+    @property
+    def texte_reduit(self):
+        """
+        Texte à envoyer au LLM : les sections utiles, chacune sous son titre, sans les champs déjà extraits
+        """
+        return "\n\n".join(
+            contenu if nom == "entete" else f"## {LIBELLES[nom]}\n{contenu}"
+            for nom, contenu in self.sections.items() if nom not in SECTIONS_IGNOREES and nom not in self.champs
+        )
+
+    def a_extraire(self, champ):
+        """
+        Vrai si le champ reste à extraire par le LLM
+        """
+        return champ not in self.champs
+
+    def schema(self, champs, indentation):
+        """
+        Lignes du schéma JSON du prompt pour ceux des champs qui restent à extraire, chacune précédée d'un retour
+        à la ligne et suivie d'une virgule (à placer après une ligne du schéma)
+        """
+        return "".join(
+            f"\n{indentation}" + SCHEMA[champ].replace("\n", f"\n{indentation}") + ","
+            for champ in champs if self.a_extraire(champ)
+        )
+
+    def instructions(self, indentation):
+        """
+        Consignes du prompt propres aux champs qui restent à extraire (voir INSTRUCTIONS), chacune précédée
+        d'un retour à la ligne
+        """
+        return "".join(
+            f"\n{indentation}- " + consigne.replace("\n", f"\n{indentation}")
+            for champ, consigne in INSTRUCTIONS.items() if self.a_extraire(champ)
+        )
+
+    def completer(self, json_cv):
+        """
+        Fusionne les champs extraits localement dans le JSON produit par le LLM (ils priment sur sa réponse)
+        """
+        json_cv.update(self.champs)
+        return json_cv
+
+    def rapport(self, construire_prompt=None):
+        """
+        Taille du texte du CV avant / après la pré-analyse (caractères et estimation du nombre de jetons).
+        construire_prompt : fonction du parser qui construit son prompt à partir d'une pré-analyse ; le rapport
+        compare alors aussi le prompt complet, sans pré-analyse et avec
+        """
+        avant, apres = self.texte_original, self.texte_reduit
+        rapport = {
+            "caracteres_avant": len(avant),
+            "caracteres_apres": len(apres),
+            "jetons_avant": estimer_jetons(avant),
+            "jetons_apres": estimer_jetons(apres),
+            "champs_extraits": sorted(self.champs),
+            "sections": [nom for nom in self.sections if nom != "entete"]
+        }
+        if construire_prompt is not None:
+            rapport["jetons_prompt_avant"] = estimer_jetons(construire_prompt(PreAnalyseCV(avant, active=False)))
+            rapport["jetons_prompt_apres"] = estimer_jetons(construire_prompt(self))
+        return rapport
+
+
+def estimer_jetons(texte):
+    """
+    Estimation du nombre de jetons d'un texte (environ 4 caractères par jeton pour Mistral et Gemini ;
+    les accents séparés et les symboles des icônes coûtent chacun un jeton de plus)
+    """
+    symboles = sum(1 for c in texte if not c.isascii() and not c.isalpha())
+    return math.ceil(len(texte) / 4) + symboles
+
+
+def pre_analyser_cv(texte, active=True):
+    """
+    Pré-analyse d'un texte de CV (voir PreAnalyseCV)
+    """
+    return PreAnalyseCV(texte, active)
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+
+    from extraction_pdf import extraire_texte_pdf
+
+    for chemin in sys.argv[1:]:
+        with open(chemin, "rb") as fichier:
+            contenu = fichier.read()
+        texte = asyncio.run(extraire_texte_pdf(contenu)) if chemin.lower().endswith(".pdf") else contenu.decode("utf-8")
+        r = pre_analyser_cv(texte).rapport()
+        print(f"{chemin} : {r['caracteres_avant']} -> {r['caracteres_apres']} caractères, "
+              f"~{r['jetons_avant']} -> ~{r['jetons_apres']} jetons "
+              f"({100 * (1 - r['jetons_apres'] / max(r['jetons_avant'], 1)):.0f} % de moins)")
+        print(f"    champs extraits : {', '.join(r['champs_extraits']) or 'aucun'} ; sections : {', '.join(r['sections'])}")
@@ -1,5 +1,9 @@
-import requests
+import asyncio
+import re
 from docx import Document
+from client_llm import get_client_llm, fermer_clients_llm, ErreurLLM
+from cache_llm import get_cache_llm
+from preclassement import preselectionner_offres
 
 # --- 1. Fonctions pour générer les prompts ---
 
@@ -15,7 +19,7 @@ def formatter_experience(experience):
         "\n  ".join(e['details']) for e in experience
     )
 
-def generer_prompt_pertinence(cv_dict, offre_dict):
+def formatter_cv(cv_dict):
     formations = formatter_formation(cv_dict["formation"])
     experiences = formatter_experience(cv_dict["experience"])
     competences = "\n- ".join(cv_dict["competences_techniques"])
@@ -23,7 +27,7 @@ def generer_prompt_pertinence(cv_dict, offre_dict):
     langues = "\n- ".join(cv_dict["langues"])
     certifications = "\n- ".join(cv_dict["certifications"])
 
-    cv_txt = f"""Nom : {cv_dict['prenom_nom']}
+    return f"""Nom : {cv_dict['prenom_nom']}
 Email : {cv_dict['email']}
 Téléphone : {cv_dict['telephone']}
 
@@ -46,7 +50,8 @@ Certifications :
 - {certifications}
 """
 
-    offre_txt = f"""Titre : {offre_dict['titre']}
+def formatter_offre(offre_dict):
+    return f"""Titre : {offre_dict['titre']}
 Entreprise : {offre_dict['entreprise']}
 Lieu : {offre_dict['lieu']}
 Contrat : {offre_dict['type_contrat']}
@@ -61,6 +66,10 @@ Profil recherché :
 {offre_dict['profil_recherche']}
 """
 
+def generer_prompt_pertinence(cv_dict, offre_dict):
+    cv_txt = formatter_cv(cv_dict)
+    offre_txt = formatter_offre(offre_dict)
+
     return f"""
 Tu es un expert RH.
 
@@ -73,6 +82,32 @@ Voici un CV et une offre d'emploi. Réponds uniquement par "oui" si le profil co
 {offre_txt}
 """
 
+def generer_prompt_pertinence_lot(cv_dict, offres):
+    # Plusieurs offres évaluées en un seul appel : le CV n'est envoyé qu'une fois
+    offres_txt = "\n".join(
+        f"--- Offre {i} ---\n{formatter_offre(offre)}" for i, offre in enumerate(offres, start=1)
+    )
+
+    return f"""
+Tu es un expert RH.
+
+Voici un CV et {len(offres)} offres d'emploi numérotées. Pour chaque offre, réponds "oui" si le profil correspond à plus de 70 % à l'offre, sinon "non".
+Réponds uniquement avec une ligne par offre, au format "numéro: oui" ou "numéro: non", sans aucune explication.
+
+--- CV ---
+{formatter_cv(cv_dict)}
+
+{offres_txt}
+"""
+
+def lire_verdicts_lot(reponse, nombre_offres):
+    # "1: oui\n2: non" -> [True, False] ; None pour une offre sans verdict lisible
+    verdicts = [None] * nombre_offres
+    for numero, verdict in re.findall(r"(\d+)\s*[:.)-]\s*(oui|non)", (reponse or "").lower()):
+        if 1 <= int(numero) <= nombre_offres:
+            verdicts[int(numero) - 1] = verdict == "oui"
+    return verdicts
+
 def generer_prompt_lettre(cv_dict, offre_dict, infos_perso=None):
     if infos_perso is None:
         infos_perso = {"motivation": "", "lien_entreprise": "", "contraintes": ""}
@@ -236,30 +271,70 @@ liste_offres = [
     }
 ]
 
-# --- 4. Envoi à l'API Gemini ---
+# --- 4. Envoi à l'API Gemini (client asynchrone commun, voir client_llm.py) ---
 api_key = "Votre clé API"  # Remplace par ta vraie clé
-url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-pro:generateContent"
-headers = {"Content-Type": "application/json"}
-params = {"key": api_key}
-
-def interroger_gemini(prompt):
-    data = {
-        "contents": [
-            {
-                "role": "user",
-                "parts": [{"text": prompt}]
-            }
-        ]
-    }
-    response = requests.post(url, headers=headers, params=params, json=data)
-    if response.status_code == 200:
-        resultat = response.json()
-        return resultat['candidates'][0]['content']['parts'][0]['text'].strip()
-    else:
-        print(f"\n❌ Erreur Gemini : {response.status_code}")
-        print(response.text)
+# Nombre maximal d'appels simultanés à Gemini : le client borne lui-même ses requêtes (concurrence_max, 4 par défaut),
+# il est donc créé avec la même limite que celle utilisée par evaluer_pertinence_offres
+APPELS_SIMULTANES = 8
+client_gemini = get_client_llm("gemini", api_key, concurrence_max=APPELS_SIMULTANES)
+
+# Les réponses sont gardées en cache (cache_llm.py) : relancer le script sur le même CV et les mêmes offres
+# ne refait pas les appels. utiliser_cache=False pour obtenir une nouvelle génération.
+async def interroger_gemini(prompt, utiliser_cache=True):
+    try:
+        reponse = await client_gemini.generer(prompt, modele="gemini-1.5-pro", utiliser_cache=utiliser_cache)
+    except ErreurLLM as e:
+        print(f"\n❌ Erreur Gemini : {e}")
         return None
-# --- 5. Interaction utilisateur ---
+    return reponse.texte.strip()
+
+# --- 5. Évaluation de la pertinence d'une liste d'offres, en parallèle ---
+# Pré-classement BM25 local (preclassement.py) : seules les PRESELECTION_K meilleures offres sont envoyées à Gemini
+PRESELECTION_K = 20
+PRESELECTION_SEUIL = None
+
+async def evaluer_pertinence(cv_dict, offre):
+    reponse = await interroger_gemini(generer_prompt_pertinence(cv_dict, offre))
+    return None if reponse is None else reponse.lower().strip(" .") == "oui"
+
+async def evaluer_pertinence_offres(cv_dict, offres, appels_simultanes=APPELS_SIMULTANES, offres_par_prompt=1, k=None, seuil=None):
+    """
+    Évalue la pertinence du CV pour chaque offre : au plus appels_simultanes appels en même temps, chacun portant
+    sur offres_par_prompt offres (1 : un prompt par offre). La limite du client (client_gemini.concurrence_max)
+    s'applique aussi : au-delà, les appels attendent leur tour dans le client. Avec k et/ou seuil, seules les offres retenues par le
+    pré-classement BM25 sont envoyées au LLM, les autres sont jugées non pertinentes.
+    Retourne une liste dans l'ordre des offres : True (pertinent), False (non pertinent) ou None (pas de réponse de l'API).
+    """
+    if k is not None or seuil is not None:
+        indices, _ = preselectionner_offres(cv_dict, offres, k=k, seuil=seuil)
+        print(f"📊 Pré-classement : {len(indices)} offres envoyées à Gemini, {len(offres) - len(indices)} appels évités")
+        verdicts = [False] * len(offres)
+        retenues = await evaluer_pertinence_offres(cv_dict, [offres[i] for i in indices], appels_simultanes, offres_par_prompt)
+        for i, verdict in zip(indices, retenues):
+            verdicts[i] = verdict
+        return verdicts
+
+    semaphore = asyncio.Semaphore(appels_simultanes)
+
+    async def evaluer_lot(lot):
+        async with semaphore:
+            if len(lot) == 1:
+                return [await evaluer_pertinence(cv_dict, lot[0])]
+            reponse = await interroger_gemini(generer_prompt_pertinence_lot(cv_dict, lot))
+        verdicts = lire_verdicts_lot(reponse, len(lot))
+        # Offres sans verdict lisible dans la réponse groupée : évaluées une par une
+        manquants = [i for i, verdict in enumerate(verdicts) if verdict is None]
+        if manquants and reponse is not None:
+            resultats = await asyncio.gather(*(evaluer_lot([lot[i]]) for i in manquants))
+            for i, resultat in zip(manquants, resultats):
+                verdicts[i] = resultat[0]
+        return verdicts
+
+    lots = [offres[i:i + offres_par_prompt] for i in range(0, len(offres), offres_par_prompt)]
+    resultats = await asyncio.gather(*(evaluer_lot(lot) for lot in lots))
+    return [verdict for verdicts in resultats for verdict in verdicts]
+
+# --- 6. Interaction utilisateur ---
 def demander_infos_complementaires():
     print("\n📝 Tu peux maintenant ajouter quelques éléments personnalisés à intégrer dans ta lettre (facultatif).")
     motivation = input("➡️ Quelle est ta motivation personnelle pour ce poste ? (laisser vide si aucune) : ").strip()
@@ -271,30 +346,38 @@ def demander_infos_complementaires():
         "contraintes": contraintes
     }
 
-# --- 6. Traitement principal ---
-for offre in liste_offres:
-    print(f"\n🔍 Traitement de l'offre chez {offre['entreprise']}...")
-    prompt_pertinence = generer_prompt_pertinence(cv_dict, offre)
-    reponse = interroger_gemini(prompt_pertinence)
-
-    if reponse and reponse.lower() == "oui":
-        print("✅ Profil pertinent. Génération de la lettre...")
-        infos_perso = demander_infos_complementaires()
-        prompt_lettre = generer_prompt_lettre(cv_dict, offre, infos_perso)
-        lettre = interroger_gemini(prompt_lettre)
-
-        if lettre:
-            doc = Document()
-            doc.add_heading(f"Lettre de motivation – {cv_dict['prenom_nom']}", 0)
-            for ligne in lettre.split('\n'):
-                if ligne.strip():
-                    doc.add_paragraph(ligne)
-
-            nom_fichier = f"Lettre_{cv_dict['prenom_nom'].replace(' ', '_')}_{offre['entreprise'].replace(' ', '_')}.docx"
-            doc.save(nom_fichier)
-            print(f"📄 Lettre sauvegardée dans : {nom_fichier}")
-        else:
-            print("⚠️ Erreur lors de la génération de la lettre.")
-    else:
-        print("⛔ Profil non jugé pertinent.")
-
+# --- 7. Traitement principal ---
+async def main():
+    try:
+        print(f"\n🔍 Évaluation de {len(liste_offres)} offres...")
+        verdicts = await evaluer_pertinence_offres(cv_dict, liste_offres, k=PRESELECTION_K, seuil=PRESELECTION_SEUIL)
+        for offre, pertinente in zip(liste_offres, verdicts):
+            print(f"\n🔍 Traitement de l'offre chez {offre['entreprise']}...")
+
+            if pertinente:
+                print("✅ Profil pertinent. Génération de la lettre...")
+                infos_perso = demander_infos_complementaires()
+                prompt_lettre = generer_prompt_lettre(cv_dict, offre, infos_perso)
+                lettre = await interroger_gemini(prompt_lettre)
+
+                if lettre:
+                    doc = Document()
+                    doc.add_heading(f"Lettre de motivation – {cv_dict['prenom_nom']}", 0)
+                    for ligne in lettre.split('\n'):
+                        if ligne.strip():
+                            doc.add_paragraph(ligne)
+
+                    nom_fichier = f"Lettre_{cv_dict['prenom_nom'].replace(' ', '_')}_{offre['entreprise'].replace(' ', '_')}.docx"
+                    doc.save(nom_fichier)
+                    print(f"📄 Lettre sauvegardée dans : {nom_fichier}")
+                else:
+                    print("⚠️ Erreur lors de la génération de la lettre.")
+            else:
+                print("⛔ Profil non jugé pertinent.")
+    finally:
+        stats = get_cache_llm().statistiques()
+        print(f"\n💾 Cache LLM : {stats['hits']} réponses réutilisées, {stats['misses']} appels ({stats['taux_succes']:.0%} de succès)")
+        await fermer_clients_llm()
+
+if __name__ == "__main__":
+    asyncio.run(main())
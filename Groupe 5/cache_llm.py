@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Cache persistant des réponses des LLM (voir client_llm.py).
+# Un prompt construit à partir du même CV et de la même offre donne le même texte : la réponse déjà obtenue
+# est relue sur disque au lieu de payer un nouvel appel.
+# - clé : empreinte SHA-256 de (fournisseur, modèle, température, nombre maximal de jetons, prompt complet) ;
+# - durée de vie (ttl) et taille totale bornées : au-delà, les réponses les moins récemment utilisées sont supprimées ;
+# - compteurs de hits / misses (taux de succès) consultables avec statistiques().
+# Accès bloquants (SQLite) : client_llm.py les fait dans un thread. Pour que chaque accès reste court, la taille totale
+# est tenue en mémoire (pas de SUM à chaque écriture), les dates d'accès des hits sont écrites par lots et les
+# réponses expirées ne sont purgées qu'une fois par PURGE_INTERVALLE secondes.
+# Configuration : LLM_CACHE_PATH (cache_llm.db), LLM_CACHE_TTL_HEURES (168), LLM_CACHE_TAILLE_MAX_MO (100)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reponses (
+    cle            TEXT PRIMARY KEY,
+    fournisseur    TEXT NOT NULL,
+    modele         TEXT NOT NULL,
+    texte          TEXT NOT NULL,
+    jetons_entree  INTEGER,
+    jetons_sortie  INTEGER,
+    taille         INTEGER NOT NULL,
+    expire_le      REAL NOT NULL,
+    dernier_acces  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reponses_acces ON reponses(dernier_acces);
+"""
+
+# Nombre de dates d'accès gardées en mémoire avant d'être écrites (elles le sont aussi à chaque écriture)
+ACCES_PAR_LOT = 100
+PURGE_INTERVALLE = 3600
+
+
+def cle_requete(fournisseur, modele, temperature, max_jetons, prompt):
+    contenu = json.dumps([fournisseur, modele, temperature, max_jetons, prompt], ensure_ascii=False)
+    return hashlib.sha256(contenu.encode("utf-8")).hexdigest()
+
+
+class CacheLLM:
+    def __init__(self, chemin=None, ttl=None, taille_max_octets=None):
+        self.chemin = chemin or os.getenv("LLM_CACHE_PATH", "cache_llm.db")
+        self.ttl = ttl or float(os.getenv("LLM_CACHE_TTL_HEURES", 168)) * 3600
+        self.taille_max_octets = taille_max_octets or int(float(os.getenv("LLM_CACHE_TAILLE_MAX_MO", 100)) * 1024 * 1024)
+        self._conn = sqlite3.connect(self.chemin, check_same_thread=False)
+        self._verrou = threading.Lock()
+        with self._verrou, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.execute("DELETE FROM reponses WHERE expire_le <= ?", (time.time(),))
+            self.taille_totale = self._conn.execute("SELECT COALESCE(SUM(taille), 0) FROM reponses").fetchone()[0]
+        self._prochaine_purge = time.time() + PURGE_INTERVALLE
+        # cle -> date du dernier hit, pas encore écrite
+        self._acces = {}
+        self.compteurs = {"hits": 0, "misses": 0, "ecritures": 0, "evictions": 0, "jetons_economises": 0}
+
+    def _ecrire_acces(self):
+        # À appeler avec le verrou et dans une transaction
+        if self._acces:
+            self._conn.executemany(
+                "UPDATE reponses SET dernier_acces = ? WHERE cle = ?",
+                [(date, cle) for cle, date in self._acces.items()]
+            )
+            self._acces.clear()
+
+    def lire(self, cle):
+        # Retourne (texte, jetons d'entrée, jetons de sortie) ou None si la réponse est absente ou expirée
+        maintenant = time.time()
+        with self._verrou:
+            ligne = self._conn.execute(
+                "SELECT texte, jetons_entree, jetons_sortie FROM reponses WHERE cle = ? AND expire_le > ?",
+                (cle, maintenant)
+            ).fetchone()
+            if ligne is None:
+                self.compteurs["misses"] += 1
+                return None
+            # Date d'accès (pour l'éviction LRU) écrite avec le prochain lot, pas à chaque hit
+            self._acces[cle] = maintenant
+            if len(self._acces) >= ACCES_PAR_LOT:
+                with self._conn:
+                    self._ecrire_acces()
+            self.compteurs["hits"] += 1
+        self.compteurs["jetons_economises"] += (ligne[1] or 0) + (ligne[2] or 0)
+        return ligne
+
+    def ecrire(self, cle, fournisseur, modele, texte, jetons_entree=None, jetons_sortie=None):
+        maintenant = time.time()
+        taille = len(texte.encode("utf-8"))
+        with self._verrou, self._conn:
+            ancienne = self._conn.execute("SELECT taille FROM reponses WHERE cle = ?", (cle,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reponses "
+                "(cle, fournisseur, modele, texte, jetons_entree, jetons_sortie, taille, expire_le, dernier_acces) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (cle, fournisseur, modele, texte, jetons_entree, jetons_sortie, taille, maintenant + self.ttl, maintenant)
+            )
+            self.taille_totale += taille - (ancienne[0] if ancienne else 0)
+            self.compteurs["ecritures"] += 1
+            self._ecrire_acces()
+            if maintenant >= self._prochaine_purge or self.taille_totale > self.taille_max_octets:
+                self._prochaine_purge = maintenant + PURGE_INTERVALLE
+                self._conn.execute("DELETE FROM reponses WHERE expire_le <= ?", (maintenant,))
+                self.taille_totale = self._conn.execute("SELECT COALESCE(SUM(taille), 0) FROM reponses").fetchone()[0]
+            if self.taille_totale <= self.taille_max_octets:
+                return
+            for cle_ancienne, taille_ancienne in self._conn.execute(
+                "SELECT cle, taille FROM reponses ORDER BY dernier_acces"
+            ).fetchall():
+                if self.taille_totale <= self.taille_max_octets:
+                    break
+                self._conn.execute("DELETE FROM reponses WHERE cle = ?", (cle_ancienne,))
+                self.taille_totale -= taille_ancienne
+                self.compteurs["evictions"] += 1
+
+    def statistiques(self):
+        demandes = self.compteurs["hits"] + self.compteurs["misses"]
+        with self._verrou:
+            entrees, taille = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(taille), 0) FROM reponses").fetchone()
+        return {
+            **self.compteurs,
+            "entrees": entrees,
+            "taille_octets": taille,
+            "taux_succes": self.compteurs["hits"] / demandes if demandes else 0.0
+        }
+
+    def fermer(self):
+        with self._verrou:
+            with self._conn:
+                self._ecrire_acces()
+            self._conn.close()
+
+
+_cache_llm = None
+
+
+def get_cache_llm():
+    # Cache partagé par tous les clients LLM du processus, créé au premier appel
+    global _cache_llm
+    if _cache_llm is None:
+        _cache_llm = CacheLLM()
+    return _cache_llm
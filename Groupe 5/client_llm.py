@@ -0,0 +1,211 @@
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+
+import aiohttp
+
+from cache_llm import get_cache_llm, cle_requete
+
+# Client asynchrone commun pour les appels aux LLM (Mistral, Gemini).
+# - une session HTTP par fournisseur, gardée ouverte (connexions keep-alive réutilisées d'un appel à l'autre) ;
+# - délais de connexion, de lecture et total : un fournisseur qui ne répond plus ne bloque pas une commande indéfiniment ;
+# - nombre d'appels simultanés borné par fournisseur ;
+# - réponse uniforme (ReponseLLM) : texte, jetons consommés et latence ;
+# - réponses gardées dans un cache sur disque (cache_llm.py) ; utiliser_cache=False pour une génération créative.
+# Utilisé par PartieLLM.py et par les deux parsers de CV du groupe 4.
+
+
+class ErreurLLM(Exception):
+    pass
+
+
+class ReponseLLM:
+    def __init__(self, texte, fournisseur, modele, jetons_entree=None, jetons_sortie=None, latence=0.0, depuis_cache=False):
+        self.texte = texte
+        self.fournisseur = fournisseur
+        self.modele = modele
+        self.jetons_entree = jetons_entree
+        self.jetons_sortie = jetons_sortie
+        self.latence = latence
+        self.depuis_cache = depuis_cache
+
+    def __repr__(self):
+        return (
+            f"ReponseLLM({self.fournisseur}/{self.modele}, {len(self.texte)} caractères, "
+            f"jetons {self.jetons_entree}/{self.jetons_sortie}, {self.latence:.2f} s{', cache' if self.depuis_cache else ''})"
+        )
+
+
+# --- 1. Fournisseurs : format des requêtes et des réponses de chaque API ---
+
+class FournisseurLLM(ABC):
+    nom = None
+    modele_par_defaut = None
+
+    def __init__(self, cle_api):
+        self.cle_api = cle_api
+
+    @abstractmethod
+    def preparer_requete(self, prompt, modele, temperature, max_jetons):
+        # Retourne (url, en-têtes, paramètres d'URL, corps JSON)
+        pass
+
+    @abstractmethod
+    def lire_reponse(self, donnees):
+        # Retourne (texte, jetons d'entrée, jetons de sortie) ; ErreurLLM si la réponse n'a pas le format attendu
+        pass
+
+
+class FournisseurMistral(FournisseurLLM):
+    nom = "mistral"
+    modele_par_defaut = "mistral-small-latest"
+    url = "https://api.mistral.ai/v1/chat/completions"
+
+    def preparer_requete(self, prompt, modele, temperature, max_jetons):
+        corps = {"model": modele, "messages": [{"role": "user", "content": prompt}]}
+        if temperature is not None:
+            corps["temperature"] = temperature
+        if max_jetons is not None:
+            corps["max_tokens"] = max_jetons
+        en_tetes = {"Content-Type": "application/json", "Authorization": f"Bearer {self.cle_api}"}
+        return self.url, en_tetes, None, corps
+
+    def lire_reponse(self, donnees):
+        usage = donnees.get("usage") or {}
+        try:
+            texte = donnees["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            raise ErreurLLM(f"Réponse Mistral sans texte : {str(donnees)[:500]}")
+        return texte, usage.get("prompt_tokens"), usage.get("completion_tokens")
+
+
+class FournisseurGemini(FournisseurLLM):
+    nom = "gemini"
+    modele_par_defaut = "gemini-1.5-pro"
+    url = "https://generativelanguage.googleapis.com/v1beta/models/{modele}:generateContent"
+
+    def preparer_requete(self, prompt, modele, temperature, max_jetons):
+        corps = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        configuration = {}
+        if temperature is not None:
+            configuration["temperature"] = temperature
+        if max_jetons is not None:
+            configuration["maxOutputTokens"] = max_jetons
+        if configuration:
+            corps["generationConfig"] = configuration
+        return self.url.format(modele=modele), {"Content-Type": "application/json"}, {"key": self.cle_api}, corps
+
+    def lire_reponse(self, donnees):
+        usage = donnees.get("usageMetadata") or {}
+        try:
+            texte = donnees["candidates"][0]["content"]["parts"][0]["text"]
+        except (KeyError, IndexError):
+            # Réponse bloquée par les filtres de sécurité, ou sans contenu
+            raise ErreurLLM(f"Réponse Gemini sans texte : {donnees.get('promptFeedback') or donnees}")
+        return texte, usage.get("promptTokenCount"), usage.get("candidatesTokenCount")
+
+
+FOURNISSEURS = {
+    FournisseurMistral.nom: FournisseurMistral,
+    FournisseurGemini.nom: FournisseurGemini
+}
+
+
+# --- 2. Client ---
+
+class ClientLLM:
+    def __init__(self, fournisseur, concurrence_max=4, delai_connexion=10, delai_lecture=90, delai_total=120, cache=None):
+        self.fournisseur = fournisseur
+        # Cache des réponses (CacheLLM) ; le cache partagé du processus par défaut
+        self.cache = cache
+        self.concurrence_max = concurrence_max
+        self.delais = aiohttp.ClientTimeout(total=delai_total, connect=delai_connexion, sock_read=delai_lecture)
+        self._session = None
+        self._semaphore = None
+        self.compteurs = {"appels": 0, "erreurs": 0, "jetons_entree": 0, "jetons_sortie": 0, "latence_totale": 0.0}
+
+    def _obtenir_session(self):
+        # Créée au premier appel, dans la boucle asyncio qui l'utilise
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self.delais,
+                connector=aiohttp.TCPConnector(limit=self.concurrence_max, keepalive_timeout=60)
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrence_max)
+        return self._session
+
+    async def generer(self, prompt, modele=None, temperature=None, max_jetons=None, utiliser_cache=True):
+        modele = modele or self.fournisseur.modele_par_defaut
+        cache = (self.cache or get_cache_llm()) if utiliser_cache else None
+        if cache is not None:
+            cle = cle_requete(self.fournisseur.nom, modele, temperature, max_jetons, prompt)
+            # Accès SQLite dans un thread : la boucle d'événements n'attend pas le disque
+            en_cache = await asyncio.to_thread(cache.lire, cle)
+            if en_cache is not None:
+                return ReponseLLM(en_cache[0], self.fournisseur.nom, modele, en_cache[1], en_cache[2], depuis_cache=True)
+
+        url, en_tetes, parametres, corps = self.fournisseur.preparer_requete(prompt, modele, temperature, max_jetons)
+        session = self._obtenir_session()
+        async with self._semaphore:
+            debut = time.perf_counter()
+            try:
+                async with session.post(url, headers=en_tetes, params=parametres, json=corps) as reponse:
+                    if reponse.status != 200:
+                        detail = await reponse.text()
+                        raise ErreurLLM(f"Erreur {self.fournisseur.nom} {reponse.status} : {detail[:500]}")
+                    donnees = await reponse.json()
+                # Lecture de la réponse dans le même bloc : un corps inattendu (sans "choices", bloqué par les filtres
+                # de sécurité...) est une ErreurLLM comptée dans les erreurs, pas une KeyError
+                if not isinstance(donnees, dict):
+                    raise ErreurLLM(f"Réponse {self.fournisseur.nom} inattendue : {str(donnees)[:500]}")
+                texte, jetons_entree, jetons_sortie = self.fournisseur.lire_reponse(donnees)
+            except asyncio.TimeoutError:
+                self.compteurs["erreurs"] += 1
+                raise ErreurLLM(f"Délai dépassé pour l'appel à {self.fournisseur.nom}")
+            except aiohttp.ClientError as e:
+                self.compteurs["erreurs"] += 1
+                raise ErreurLLM(f"Problème de connexion à {self.fournisseur.nom} : {e}")
+            except ValueError as e:
+                # Corps qui n'est pas du JSON valide
+                self.compteurs["erreurs"] += 1
+                raise ErreurLLM(f"Réponse {self.fournisseur.nom} illisible : {e}")
+            except ErreurLLM:
+                self.compteurs["erreurs"] += 1
+                raise
+            latence = time.perf_counter() - debut
+
+        self.compteurs["appels"] += 1
+        self.compteurs["jetons_entree"] += jetons_entree or 0
+        self.compteurs["jetons_sortie"] += jetons_sortie or 0
+        self.compteurs["latence_totale"] += latence
+        if cache is not None:
+            await asyncio.to_thread(cache.ecrire, cle, self.fournisseur.nom, modele, texte, jetons_entree, jetons_sortie)
+        return ReponseLLM(texte, self.fournisseur.nom, modele, jetons_entree, jetons_sortie, latence)
+
+    async def fermer(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# --- 3. Clients partagés : un par fournisseur et par clé d'API ---
+
+_clients = {}
+
+
+def get_client_llm(nom_fournisseur, cle_api=None, **options):
+    # La clé d'API est lue dans MISTRAL_API_KEY / GEMINI_API_KEY si elle n'est pas fournie
+    cle_api = cle_api or os.getenv(f"{nom_fournisseur.upper()}_API_KEY")
+    cle = (nom_fournisseur, cle_api)
+    if cle not in _clients:
+        if nom_fournisseur not in FOURNISSEURS:
+            raise ValueError(f"Fournisseur LLM inconnu : {nom_fournisseur}")
+        _clients[cle] = ClientLLM(FOURNISSEURS[nom_fournisseur](cle_api), **options)
+    return _clients[cle]
+
+
+async def fermer_clients_llm():
+    for client in _clients.values():
+        await client.fermer()
+    _clients.clear()
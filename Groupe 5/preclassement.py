@@ -0,0 +1,110 @@
+import re
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+# Pré-classement local des offres avant la vérification de pertinence par Gemini (PartieLLM.py).
+# Une offre sans rapport avec le CV coûte quand même un appel au LLM : les offres sont d'abord classées par score
+# BM25 entre le CV (compétences, formation, expériences) et l'offre (titre, missions, profil recherché),
+# et seules les k meilleures, ou celles au-dessus d'un seuil, sont envoyées à Gemini.
+# Le score de toutes les offres est calculé en une seule opération NumPy sur la matrice offres x termes du CV.
+# evaluer_rappel() aide à choisir k : sur des offres déjà étiquetées (par exemple des réponses de Gemini),
+# part des offres pertinentes conservées et nombre d'appels évités pour chaque valeur de k.
+
+CHAMPS_OFFRE = ("titre", "missions", "profil_recherche")
+
+# Mots trop fréquents pour distinguer une offre d'une autre
+MOTS_VIDES = {
+    "a", "au", "aux", "avec", "ce", "ces", "d", "dans", "de", "des", "du", "en", "et", "l", "la", "le", "les",
+    "leur", "mais", "ou", "par", "pas", "pour", "qu", "que", "qui", "s", "sa", "se", "ses", "son", "sur", "un",
+    "une", "vos", "votre", "nous", "vous", "est", "sont", "etre", "avoir", "bon", "bonne", "tres", "h", "f",
+    "and", "of", "the", "to", "in"
+}
+
+
+def decouper_en_termes(texte):
+    # Minuscules, sans accents ; garde les termes techniques comme "c++" ou "c#"
+    texte = unicodedata.normalize("NFKD", texte.lower())
+    texte = "".join(c for c in texte if not unicodedata.combining(c))
+    return [terme for terme in re.findall(r"[a-z0-9][a-z0-9+#]*", texte) if terme not in MOTS_VIDES]
+
+
+def texte_cv(cv_dict):
+    parties = list(cv_dict.get("competences_techniques", [])) + list(cv_dict.get("soft_skills", []))
+    parties += cv_dict.get("certifications", [])
+    for bloc in cv_dict.get("formation", []) + cv_dict.get("experience", []):
+        parties.append(bloc.get("titre", ""))
+        parties += bloc.get("details", [])
+    return "\n".join(parties)
+
+
+def texte_offre(offre_dict, champs=CHAMPS_OFFRE):
+    return "\n".join(str(offre_dict.get(champ) or "") for champ in champs)
+
+
+def scores_bm25(cv_dict, offres, k1=1.5, b=0.75, champs=CHAMPS_OFFRE):
+    """
+    Score BM25 de chaque offre pour le CV (tableau NumPy, dans l'ordre des offres).
+    Chaque terme du CV compte autant de fois qu'il apparaît dans le CV.
+    """
+    if not offres:
+        return np.zeros(0)
+    requete = Counter(decouper_en_termes(texte_cv(cv_dict)))
+    termes = list(requete)
+    colonnes = {terme: j for j, terme in enumerate(termes)}
+    # Matrice offres x termes du CV : seules les colonnes utiles au score sont construites
+    frequences = np.zeros((len(offres), len(termes)))
+    longueurs = np.zeros(len(offres))
+    for i, offre in enumerate(offres):
+        termes_offre = decouper_en_termes(texte_offre(offre, champs))
+        longueurs[i] = len(termes_offre)
+        for terme, nombre in Counter(termes_offre).items():
+            j = colonnes.get(terme)
+            if j is not None:
+                frequences[i, j] = nombre
+
+    nombre_offres = len(offres)
+    df = np.count_nonzero(frequences, axis=0)
+    idf = np.log(1 + (nombre_offres - df + 0.5) / (df + 0.5))
+    longueur_moyenne = longueurs.mean() or 1.0
+    normalisation = k1 * (1 - b + b * longueurs / longueur_moyenne)
+    tf = frequences * (k1 + 1) / (frequences + normalisation[:, None])
+    poids = np.array([requete[terme] for terme in termes], dtype=float)
+    return tf @ (idf * poids)
+
+
+def preselectionner_offres(cv_dict, offres, k=None, seuil=None, champs=CHAMPS_OFFRE):
+    """
+    Indices des offres à envoyer au LLM, dans l'ordre des offres : les k meilleurs scores et/ou ceux
+    supérieurs ou égaux au seuil (toutes les offres si ni k ni seuil). Retourne (indices, scores).
+    """
+    scores = scores_bm25(cv_dict, offres, champs=champs)
+    retenues = np.ones(len(offres), dtype=bool)
+    if k is not None and k < len(offres):
+        retenues[:] = False
+        retenues[np.argsort(-scores, kind="stable")[:k]] = True
+    if seuil is not None:
+        retenues &= scores >= seuil
+    return np.flatnonzero(retenues).tolist(), scores
+
+
+def evaluer_rappel(cv_dict, offres, etiquettes, valeurs_k, champs=CHAMPS_OFFRE):
+    """
+    Pour chaque k : part des offres étiquetées pertinentes (etiquettes[i] vrai) qui restent dans les k meilleures,
+    et nombre d'appels au LLM évités. Retourne une liste de dictionnaires, un par valeur de k.
+    """
+    scores = scores_bm25(cv_dict, offres, champs=champs)
+    ordre = np.argsort(-scores, kind="stable")
+    pertinentes = np.asarray(etiquettes, dtype=bool)
+    total = int(pertinentes.sum())
+    resultats = []
+    for k in valeurs_k:
+        trouvees = int(pertinentes[ordre[:k]].sum())
+        resultats.append({
+            "k": k,
+            "rappel": trouvees / total if total else 1.0,
+            "pertinentes_trouvees": trouvees,
+            "appels_evites": max(len(offres) - k, 0)
+        })
+    return resultats
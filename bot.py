@@ -10,8 +10,46 @@ load_dotenv()
 
 # Configuration du bot
 intents = discord.Intents.default()
-intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents)
+# Pas d'intent message_content : toutes les commandes sont des commandes slash (le CV est joint à /analyser_cv)
+
+def parse_shard_ids(value):
+    # "0-3" -> [0, 1, 2, 3] ; "0,2" -> [0, 2]
+    shard_ids = []
+    for part in value.split(','):
+        start, _, end = part.strip().partition('-')
+        shard_ids.extend(range(int(start), int(end or start) + 1))
+    return shard_ids
+
+# Sharding : sans configuration, discord.py choisit le nombre de shards recommandé et les gère tous dans ce processus.
+# Pour répartir le bot sur plusieurs processus, chacun reçoit SHARD_COUNT (total) et SHARD_IDS (ses shards, ex. "0-1") ;
+# les processus partagent alors sessions, cache des recherches et file de collecte (voir utils/shared_state.py).
+shard_count = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+shard_ids = parse_shard_ids(os.getenv('SHARD_IDS')) if os.getenv('SHARD_IDS') else None
+if shard_ids is not None and shard_count is None:
+    raise Exception("SHARD_COUNT est obligatoire avec SHARD_IDS")
+
+class JobBot(commands.AutoShardedBot):
+    async def close(self):
+        # Arrêt propre : sessions utilisateurs écrites sur disque, client France Travail fermé
+        try:
+            from utils.helper import user_data
+            await asyncio.to_thread(user_data.close)
+            print("✅ Sessions utilisateurs sauvegardées")
+        except Exception as e:
+            print(f"❌ Erreur lors de la sauvegarde des sessions: {e}")
+        try:
+            from france_travail_async import fermer_api_async_partagee
+            await fermer_api_async_partagee()
+        except Exception as e:
+            print(f"⚠️ Erreur lors de la fermeture du client France Travail: {e}")
+        try:
+            from extraction_pdf import extracteur_pdf
+            await asyncio.to_thread(extracteur_pdf.fermer)
+        except Exception as e:
+            print(f"⚠️ Erreur lors de l'arrêt du pool d'extraction PDF: {e}")
+        await super().close()
+
+bot = JobBot(command_prefix='!', intents=intents, shard_count=shard_count, shard_ids=shard_ids)
 
 # Importation des modules personnalisés
 from commands.scrape_jobs import setup_scrape_command
@@ -24,7 +62,7 @@ from utils.helper import UserData, user_data
 # On ready event
 @bot.event
 async def on_ready():
-    print(f'✅ Bot connecté en tant que {bot.user}')
+    print(f'✅ Bot connecté en tant que {bot.user} (shards {sorted(bot.shards)} sur {bot.shard_count})')
     
     # Setup each command with specific error handling
     command_setups = [
@@ -46,7 +84,31 @@ async def on_ready():
         except Exception as e:
             print(f"❌ Erreur lors de la configuration de {name}: {e}")
     
+    # Préchargement du client France Travail partagé (token + communes) pour que le premier /scrape soit rapide
+    try:
+        from france_travail_async import get_api_async_partagee
+        api = await get_api_async_partagee()
+        print("✅ Client France Travail initialisé")
+        # Plusieurs processus : une recherche faite sur un shard profite aux autres
+        from utils.shared_state import get_backend, multi_process
+        if multi_process():
+            api.cache_resultats.partager(get_backend())
+    except Exception as e:
+        print(f"⚠️ Client France Travail non initialisé (il sera créé au premier /scrape): {e}")
+
+    # Collecte des offres en arrière-plan pour les cibles de HARVEST_TARGETS (voir utils/harvester.py)
+    try:
+        from utils.harvester import start_harvester
+        harvester = start_harvester()
+        if harvester:
+            print(f"✅ Collecte en arrière-plan démarrée ({len(harvester.targets)} cibles)")
+    except Exception as e:
+        print(f"⚠️ Collecte en arrière-plan non démarrée: {e}")
+
     # Synchronize commands AFTER all setup
+    # Les commandes sont globales : seul le processus du shard 0 les synchronise
+    if shard_ids is not None and 0 not in shard_ids:
+        return
     try:
         synced = await bot.tree.sync()
         print(f"✅ Commandes synchronisées: {len(synced)}")
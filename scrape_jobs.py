@@ -1,30 +1,42 @@
+import asyncio
+import time
 import discord
 from discord import app_commands
 from utils.helper import get_user_data
+from utils.singleflight import search_flights
+from utils.offer_store import get_offer_store, france_travail_offer
+from utils.pagination import PaginatedView
+
+class OffreSelectionView(PaginatedView):
+    """
+    Résultats de /scrape parcourus page par page (boutons précédent/suivant et liste déroulante de la page).
+    La liste complète des offres reste côté serveur, partagée avec le cache de recherche : chaque page est
+    rendue à la demande, sans relancer la recherche.
+    """
+    placeholder = "Sélectionner une offre pour l'analyser"
+
+    def __init__(self, termes, resultats):
+        self.termes = termes
+        self.ville = resultats['ville']
+        # Texte ajouté au pied de page (recherche en cours, durées de la recherche)
+        self.pied = None
+        super().__init__(resultats['offres'])
+
+    def make_option(self, index, offre):
+        return discord.SelectOption(
+            label=(f"{index+1}. {offre['titre']} - {offre['entreprise']}")[:100],  # coupe à 100 caractères
+            value=str(index)
+        )
 
-class OffreSelectionView(discord.ui.View):
-    def __init__(self, offres):
-        super().__init__(timeout=300)
-        self.offres = offres
-        select = OffreSelect(offres)
-        self.add_item(select)
-
-class OffreSelect(discord.ui.Select):
-    def __init__(self, offres):
-        options = [
-    discord.SelectOption(
-        label=(f"{i+1}. {offre['titre']} - {offre['entreprise']}")[:100],  # coupe à 100 caractères
-        value=str(i)
-    )
-    for i, offre in enumerate(offres)
-]
-
-        super().__init__(placeholder="Sélectionner une offre pour l'analyser", options=options)
+    def render_page(self):
+        debut, fin = self.page_bounds()
+        embed = construire_embed_offres(self.termes, self.ville, self.items, debut, fin)
+        pied = f"Page {self.page + 1}/{self.page_count}"
+        embed.set_footer(text=f"{pied}\n{self.pied}" if self.pied else pied)
+        return embed
 
-    async def callback(self, interaction: discord.Interaction):
-        index = int(self.values[0])
-        offre = self.view.offres[index]
-        user = get_user_data(interaction.user.id)
+    async def on_item_selected(self, interaction, offre):
+        user = await get_user_data(interaction.user.id)
         user.job_offer = offre
 
         embed = discord.Embed(
@@ -38,60 +50,145 @@ class OffreSelect(discord.ui.Select):
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+def construire_embed_offres(termes, ville, offres, debut, fin):
+    """Construit l'embed listant les offres d'index debut à fin (exclu), dans la limite de 5800 caractères"""
+    embed = discord.Embed(
+        title=f"Offres d'emploi pour '{termes}'",
+        description=f"Résultats pour {ville} - {len(offres)} offres trouvées",
+        color=discord.Color.blue()
+    )
+
+    total_chars = len(embed.title) + len(embed.description)
+
+    for i in range(debut, fin):
+        offre = offres[i]
+        titre = f"{i+1}. {offre['titre']} - {offre['entreprise']}"
+        if len(titre) > 256:
+            titre = titre[:253] + "..."
+
+        lien = offre.get('url') or f"https://candidat.francetravail.fr/offres/recherche/detail/{offre.get('id', '')}"
+        description = (
+            f"📍 {offre['lieu']}\n"
+            f"📝 {offre['contrat']}\n"
+            f"🔗 [Voir l'annonce sur France Travail]({lien})"
+        )
+        if len(description) > 1024:
+            description = description[:1021] + "..."
+
+        if total_chars + len(titre) + len(description) > 5800:
+            break
+
+        embed.add_field(name=titre, value=description, inline=False)
+        total_chars += len(titre) + len(description)
+
+    return embed
+
+class AffichageProgressif:
+    """
+    Affiche les offres au fur et à mesure de la recherche : un premier embed est envoyé dès la première page
+    d'offres reçue, puis modifié sur place à chaque nouvelle page et une dernière fois à la fin de la recherche.
+    Mesure le délai avant le premier affichage et la durée totale de la commande.
+    """
+    # Délai minimal entre deux modifications intermédiaires du message (limites de débit de Discord)
+    INTERVALLE_EDITION = 1.0
+
+    def __init__(self, interaction, termes, debut):
+        self.interaction = interaction
+        self.termes = termes
+        self.debut = debut
+        self.message = None
+        self.vue = None
+        self.premier_affichage = None
+        self.derniere_edition = 0.0
+
+    async def envoyer_texte(self, texte):
+        await self.interaction.followup.send(texte)
+        self.premier_affichage = time.perf_counter() - self.debut
+
+    async def mettre_a_jour(self, resultats, final=False):
+        maintenant = time.perf_counter()
+        if not final and self.message is not None and maintenant - self.derniere_edition < self.INTERVALLE_EDITION:
+            return
+
+        if self.vue is None:
+            self.vue = OffreSelectionView(self.termes, resultats)
+        else:
+            # Même vue d'une mise à jour à l'autre : la page consultée par l'utilisateur est conservée
+            self.vue.ville = resultats['ville']
+            self.vue.items = resultats['offres']
+            self.vue.refresh_items()
+        if final:
+            premier = self.premier_affichage if self.premier_affichage is not None else maintenant - self.debut
+            self.vue.pied = f"⏱️ Premières offres en {premier:.1f} s · recherche complète en {maintenant - self.debut:.1f} s"
+        else:
+            self.vue.pied = "⏳ Recherche en cours, d'autres offres arrivent..."
+        embed = self.vue.render_page()
+
+        if self.message is None:
+            self.message = await self.interaction.followup.send(embed=embed, view=self.vue, wait=True)
+            self.premier_affichage = time.perf_counter() - self.debut
+        else:
+            await self.message.edit(embed=embed, view=self.vue)
+        self.derniere_edition = time.perf_counter()
+
 def setup_scrape_command(bot):
     @bot.tree.command(name="scrape", description="Rechercher des offres d'emploi")
     async def scrape(interaction: discord.Interaction, termes: str, lieu: str = None):
+        debut = time.perf_counter()
         await interaction.response.defer()
+        affichage = AffichageProgressif(interaction, termes, debut)
 
         try:
-            from scraping_group2 import FranceTravailAPI
-            api = FranceTravailAPI()
-            resultats = api.recherche_offres(ville_input=lieu or "Paris", mots_cles=termes)
+            from france_travail_async import get_api_async_partagee
+            # Client France Travail asynchrone partagé par tout le bot : token et communes ne sont chargés qu'une fois,
+            # et la recherche ne bloque pas la boucle d'événements pendant l'appel à l'API.
+            api = await get_api_async_partagee()
+            ville = lieu or "Paris"
+
+            async def enregistrer(offres):
+                # Conserve dans la base locale les offres tout juste reçues de l'API ; un résultat servi depuis le cache
+                # n'est pas réenregistré, et une recherche partagée n'est enregistrée qu'une fois.
+                store = get_offer_store()
+                await asyncio.to_thread(store.upsert_offers, [france_travail_offer(o) for o in offres])
+
+            async def rechercher():
+                # Les pages d'offres sont affichées dès leur arrivée ; le dernier résultat est le résultat complet
+                resultats = None
+                async for resultats in api.recherche_offres_progressive(ville, termes, enregistrer=enregistrer):
+                    if "offres" in resultats:
+                        try:
+                            await affichage.mettre_a_jour(resultats)
+                        except discord.HTTPException as e:
+                            print(f"Affichage intermédiaire impossible: {e}")
+                return resultats
+
+            # Les /scrape identiques lancés en même temps (annonce dans un serveur...) partagent une seule recherche ;
+            # seule la première commande affiche les pages au fil de l'eau, les autres reçoivent le résultat complet.
+            cle = ("france_travail", " ".join(ville.lower().split()), " ".join(termes.lower().split()))
+            resultats, partage = await search_flights.do(cle, rechercher)
+            if partage:
+                stats = search_flights.stats()
+                print(f"Recherche '{termes}' à {ville} partagée avec une recherche en cours "
+                      f"({stats['deduplicated']}/{stats['calls']} appels dédupliqués)")
 
             if "erreur" in resultats:
-                await interaction.followup.send(f"❌ Erreur : {resultats['erreur'][:1900]}")
-                return
+                # API indisponible : on répond avec les offres déjà connues de la base locale, s'il y en a.
+                # La base locale ne sert qu'en secours ; le cache de résultats reste la première source.
+                try:
+                    locaux = await asyncio.to_thread(get_offer_store().search_scrape_format, termes, ville)
+                except Exception as e:
+                    print(f"Recherche dans la base locale impossible: {e}")
+                    locaux = {}
+                if "offres" not in locaux:
+                    await affichage.envoyer_texte(f"❌ Erreur : {resultats['erreur'][:1900]}")
+                    return
+                print(f"France Travail indisponible ({resultats['erreur']}), réponse depuis la base locale")
+                resultats = locaux
             elif "message" in resultats:
-                await interaction.followup.send(f"ℹ️ {resultats['message'][:1900]}")
+                await affichage.envoyer_texte(f"ℹ️ {resultats['message'][:1900]}")
                 return
 
-            offres = resultats["offres"]
-
-            embed = discord.Embed(
-                title=f"Offres d'emploi pour '{termes}'",
-                description=f"Résultats pour {resultats['ville']} - {len(offres)} offres trouvées",
-                color=discord.Color.blue()
-            )
-
-            total_chars = len(embed.title) + len(embed.description)
-            max_fields = 0
-
-            for i, offre in enumerate(offres):
-                titre = f"{i+1}. {offre['titre']} - {offre['entreprise']}"
-                if len(titre) > 256:
-                    titre = titre[:253] + "..."
-
-                lien = f"https://candidat.francetravail.fr/offres/recherche/detail/{offre.get('id', '')}"
-                description = (
-                    f"📍 {offre['lieu']}\n"
-                    f"📝 {offre['contrat']}\n"
-                    f"🔗 [Voir l'annonce sur France Travail]({lien})"
-                )
-                if len(description) > 1024:
-                    description = description[:1021] + "..."
-
-                if total_chars + len(titre) + len(description) > 5800 or max_fields >= 25:
-                    break
-
-                embed.add_field(name=titre, value=description, inline=False)
-                total_chars += len(titre) + len(description)
-                max_fields += 1
-
-            if max_fields < len(offres):
-                embed.set_footer(text=f"⚠️ {len(offres) - max_fields} offres non affichées (limite Discord atteinte)")
-
-            view = OffreSelectionView(offres[:max_fields])
-            await interaction.followup.send(embed=embed, view=view)
+            await affichage.mettre_a_jour(resultats, final=True)
 
         except Exception as e:
             print(f"Erreur lors du scraping: {e}")
@@ -99,3 +196,7 @@ def setup_scrape_command(bot):
                 f"❌ Une erreur est survenue : {str(e)[:1900]}",
                 ephemeral=True
             )
+        finally:
+            premier = affichage.premier_affichage
+            print(f"/scrape '{termes}' : premier affichage en "
+                  f"{'-' if premier is None else f'{premier:.2f} s'}, durée totale {time.perf_counter() - debut:.2f} s")